@@ -0,0 +1,98 @@
+"""event and price query indexes
+
+Revision ID: 3f1c9a7b2d10
+Revises: 
+Create Date: 2026-10-17 10:00:00.000000
+
+Composite indexes for the event list queries (symbol/category + start_time
+order), a partial index for high-level events, and a covering index for the
+price date-range query. Redundant single-column indexes that are prefixes of
+the new composite ones are dropped.
+
+The first revision in this repository: databases created by
+``Base.metadata.create_all`` may already have some of these indexes, so every
+step checks the live schema first. On PostgreSQL the indexes are built
+CONCURRENTLY so the tables stay writable during the upgrade.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a7b2d10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+HIGH_LEVEL_WHERE = "level >= 4"
+
+
+def _indexes(table):
+    return {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def _is_postgresql():
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def _create_index(name, table, columns, **kw):
+    if name in _indexes(table):
+        return
+    if _is_postgresql():
+        with op.get_context().autocommit_block():
+            op.create_index(name, table, columns, postgresql_concurrently=True, **kw)
+    else:
+        op.create_index(name, table, columns, **kw)
+
+
+def _drop_index(name, table):
+    if name not in _indexes(table):
+        return
+    if _is_postgresql():
+        with op.get_context().autocommit_block():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    else:
+        op.drop_index(name, table_name=table)
+
+
+def upgrade():
+    # WHERE stock_symbol = ? ORDER BY start_time DESC, id DESC (scanned backwards)
+    _create_index("ix_events_symbol_start_id", "events", ["stock_symbol", "start_time", "id"])
+    # WHERE category = ? ORDER BY start_time DESC, id DESC
+    _create_index("ix_events_category_start_id", "events", ["category", "start_time", "id"])
+    # WHERE level >= 4 ORDER BY start_time DESC, id DESC
+    _create_index(
+        "ix_events_high_level_start_id",
+        "events",
+        ["start_time", "id"],
+        postgresql_where=sa.text(HIGH_LEVEL_WHERE),
+        sqlite_where=sa.text(HIGH_LEVEL_WHERE),
+    )
+    # WHERE stock_symbol = ? AND date BETWEEN ? AND ?, reading close/volume only
+    if _is_postgresql():
+        _create_index(
+            "ix_stock_prices_symbol_date_cover",
+            "stock_prices",
+            ["stock_symbol", "date"],
+            postgresql_include=["close", "volume"],
+        )
+    else:
+        _create_index(
+            "ix_stock_prices_symbol_date_cover",
+            "stock_prices",
+            ["stock_symbol", "date", "close", "volume"],
+        )
+
+    # Prefixes of the composite indexes above
+    _drop_index("ix_events_stock_symbol", "events")
+    _drop_index("ix_stock_prices_stock_symbol", "stock_prices")
+
+
+def downgrade():
+    _create_index("ix_stock_prices_stock_symbol", "stock_prices", ["stock_symbol"])
+    _create_index("ix_events_stock_symbol", "events", ["stock_symbol"])
+
+    _drop_index("ix_stock_prices_symbol_date_cover", "stock_prices")
+    _drop_index("ix_events_high_level_start_id", "events")
+    _drop_index("ix_events_category_start_id", "events")
+    # ix_events_symbol_start_id predates this revision in the models and is kept
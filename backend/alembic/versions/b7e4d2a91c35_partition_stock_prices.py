@@ -0,0 +1,140 @@
+"""partition stock_prices by date
+
+Revision ID: b7e4d2a91c35
+Revises: 3f1c9a7b2d10
+Create Date: 2026-10-17 14:00:00.000000
+
+PostgreSQL only: rebuilds stock_prices as a table partitioned by RANGE (date),
+one partition per PRICE_PARTITION_INTERVAL (year or month), see
+app/db/partitions.py. Partitions covering the existing rows and the upcoming
+PRICE_PARTITIONS_AHEAD periods are created, the rows are copied over and the
+old table is dropped. A partitioned table's primary key must contain the
+partition key, so it becomes (id, date); ids keep coming from the existing
+sequence.
+
+The copy holds an exclusive lock on stock_prices for its duration. Other
+databases keep the plain table.
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+from app.db import partitions
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e4d2a91c35'
+down_revision = '3f1c9a7b2d10'
+branch_labels = None
+depends_on = None
+
+TABLE = "stock_prices"
+COLUMNS = "id, stock_symbol, date, open, high, low, close, volume"
+
+
+def _columns():
+    return [
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("stock_symbol", sa.String(length=20), sa.ForeignKey("stocks.symbol"), nullable=False),
+        sa.Column("date", sa.DateTime(), nullable=False),
+        sa.Column("open", sa.Float(), nullable=False),
+        sa.Column("high", sa.Float(), nullable=False),
+        sa.Column("low", sa.Float(), nullable=False),
+        sa.Column("close", sa.Float(), nullable=False),
+        sa.Column("volume", sa.Integer(), nullable=False),
+    ]
+
+
+def _move_aside(suffix):
+    """Rename stock_prices and its indexes/constraints out of the way of the new table"""
+    bind = op.get_bind()
+    old = f"{TABLE}{suffix}"
+    op.rename_table(TABLE, old)
+    names = bind.execute(sa.text(
+        "SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = to_regclass(:table)"
+    ), {"table": old}).scalars().all()
+    for name in names:
+        # Renaming the index of a primary key/unique constraint renames the constraint too
+        op.execute(f"ALTER INDEX {name} RENAME TO {name}{suffix}")
+    return old
+
+
+def _id_sequence(table):
+    return op.get_bind().execute(
+        sa.text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table}
+    ).scalar()
+
+
+def _adopt_sequence(old, new):
+    """Let the new table's id default use (and own) the old table's id sequence"""
+    sequence = _id_sequence(old)
+    if sequence is None:
+        sequence = f"{new}_id_seq"
+        op.execute(f"CREATE SEQUENCE IF NOT EXISTS {sequence}")
+        op.execute(f"SELECT setval('{sequence}', COALESCE((SELECT max(id) FROM {old}), 0) + 1, false)")
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+    op.execute(f"ALTER TABLE {new} ALTER COLUMN id SET DEFAULT nextval('{sequence}'::regclass)")
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY {new}.id")
+
+
+def _create_indexes(table):
+    op.create_index("ix_stock_prices_id", table, ["id"])
+    op.create_index("ix_stock_prices_date", table, ["date"])
+    op.create_index(
+        "ix_stock_prices_symbol_date_cover",
+        table,
+        ["stock_symbol", "date"],
+        postgresql_include=["close", "volume"],
+    )
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql" or partitions.is_partitioned(bind):
+        return
+
+    old = _move_aside("_flat")
+    op.create_table(
+        TABLE,
+        *_columns(),
+        sa.PrimaryKeyConstraint("id", "date", name="stock_prices_pkey"),
+        sa.UniqueConstraint("stock_symbol", "date", name="uix_stock_date"),
+        postgresql_partition_by="RANGE (date)",
+    )
+    _adopt_sequence(old, TABLE)
+    _create_indexes(TABLE)
+
+    first, last = bind.execute(sa.text(f"SELECT min(date), max(date) FROM {old}")).one()
+    upcoming = partitions.period_start(datetime.now())
+    for _ in range(settings.PRICE_PARTITIONS_AHEAD):
+        upcoming = partitions.next_period(upcoming)
+    start = min(first or upcoming, datetime.now())
+    end = max(last or upcoming, upcoming)
+    for period in partitions.periods(start, end):
+        op.execute(partitions.partition_ddl(period))
+
+    op.execute(f"INSERT INTO {TABLE} ({COLUMNS}) SELECT {COLUMNS} FROM {old}")
+    op.drop_table(old)
+    op.execute(f"ANALYZE {TABLE}")
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql" or not partitions.is_partitioned(bind):
+        return
+
+    old = _move_aside("_partitioned")
+    op.create_table(
+        TABLE,
+        *_columns(),
+        sa.PrimaryKeyConstraint("id", name="stock_prices_pkey"),
+        sa.UniqueConstraint("stock_symbol", "date", name="uix_stock_date"),
+    )
+    _adopt_sequence(old, TABLE)
+    _create_indexes(TABLE)
+
+    op.execute(f"INSERT INTO {TABLE} ({COLUMNS}) SELECT {COLUMNS} FROM {old}")
+    # Dropping the parent drops all partitions
+    op.drop_table(old)
@@ -1,6 +1,10 @@
 from fastapi import APIRouter
 
-from app.api.endpoints import events
+from app.api.endpoints import analytics, batch, events, stocks, system
 
 api_router = APIRouter()
-api_router.include_router(events.router, prefix="/events", tags=["events"])
\ No newline at end of file
+api_router.include_router(events.router, prefix="/events", tags=["events"])
+api_router.include_router(stocks.router, prefix="/stocks", tags=["stocks"])
+api_router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
+api_router.include_router(batch.router, prefix="/batch", tags=["batch"])
+api_router.include_router(system.router, prefix="/system", tags=["system"])
@@ -1,13 +1,15 @@
-from typing import Generator, Optional
+from typing import Any, AsyncGenerator, Generator
 import os
 from fastapi import Depends
 
+from app.services.event_storage import EventStorage, storage_for
+
 # 根据环境变量决定是否使用数据库
 USE_DATABASE = os.getenv("USE_DATABASE", "false").lower() == "true"
 
 if USE_DATABASE:
-    from app.db.session import SessionLocal
-    
+    from app.db.session import AsyncSessionLocal, SessionLocal
+
     def get_db() -> Generator:
         """获取数据库会话依赖"""
         try:
@@ -15,8 +17,24 @@ if USE_DATABASE:
             yield db
         finally:
             db.close()
+
+    if AsyncSessionLocal is not None:
+        async def get_async_db() -> AsyncGenerator:
+            """获取异步数据库会话依赖"""
+            async with AsyncSessionLocal() as db:
+                yield db
+    else:
+        # 未安装异步驱动: 使用同步会话，由存储层放到线程池执行
+        get_async_db = get_db
 else:
     # 当不使用数据库时，提供一个空的依赖
     async def get_db() -> None:
         """不使用数据库时的空依赖"""
-        return None 
\ No newline at end of file
+        return None
+
+    get_async_db = get_db
+
+
+async def get_event_storage(db: Any = Depends(get_async_db)) -> EventStorage:
+    """事件接口使用的异步存储: 异步数据库会话、线程池中的同步会话或模拟数据"""
+    return storage_for(db)
@@ -0,0 +1,83 @@
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.api.deps import get_db
+from app.core.config import settings
+from app.schemas.analytics import EventStudyResult
+from app.services import event_study
+from app.services.event_study import ReturnModel, StudyWindow
+
+router = APIRouter()
+
+
+def study_window(
+    pre: int = Query(5, ge=0, le=60),
+    post: int = Query(5, ge=0, le=60),
+    estimation: int = Query(120, ge=10, le=750),
+    model: ReturnModel = "market",
+    benchmark: Optional[str] = None,
+) -> StudyWindow:
+    """
+    事件研究窗口参数
+
+    - **pre/post**: 事件窗口为事件日前pre个到后post个交易日
+    - **estimation**: 事件窗口之前用于估计正常收益的交易日数
+    - **model**: 正常收益模型 market/market_adjusted/mean
+    - **benchmark**: 基准股票代码，默认为EVENT_STUDY_BENCHMARK
+    """
+    return StudyWindow(
+        pre=pre,
+        post=post,
+        estimation=estimation,
+        model=model,
+        benchmark=(benchmark or settings.EVENT_STUDY_BENCHMARK).upper(),
+    )
+
+
+@router.get("/event-study", response_model=EventStudyResult)
+def read_event_study(
+    symbol: List[str] = Query(..., min_length=1, max_length=50),
+    min_level: Optional[int] = Query(None, ge=1, le=5),
+    category: Optional[str] = None,
+    impact: Optional[str] = None,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+    include_events: bool = False,
+    window: StudyWindow = Depends(study_window),
+    db: Any = Depends(get_db),
+) -> Any:
+    """
+    多事件的异常收益汇总。
+
+    - **symbol**: 股票代码，可重复传入多个
+    - **min_level/category/impact/start_time/end_time**: 可选，筛选参与汇总的事件
+    - **include_events**: 是否同时返回每个事件的结果
+
+    每只股票的全部事件按窗口参数整体计算并缓存，筛选只作用于缓存结果。
+    """
+    selected = []
+    for name in dict.fromkeys(s.upper() for s in symbol):
+        events = event_study.load_symbol_events(db, name)
+        frame = event_study.get_study(name, events, window)
+        if frame is None:
+            raise HTTPException(status_code=404, detail=f"Stock prices not found: {name}")
+        rows = [
+            row for row, event in enumerate(events)
+            if (min_level is None or event["level"] >= min_level)
+            and (category is None or event["category"] == category)
+            and (impact is None or event["impact"] == impact)
+            and (start_time is None or event["start_time"] >= start_time)
+            and (end_time is None or event["start_time"] <= end_time)
+        ]
+        selected.append((frame, rows))
+
+    models = [frame.model for frame, _ in selected]
+    result = event_study.aggregate(selected, window)
+    result.update(
+        symbols=[frame.symbol for frame, _ in selected],
+        models=models,
+        benchmark=window.benchmark if any(m != "mean" for m in models) else None,
+    )
+    if include_events:
+        result["items"] = [item for frame, rows in selected for item in frame.records(rows)]
+    return result
@@ -0,0 +1,75 @@
+from typing import Any, Dict, Iterator
+
+import orjson
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from app import crud
+from app.api.deps import get_db
+from app.mock_data import events as mock_events
+from app.schemas.batch import BatchRequest
+from app.services import price_service
+from app.services.event_bars import event_bar_index
+from app.services.price_service import PriceQuery
+
+router = APIRouter()
+
+
+# 价格按组批量读取缓存，每组读取完后逐只股票发送
+_PRICE_CHUNK = 25
+
+
+def _results(request: BatchRequest, db: Any) -> Iterator[bytes]:
+    """逐只股票生成NDJSON行，每只股票处理完立即发送"""
+    price_query = None
+    if request.prices is not None:
+        price_query = PriceQuery(**request.prices.model_dump(), format="columns")
+
+    for offset in range(0, len(request.symbols), _PRICE_CHUNK):
+        symbols = request.symbols[offset:offset + _PRICE_CHUNK]
+        prices = price_service.get_many_prices_json(symbols, price_query) if price_query else {}
+
+        for symbol in symbols:
+            line: Dict[str, Any] = {"symbol": symbol, "errors": []}
+            if request.events is not None:
+                query = request.events
+                filters = dict(
+                    stock_symbol=symbol,
+                    min_level=query.min_level,
+                    start_time=query.start_time,
+                    end_time=query.end_time,
+                )
+                if db is not None:
+                    items = crud.event.get_multi_items(db, limit=query.limit, **filters)
+                else:
+                    items = mock_events.get_multi_items(limit=query.limit, **filters)
+                if query.bars:
+                    items = event_bar_index.attach(db, symbol, items)
+                line["events"] = items
+            if price_query is None:
+                yield orjson.dumps(line) + b"\n"
+                continue
+            content = prices[symbol]
+            if content is None:
+                line["errors"].append("Stock prices not found")
+            # 缓存中的价格已经是JSON，直接拼接，不再解析和重新序列化
+            yield orjson.dumps(line)[:-1] + b',"prices":' + (content or b"null") + b"}\n"
+
+
+@router.post("", response_class=StreamingResponse)
+def batch_fetch(
+    request: BatchRequest,
+    db: Any = Depends(get_db),
+) -> Any:
+    """
+    一次请求获取多只股票的事件和价格。
+
+    - **symbols**: 股票代码列表(去重，不区分大小写)
+    - **events**: 每只股票的事件查询参数(limit、min_level、start_time、end_time、bars)，null表示不需要事件
+    - **prices**: 每只股票的价格查询参数(start、end、interval、points、method)，null表示不需要价格
+
+    响应为NDJSON流(application/x-ndjson)，按请求顺序每只股票一行:
+    {"symbol", "events", "prices"(按列的数组), "errors"}。
+    所有股票共用同一个内存事件索引和价格缓存，单只股票没有数据不影响其他股票。
+    """
+    return StreamingResponse(_results(request, db), media_type="application/x-ndjson")
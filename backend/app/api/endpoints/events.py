@@ -1,17 +1,64 @@
-from typing import Any, List, Optional, Literal
-from fastapi import APIRouter, HTTPException, Query
+import json
+from typing import Any, Dict, List, Optional, Literal, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter, ValidationError
 
+from app import crud
+from app.api.deps import get_db, get_event_storage
+from app.api.endpoints.analytics import study_window
 # 导入mock数据模块
 from app.mock_data import events as mock_events
-from app.schemas.event import Event, EventCreate, EventUpdate, EventListItem
+from app.mock_data.event_store import VersionConflict
+from app.schemas.analytics import EventImpactResult
+from app.schemas.event import (
+    Event,
+    EventBulkError,
+    EventBulkResult,
+    EventCreate,
+    EventUpdate,
+    EventListItem,
+)
+from app.services import event_study
+from app.services.event_storage import EventStorage
+from app.services.event_study import StudyWindow
+from app.utils.cursor import decode_cursor, encode_cursor
 
 router = APIRouter()
 
+# 批量创建时一次性校验整个列表
+_event_list_adapter = TypeAdapter(List[EventCreate])
+
+# 下一页游标和总数通过响应头返回，列表响应体保持不变
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+def _parse_cursor(cursor: Optional[str]) -> Optional[Tuple[int, str]]:
+    """解析请求中的游标参数"""
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _set_next_cursor(response: Response, events: List[Any], limit: int) -> None:
+    """当前页已满时，在响应头中返回下一页的游标"""
+    if limit > 0 and len(events) >= limit:
+        last = events[-1]
+        if isinstance(last, dict):
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last["start_time"], last["id"])
+        else:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.start_time, last.id)
+
 
 @router.get("/", response_model=List[EventListItem])
-def read_events(
+async def read_events(
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     stock_symbol: Optional[str] = None,
     min_level: Optional[int] = Query(None, ge=1, le=5),
     max_level: Optional[int] = Query(None, ge=1, le=5),
@@ -20,6 +67,7 @@ def read_events(
     duration_type: Optional[Literal["continuous", "temporary", "sudden"]] = None,
     category: Optional[Literal["company", "industry", "macroeconomic", "market_sentiment"]] = None,
     impact: Optional[Literal["positive", "negative", "neutral"]] = None,
+    storage: EventStorage = Depends(get_event_storage),
 ) -> Any:
     """
     获取事件列表。
@@ -30,10 +78,14 @@ def read_events(
     - **duration_type**: 可选，按事件持续类型过滤(continuous/temporary/sudden)
     - **category**: 可选，按事件分类过滤(company/industry/macroeconomic/market_sentiment)
     - **impact**: 可选，按事件影响类型过滤(positive/negative/neutral)
+    - **cursor**: 可选，上一页响应头X-Next-Cursor中的游标，用于按(start_time, id)翻页
+    
+    符合条件的事件总数在响应头X-Total-Count中返回。
+    
+    列表项直接从存储的数据投影出EventListItem字段并用orjson序列化，
+    不再逐条构建Event模型再做响应校验。
     """
-    events = mock_events.get_multi(
-        skip=skip, 
-        limit=limit,
+    filters = dict(
         stock_symbol=stock_symbol,
         min_level=min_level,
         max_level=max_level,
@@ -43,51 +95,87 @@ def read_events(
         category=category,
         impact=impact
     )
+    position = _parse_cursor(cursor)
+    items = await storage.get_multi_items(skip=skip, limit=limit, cursor=position, **filters)
+    total = await storage.count(**filters)
     
-    return events
+    # 直接返回响应对象，跳过response_model的二次校验
+    result = ORJSONResponse(items)
+    result.headers[TOTAL_COUNT_HEADER] = str(total)
+    _set_next_cursor(result, items, limit)
+    return result
 
 
 @router.get("/stock/{stock_symbol}", response_model=List[Event])
-def read_events_by_stock(
+async def read_events_by_stock(
+    response: Response,
     stock_symbol: str,
     skip: int = 0,
     limit: int = 100,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+    cursor: Optional[str] = None,
+    storage: EventStorage = Depends(get_event_storage),
 ) -> Any:
     """
-    获取特定股票的所有事件。
+    获取特定股票的事件。
     
     - **stock_symbol**: 股票代码
+    - **start_time/end_time**: 可选，按时间范围过滤(Unix时间戳)
+    - **cursor**: 可选，上一页响应头X-Next-Cursor中的游标
+    
+    符合条件的事件总数在响应头X-Total-Count中返回。
     """
-    events = mock_events.get_by_stock_symbol(stock_symbol=stock_symbol)
-    # 应用分页
-    return events[skip:skip + limit]
+    position = _parse_cursor(cursor)
+    events = await storage.get_multi(
+        skip=skip, limit=limit, cursor=position,
+        stock_symbol=stock_symbol, start_time=start_time, end_time=end_time
+    )
+    total = await storage.count(
+        stock_symbol=stock_symbol, start_time=start_time, end_time=end_time
+    )
+    
+    response.headers[TOTAL_COUNT_HEADER] = str(total)
+    _set_next_cursor(response, events, limit)
+    return events
 
 
 @router.get("/timerange", response_model=List[Event])
-def read_events_by_time_range(
+async def read_events_by_time_range(
+    response: Response,
     start_time: int,
     end_time: int,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    storage: EventStorage = Depends(get_event_storage),
 ) -> Any:
     """
-    获取指定时间范围内的所有事件。
+    获取指定时间范围内的事件。
     
     - **start_time**: 开始时间（Unix时间戳）
     - **end_time**: 结束时间（Unix时间戳）
+    - **cursor**: 可选，上一页响应头X-Next-Cursor中的游标
+    
+    符合条件的事件总数在响应头X-Total-Count中返回。
     """
-    events = mock_events.get_by_time_range(
-        start_time=start_time,
-        end_time=end_time
+    position = _parse_cursor(cursor)
+    events = await storage.get_multi(
+        skip=skip, limit=limit, cursor=position,
+        start_time=start_time, end_time=end_time
     )
-    # 应用分页
-    return events[skip:skip + limit]
+    total = await storage.count(start_time=start_time, end_time=end_time)
+    
+    response.headers[TOTAL_COUNT_HEADER] = str(total)
+    _set_next_cursor(response, events, limit)
+    return events
 
 
 @router.post("/", response_model=Event)
-def create_event(
+async def create_event(
     *,
     event_in: EventCreate,
+    storage: EventStorage = Depends(get_event_storage),
 ) -> Any:
     """
     创建新事件。
@@ -107,19 +195,90 @@ def create_event(
     - **urls**: 相关链接列表
     - **impact**: 影响类型(positive/negative/neutral)
     """
-    event = mock_events.create(obj_in=event_in)
+    event = await storage.create(event_in)
     return event
 
 
+def _parse_bulk_body(body: bytes, content_type: str) -> Tuple[List[Any], Dict[int, List[Dict[str, Any]]]]:
+    """解析JSON数组或NDJSON请求体，返回(条目列表, 无法解析的行的错误)"""
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        items: List[Any] = []
+        errors: Dict[int, List[Dict[str, Any]]] = {}
+        # 按行解码，无法解码的行作为该条目的错误，不影响其他行
+        for raw_line in body.splitlines():
+            if not raw_line.strip():
+                continue
+            try:
+                items.append(json.loads(raw_line.decode("utf-8")))
+            except UnicodeDecodeError as e:
+                errors[len(items)] = [{"loc": [], "msg": f"Invalid UTF-8: {e.reason}", "type": "string_unicode"}]
+                items.append(None)
+            except json.JSONDecodeError as e:
+                errors[len(items)] = [{"loc": [], "msg": f"Invalid JSON: {e.msg}", "type": "json_invalid"}]
+                items.append(None)
+        return items, errors
+
+    try:
+        items = json.loads(body)
+    except UnicodeDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid UTF-8: {e.reason}")
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e.msg}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Request body must be a JSON array of events")
+    return items, {}
+
+
+@router.post("/bulk", response_model=EventBulkResult)
+async def create_events_bulk(
+    request: Request,
+    storage: EventStorage = Depends(get_event_storage),
+) -> Any:
+    """
+    批量创建事件。
+    
+    请求体可以是EventCreate对象的JSON数组，也可以是NDJSON
+    (Content-Type: application/x-ndjson，每行一个事件)。
+    
+    所有条目一次性校验，未通过校验的条目在**errors**中按位置返回，
+    不影响其余条目写入。写入时数据库模式只提交一次事务，
+    模拟数据模式每个股票只写一次文件。
+    """
+    items, errors = _parse_bulk_body(await request.body(), request.headers.get("content-type", ""))
+
+    try:
+        valid_indexes = [i for i in range(len(items)) if i not in errors]
+        objs_in = _event_list_adapter.validate_python([items[i] for i in valid_indexes])
+    except ValidationError as e:
+        for error in e.errors():
+            index = valid_indexes[error["loc"][0]]
+            errors.setdefault(index, []).append({
+                "loc": list(error["loc"][1:]),
+                "msg": error["msg"],
+                "type": error["type"],
+            })
+        valid_indexes = [i for i in valid_indexes if i not in errors]
+        objs_in = _event_list_adapter.validate_python([items[i] for i in valid_indexes])
+
+    ids = await storage.create_multi(objs_in)
+
+    return EventBulkResult(
+        created=len(ids),
+        ids=ids,
+        errors=[EventBulkError(index=i, errors=errors[i]) for i in sorted(errors)],
+    )
+
+
 @router.get("/{event_id}", response_model=Event)
-def read_event(
+async def read_event(
     *,
     event_id: str,
+    storage: EventStorage = Depends(get_event_storage),
 ) -> Any:
     """
     通过ID获取特定事件。
     """
-    event = mock_events.get(event_id=event_id)
+    event = await storage.get(event_id)
     if not event:
         raise HTTPException(
             status_code=404,
@@ -128,11 +287,42 @@ def read_event(
     return event
 
 
+@router.get("/{event_id}/impact", response_model=EventImpactResult)
+def read_event_impact(
+    *,
+    event_id: str,
+    window: StudyWindow = Depends(study_window),
+    db: Any = Depends(get_db),
+) -> Any:
+    """
+    获取事件前后的收益率、异常收益率(AR)和累计异常收益率(CAR)。
+
+    - **pre/post/estimation/model/benchmark**: 窗口和正常收益模型参数
+
+    同一股票的全部事件一次性计算并按窗口参数缓存。
+    计算以CPU为主，保持同步处理函数，由FastAPI放到线程池执行。
+    """
+    event = crud.event.get(db, event_id=event_id) if db is not None else mock_events.get(event_id=event_id)
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+    symbol = event.stock_symbol
+    frame = event_study.get_study(symbol, event_study.load_symbol_events(db, symbol), window)
+    if frame is None or event_id not in frame.rows:
+        raise HTTPException(status_code=404, detail="Stock prices not found")
+    return {
+        **frame.records([frame.rows[event_id]])[0],
+        "model": frame.model,
+        "benchmark": window.benchmark if frame.model != "mean" else None,
+        "offsets": window.offsets.tolist(),
+    }
+
+
 @router.put("/{event_id}", response_model=Event)
-def update_event(
+async def update_event(
     *,
     event_id: str,
     event_in: EventUpdate,
+    storage: EventStorage = Depends(get_event_storage),
 ) -> Any:
     """
     更新事件。
@@ -149,32 +339,36 @@ def update_event(
     - **sources**: 消息来源列表
     - **urls**: 相关链接列表
     - **impact**: 影响类型(positive/negative/neutral)
+    - **version**: 读取到的事件版本号，提供时与当前版本不一致返回409，需重新读取后再提交
     """
-    event = mock_events.get(event_id=event_id)
+    try:
+        event = await storage.update(event_id, event_in)
+    except VersionConflict as e:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Event version conflict: current version is {e.current}"
+        )
     if not event:
         raise HTTPException(
             status_code=404,
             detail="Event not found"
         )
-    
-    event = mock_events.update(event_id=event_id, obj_in=event_in)
     return event
 
 
 @router.delete("/{event_id}", response_model=Event)
-def delete_event(
+async def delete_event(
     *,
     event_id: str,
+    storage: EventStorage = Depends(get_event_storage),
 ) -> Any:
     """
     删除事件。
     """
-    event = mock_events.get(event_id=event_id)
+    event = await storage.remove(event_id)
     if not event:
         raise HTTPException(
             status_code=404,
             detail="Event not found"
         )
-    
-    event = mock_events.remove(event_id=event_id)
     return event 
\ No newline at end of file
@@ -0,0 +1,110 @@
+from datetime import date, datetime
+from typing import Any, List, Literal, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import ORJSONResponse
+
+from app import crud
+from app.api.deps import get_db
+from app.mock_data import events as mock_events
+from app.schemas.event import EventBarItem
+from app.schemas.stock import PriceColumns, Stock, StockPriceBase
+from app.services import price_service
+from app.services.event_bars import event_bar_index
+from app.services.price_service import PriceQuery
+from app.utils import csv_utils
+from app.utils.downsample import DownsampleMethod, Interval
+
+router = APIRouter()
+
+
+@router.get("/", response_model=List[Stock])
+def read_stocks(
+    skip: int = 0,
+    limit: int = 100,
+    market: Optional[str] = None,
+) -> Any:
+    """
+    获取有本地价格数据的股票列表。
+
+    - **market**: 可选，按市场过滤
+    """
+    return csv_utils.get_filtered_stocks(skip=skip, limit=limit, market=market)
+
+
+@router.get("/{symbol}", response_model=Stock)
+def read_stock(symbol: str) -> Any:
+    """
+    获取特定股票的基本信息。
+    """
+    stock = csv_utils.get_stock_by_symbol(symbol)
+    if not stock:
+        raise HTTPException(
+            status_code=404,
+            detail="Stock not found"
+        )
+    return stock
+
+
+@router.get(
+    "/{symbol}/prices",
+    response_class=Response,
+    responses={200: {
+        "model": Union[List[StockPriceBase], PriceColumns],
+        "description": "format=records时为逐行对象列表，format=columns时为按列的数组",
+        "content": {"application/json": {}},
+    }},
+)
+def read_stock_prices(
+    symbol: str,
+    start: Union[datetime, date, None] = None,
+    end: Union[datetime, date, None] = None,
+    interval: Interval = "1d",
+    points: Optional[int] = Query(None, ge=3, le=10000),
+    method: DownsampleMethod = "lttb",
+    format: Literal["records", "columns"] = "records",
+) -> Any:
+    """
+    获取股票历史价格。
+
+    - **start/end**: 可选，日期范围(YYYY-MM-DD、ISO时间或Unix时间戳，闭区间)
+    - **interval**: K线周期，1d(日线)、1w(周线)或1mo(月线)，周线和月线由日线聚合
+    - **points**: 可选，最多返回的点数，超出时按method降采样
+    - **method**: 降采样方法，lttb(保持折线形状)或minmax(保留每段的最高/最低点)
+    - **format**: records返回逐行对象列表；columns返回按列的数组
+      ({"stock_symbol", "date"(Unix时间戳), "open", "high", "low", "close", "volume"})，体积更小
+    """
+    query = PriceQuery(start=start, end=end, interval=interval, points=points, method=method, format=format)
+    # 结果按价格文件状态和查询参数缓存在共享缓存中
+    content = price_service.get_prices_json(symbol, query)
+    if content is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Stock prices not found"
+        )
+    return Response(content=content, media_type="application/json")
+
+
+@router.get("/{symbol}/events", response_model=List[EventBarItem])
+def read_stock_events(
+    symbol: str,
+    skip: int = 0,
+    limit: int = 100,
+    min_level: Optional[int] = Query(None, ge=1, le=5),
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+    db: Any = Depends(get_db),
+) -> Any:
+    """
+    获取股票的事件及其在K线上的位置。
+
+    - **min_level/start_time/end_time**: 可选，过滤条件
+
+    每个事件带有bar_index(价格序列中的交易日下标，与/prices的日线顺序一致)、
+    bar_date和close。周末和节假日的事件对齐到下一个交易日，晚于最新价格的事件为null。
+    """
+    filters = dict(stock_symbol=symbol, min_level=min_level, start_time=start_time, end_time=end_time)
+    if db is not None:
+        items = crud.event.get_multi_items(db, skip=skip, limit=limit, **filters)
+    else:
+        items = mock_events.get_multi_items(skip=skip, limit=limit, **filters)
+    return ORJSONResponse(event_bar_index.attach(db, symbol, items))
@@ -0,0 +1,29 @@
+from typing import Any
+from fastapi import APIRouter
+
+from app.api.deps import USE_DATABASE
+from app.schemas.system import PoolMetricsResult
+
+router = APIRouter()
+
+
+@router.get("/pool", response_model=PoolMetricsResult, response_model_by_alias=True)
+def read_pool_metrics() -> Any:
+    """
+    数据库连接池统计。
+
+    返回同步和异步引擎连接池的当前借出数、溢出数，以及启动以来的取连接次数、
+    超时次数和等待时间(平均、最近95分位、最大)，用于按实际负载设置
+    SQLITE_POOL_SIZE/POSTGRES_POOL_SIZE等参数。模拟数据模式下database为false。
+    """
+    if not USE_DATABASE:
+        return PoolMetricsResult(database=False)
+
+    from app.db.pool import pool_status
+    from app.db.session import async_engine, async_pool_metrics, engine, pool_metrics
+
+    return PoolMetricsResult(
+        database=True,
+        sync=pool_status(engine, pool_metrics),
+        async_=pool_status(async_engine.sync_engine if async_engine is not None else None, async_pool_metrics),
+    )
@@ -0,0 +1,399 @@
+"""
+可替换后端的共享缓存
+
+后端(CACHE_BACKEND):
+    memory:    进程内LRU，每个worker各自一份
+    redis:     使用REDIS_*配置的Redis，多个worker共享同一份缓存
+    fakeredis: 进程内模拟的Redis客户端，走与redis相同的代码路径，用于测试和本地开发
+
+SharedCache在后端之上提供:
+    - get_many: 一次往返读取多个键(Redis为MGET)
+    - get_or_load: 防击穿，同一个键同时只有一个调用方执行加载，其他调用方等待结果
+    - version/bump: 按命名空间和股票的版本号，版本号写进缓存键，递增后旧条目自然失效
+"""
+import fnmatch
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+
+class CacheBackend(ABC):
+    """缓存后端接口，键为字符串，值为bytes"""
+
+    # 是否在本进程内完成(不需要放到线程池执行以免阻塞事件循环)
+    local = True
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def mset(self, items: Dict[str, bytes], ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def incr(self, key: str) -> int:
+        """计数器加一并返回新值，计数器不参与淘汰"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def lock(self, key: str, timeout: float) -> Any:
+        """
+        返回互斥锁的上下文管理器，进入时得到是否在timeout秒内获得了锁
+
+        锁最多持有timeout秒，持有者异常退出时不会永久阻塞其他调用方
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """进程内LRU缓存，条目数超过max_entries时淘汰最久未使用的条目"""
+
+    # 键锁按哈希分段，避免为每个键创建锁
+    LOCK_STRIPES = 64
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Optional[float], bytes]]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._key_locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+
+    def _get(self, key: str, now: float) -> Optional[bytes]:
+        if key in self._counters:
+            return str(self._counters[key]).encode()
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires is not None and expires <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self._get(key, time.monotonic())
+
+    def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        now = time.monotonic()
+        with self._lock:
+            return [self._get(key, now) for key in keys]
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self.mset({key: value}, ttl)
+
+    def mset(self, items: Dict[str, bytes], ttl: Optional[float] = None) -> None:
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            for key, value in items.items():
+                self._entries[key] = (expires, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+                self._counters.pop(key, None)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    @contextmanager
+    def lock(self, key: str, timeout: float) -> Iterator[bool]:
+        lock = self._key_locks[zlib.crc32(key.encode()) % self.LOCK_STRIPES]
+        acquired = lock.acquire(timeout=timeout)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                lock.release()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+
+class RedisCache(CacheBackend):
+    """
+    Redis缓存后端
+
+    client为redis.Redis(或接口相同的FakeRedis)，所有键加上prefix前缀，
+    批量写入用不带事务的pipeline一次发送
+    """
+
+    local = False
+
+    def __init__(self, client: Any, prefix: str = ""):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        if not keys:
+            return []
+        return self.client.mget([self.prefix + key for key in keys])
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self.client.set(self.prefix + key, value, px=int(ttl * 1000) if ttl else None)
+
+    def mset(self, items: Dict[str, bytes], ttl: Optional[float] = None) -> None:
+        if not items:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipe.set(self.prefix + key, value, px=int(ttl * 1000) if ttl else None)
+        pipe.execute()
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(self.prefix + key))
+
+    @contextmanager
+    def lock(self, key: str, timeout: float) -> Iterator[bool]:
+        lock = self.client.lock(self.prefix + "lock:" + key, timeout=timeout, blocking_timeout=timeout)
+        acquired = lock.acquire()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                try:
+                    lock.release()
+                except Exception:
+                    # 锁已超时被释放
+                    pass
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+class FakeRedis:
+    """
+    进程内模拟的Redis客户端
+
+    只实现RedisCache用到的命令(get/mget/set/delete/incr/pipeline/lock/scan_iter)，
+    行为与redis-py一致: 值以bytes返回，px为毫秒过期时间
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[Optional[float], bytes]] = {}
+        self._lock = threading.RLock()
+
+    def _alive(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires is not None and expires <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def get(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            return self._alive(name)
+
+    def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        with self._lock:
+            return [self._alive(key) for key in keys]
+
+    def set(self, name: str, value: Any, ex: Optional[float] = None, px: Optional[int] = None, nx: bool = False) -> bool:
+        if isinstance(value, str):
+            value = value.encode()
+        elif not isinstance(value, bytes):
+            value = str(value).encode()
+        ttl = ex if ex is not None else (px / 1000 if px is not None else None)
+        with self._lock:
+            if nx and self._alive(name) is not None:
+                return False
+            self._data[name] = (time.monotonic() + ttl if ttl is not None else None, value)
+            return True
+
+    def delete(self, *names: str) -> int:
+        with self._lock:
+            return sum(self._data.pop(name, None) is not None for name in names)
+
+    def incr(self, name: str, amount: int = 1) -> int:
+        with self._lock:
+            value = int(self._alive(name) or 0) + amount
+            expires = self._data[name][0] if name in self._data else None
+            self._data[name] = (expires, str(value).encode())
+            return value
+
+    def scan_iter(self, match: Optional[str] = None) -> Iterator[str]:
+        with self._lock:
+            keys = [key for key in self._data if self._alive(key) is not None]
+        return iter([key for key in keys if match is None or fnmatch.fnmatchcase(key, match)])
+
+    def pipeline(self, transaction: bool = True) -> "_FakePipeline":
+        return _FakePipeline(self)
+
+    def lock(self, name: str, timeout: Optional[float] = None, blocking_timeout: Optional[float] = None) -> "_FakeLock":
+        return _FakeLock(self, name, timeout, blocking_timeout)
+
+
+class _FakePipeline:
+    """缓存命令，execute时依次执行"""
+
+    def __init__(self, client: FakeRedis):
+        self._client = client
+        self._commands: List[Tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str) -> Callable[..., "_FakePipeline"]:
+        def command(*args: Any, **kwargs: Any) -> "_FakePipeline":
+            self._commands.append((name, args, kwargs))
+            return self
+        return command
+
+    def execute(self) -> List[Any]:
+        commands, self._commands = self._commands, []
+        return [getattr(self._client, name)(*args, **kwargs) for name, args, kwargs in commands]
+
+
+class _FakeLock:
+    """用SET NX PX实现的锁，与redis-py的Lock一样按令牌释放"""
+
+    def __init__(self, client: FakeRedis, name: str, timeout: Optional[float], blocking_timeout: Optional[float]):
+        self._client = client
+        self._name = name
+        self._timeout = timeout
+        self._blocking_timeout = blocking_timeout
+        self._token = f"{id(self)}:{time.monotonic()}".encode()
+
+    def acquire(self) -> bool:
+        deadline = None if self._blocking_timeout is None else time.monotonic() + self._blocking_timeout
+        px = int(self._timeout * 1000) if self._timeout else None
+        while not self._client.set(self._name, self._token, px=px, nx=True):
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def release(self) -> None:
+        with self._client._lock:
+            if self._client.get(self._name) == self._token:
+                self._client.delete(self._name)
+
+
+def create_backend(name: str) -> CacheBackend:
+    """
+    按名称创建缓存后端
+
+    参数:
+        name: memory、redis或fakeredis
+    """
+    if name == "memory":
+        return MemoryCache(settings.CACHE_MAX_ENTRIES)
+    if name == "fakeredis":
+        return RedisCache(FakeRedis(), settings.CACHE_KEY_PREFIX)
+    if name == "redis":
+        import redis
+
+        client = redis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            password=settings.REDIS_PASSWORD,
+        )
+        return RedisCache(client, settings.CACHE_KEY_PREFIX)
+    raise ValueError(f"Unknown cache backend: {name}")
+
+
+class SharedCache:
+    """缓存后端之上的批量读取、防击穿加载和版本号"""
+
+    def __init__(self, backend: CacheBackend, default_ttl: Optional[float] = 300.0, lock_timeout: float = 10.0):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.lock_timeout = lock_timeout
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.backend.get(key)
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        """一次往返读取多个键"""
+        return self.backend.mget(keys)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self.backend.set(key, value, self.default_ttl if ttl is None else ttl)
+
+    def set_many(self, items: Dict[str, bytes], ttl: Optional[float] = None) -> None:
+        self.backend.mset(items, self.default_ttl if ttl is None else ttl)
+
+    def get_or_load(self, key: str, loader: Callable[[], Optional[bytes]], ttl: Optional[float] = None) -> Optional[bytes]:
+        """
+        读取缓存，未命中时加载并写入
+
+        同一个键在所有共享该后端的进程中同时只有一个调用方执行loader，
+        其他调用方等锁释放后直接读取写入的结果。等锁超时时自行加载。
+        loader返回None时不写入缓存
+        """
+        value = self.backend.get(key)
+        if value is not None:
+            return value
+        with self.backend.lock(key, self.lock_timeout):
+            # 等锁期间可能已经由其他调用方加载完成
+            value = self.backend.get(key)
+            if value is not None:
+                return value
+            value = loader()
+            if value is not None:
+                self.set(key, value, ttl)
+            return value
+
+    @staticmethod
+    def _version_key(namespace: str, name: Optional[str]) -> str:
+        return f"version:{namespace}" if name is None else f"version:{namespace}:{name}"
+
+    def version(self, namespace: str, name: Optional[str] = None) -> int:
+        """命名空间(及其下某个名称)的当前版本号"""
+        value = self.backend.get(self._version_key(namespace, name))
+        return int(value) if value is not None else 0
+
+    def bump(self, namespace: str, name: Optional[str] = None) -> None:
+        """递增版本号，名称的版本号和命名空间的全局版本号同时递增"""
+        if name is not None:
+            self.backend.incr(self._version_key(namespace, name))
+        self.backend.incr(self._version_key(namespace, None))
+
+
+shared_cache = SharedCache(
+    create_backend(settings.CACHE_BACKEND),
+    default_ttl=settings.CACHE_DEFAULT_TTL,
+    lock_timeout=settings.CACHE_LOCK_TIMEOUT,
+)
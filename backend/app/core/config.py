@@ -1,6 +1,6 @@
 import os
 import secrets
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Literal, Optional, Union
 
 from pydantic import AnyHttpUrl, PostgresDsn, field_validator, validator
 from pydantic_settings import BaseSettings
@@ -57,6 +57,35 @@ class Settings(BaseSettings):
                 path=f"/{values.get('POSTGRES_DB') or ''}",
             )
     
+    # 连接池设置，按数据库类型分别配置大小
+    # SQLite只有一个写入者，连接多了只会互相等待
+    SQLITE_POOL_SIZE: int = 5
+    SQLITE_MAX_OVERFLOW: int = 0
+    POSTGRES_POOL_SIZE: int = 10
+    POSTGRES_MAX_OVERFLOW: int = 20
+    # 取连接的最长等待时间(秒)
+    DB_POOL_TIMEOUT: float = 30.0
+    # 连接使用多久后重建(秒)，-1表示不重建；代替每次取连接时的pre-ping往返
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = False
+    # SQLAlchemy编译后SQL语句的缓存条数
+    DB_STATEMENT_CACHE_SIZE: int = 1000
+    # asyncpg每个连接缓存的预编译语句数
+    POSTGRES_STATEMENT_CACHE_SIZE: int = 256
+    # psycopg同一语句执行到第几次时在服务端预编译，None表示不预编译
+    POSTGRES_PREPARE_THRESHOLD: Optional[int] = 5
+    # SQLite连接参数: WAL日志、同步级别、内存映射大小(字节)和锁等待时间(毫秒)
+    SQLITE_WAL: bool = True
+    SQLITE_SYNCHRONOUS: Literal["OFF", "NORMAL", "FULL"] = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+
+    # PostgreSQL上stock_prices按date分区的粒度(日线用year，分钟线用month)，
+    # 已有分区后不能再修改
+    PRICE_PARTITION_INTERVAL: Literal["month", "year"] = "year"
+    # 启动时提前创建的后续分区数
+    PRICE_PARTITIONS_AHEAD: int = 1
+
     # CORS设置
     BACKEND_CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:8080"]
 
@@ -76,6 +105,17 @@ class Settings(BaseSettings):
             return v
         return []  # 返回默认空列表而不是抛出错误
     
+    # 模拟数据设置
+    # 模拟数据目录，默认为app/mock_data/data；多个worker必须指向同一个目录
+    MOCK_DATA_DIR: Optional[str] = None
+    # 内存事件库检查数据文件变更的最小间隔(秒)
+    MOCK_EVENTS_CHECK_INTERVAL: float = 1.0
+    # 单个股票的事件日志累计多少条记录后合并回快照文件
+    MOCK_EVENTS_JOURNAL_COMPACT_THRESHOLD: int = 100
+    
+    # 同步处理函数和run_in_threadpool共用的线程池大小(AnyIO默认40)
+    THREADPOOL_SIZE: int = 40
+    
     # 股票数据API设置
     STOCK_API_BASE_URL: str = "https://query1.finance.yahoo.com"
     
@@ -84,6 +124,15 @@ class Settings(BaseSettings):
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
     REDIS_PASSWORD: Optional[str] = None
+    # 共享缓存后端: memory(进程内LRU)、redis(多个worker共享)、fakeredis(进程内模拟Redis)
+    CACHE_BACKEND: Literal["memory", "redis", "fakeredis"] = "memory"
+    CACHE_KEY_PREFIX: str = "stock_reason:"
+    # memory后端的最大条目数
+    CACHE_MAX_ENTRIES: int = 10000
+    # 缓存条目默认过期时间(秒)
+    CACHE_DEFAULT_TTL: float = 300.0
+    # 防击穿加载时等待其他调用方的最长时间(秒)，也是锁的最长持有时间
+    CACHE_LOCK_TIMEOUT: float = 10.0
     
     # 用户管理设置
     FIRST_SUPERUSER: str = "admin@example.com"
@@ -116,6 +165,36 @@ class Settings(BaseSettings):
     # LLM设置
     DEFAULT_LLM_NAME: str = "gpt-3.5-turbo"
     DEFAULT_PROMPT_VERSION: str = "v1"
+    # 批量分析的最大并发请求数
+    LLM_MAX_CONCURRENCY: int = 8
+    # 每分钟请求数和token数上限，0表示不限制
+    LLM_REQUESTS_PER_MINUTE: int = 500
+    LLM_TOKENS_PER_MINUTE: int = 200000
+    # 可重试错误的最大重试次数
+    LLM_MAX_RETRIES: int = 3
+    # 打包模式下单个请求的token预算和最多包含的新闻篇数
+    LLM_PACK_TOKEN_BUDGET: int = 6000
+    LLM_PACK_MAX_ARTICLES: int = 20
+    # 本地模拟LLM每次调用的延迟(秒)
+    LLM_MOCK_LATENCY: float = 0.0
+    # 分析结果缓存(按新闻内容、股票、模型和提示词版本)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_FILE: Optional[str] = None  # 默认为backend/data/llm_analysis_cache.sqlite3
+    LLM_CACHE_MAX_ENTRIES: int = 100000
+    # sqlite: 本机SQLite文件; shared: 存放在CACHE_BACKEND共享缓存中(多台机器的worker共享)
+    LLM_CACHE_BACKEND: Literal["sqlite", "shared"] = "sqlite"
+    # shared模式下分析结果的过期时间(秒)
+    LLM_CACHE_TTL: float = 7 * 86400
+
+    # 事件接口的响应缓存(ETag/304)
+    RESPONSE_CACHE_ENABLED: bool = True
+    # 缓存项的最长有效时间(秒)，数据库模式下其他进程的写入最多延迟这么久可见
+    RESPONSE_CACHE_TTL: float = 60.0
+    # 响应头Cache-Control的max-age(秒)，0表示客户端每次都要用If-None-Match验证
+    RESPONSE_CACHE_MAX_AGE: int = 0
+
+    # 事件研究(异常收益)市场模型使用的基准股票代码
+    EVENT_STUDY_BENCHMARK: str = "SPY"
 
     model_config = {
         "case_sensitive": True,
@@ -0,0 +1,240 @@
+"""
+事件接口的响应缓存和条件GET
+
+GET请求按 数据版本号 + 路径 + 排序后的查询参数 把完整的响应体和响应头存入共享缓存
+(见app/core/cache.py)，版本号(见app/core/versions.py)变化后旧条目不再被读到。
+命中时直接返回缓存的响应; 请求带If-None-Match且与ETag一致时返回304，不查询存储也不重新序列化。
+同一个键同时只有一个请求计算响应，其他请求等待其结果。
+
+ETag是缓存的响应头(X-Total-Count、X-Next-Cursor等)和响应体的哈希(强ETag)，
+同样的数据在不同进程和重新计算后ETag不变; 304响应同样带上这些响应头。
+条目在RESPONSE_CACHE_TTL秒后过期，作为数据库模式下其他进程写入(不经过版本号)的兜底。
+"""
+import asyncio
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+import orjson
+from fastapi.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.cache import SharedCache, shared_cache
+from app.core.config import settings
+from app.core.versions import DataVersions, event_versions
+
+Headers = List[Tuple[bytes, bytes]]
+# (路径匹配结果, 查询参数) -> 版本号
+VersionFunc = Callable[[re.Match, Dict[str, str]], Any]
+
+# 不缓存、由服务端重新生成的响应头
+_SKIPPED_HEADERS = {b"content-length", b"etag", b"cache-control", b"date", b"server"}
+# 304响应没有响应体，不带描述响应体的头
+_BODY_HEADERS = {b"content-type", b"content-encoding"}
+
+
+@dataclass
+class CachedResponse:
+    etag: bytes
+    headers: Headers
+    body: bytes
+
+    def dumps(self) -> bytes:
+        """序列化为 JSON头部 + 换行 + 响应体"""
+        head = orjson.dumps({
+            "etag": self.etag.decode("latin-1"),
+            "headers": [[k.decode("latin-1"), v.decode("latin-1")] for k, v in self.headers],
+        })
+        return head + b"\n" + self.body
+
+    @classmethod
+    def loads(cls, data: bytes) -> "CachedResponse":
+        head, body = data.split(b"\n", 1)
+        meta = orjson.loads(head)
+        return cls(
+            etag=meta["etag"].encode("latin-1"),
+            headers=[(k.encode("latin-1"), v.encode("latin-1")) for k, v in meta["headers"]],
+            body=body,
+        )
+
+
+def make_etag(body: bytes, headers: Headers = ()) -> bytes:
+    """响应头和响应体的强ETag，总数或翻页游标变化时ETag也变化"""
+    digest = hashlib.blake2b(digest_size=16)
+    for name, value in headers:
+        digest.update(name.lower() + b":" + value + b"\n")
+    digest.update(b"\n")
+    digest.update(body)
+    return b'"' + digest.hexdigest().encode() + b'"'
+
+
+def etag_matches(if_none_match: bytes, etag: bytes) -> bool:
+    """If-None-Match是否包含etag(GET请求按弱比较，忽略W/前缀)"""
+    for candidate in if_none_match.split(b","):
+        candidate = candidate.strip()
+        if candidate == b"*" or candidate.removeprefix(b"W/") == etag:
+            return True
+    return False
+
+
+def cache_key(path: str, query_string: bytes) -> str:
+    """路径加上按名称排序的查询参数，参数顺序不同的请求共用缓存"""
+    params = sorted(parse_qsl(query_string.decode("latin-1"), keep_blank_values=False))
+    return f"{path}?{urlencode(params)}" if params else path
+
+
+class ResponseCacheMiddleware:
+    """
+    ASGI中间件: 按规则缓存GET响应
+
+    rules为(路径正则, 版本函数)列表，只有匹配的路径会被缓存，版本函数返回的值是缓存键的一部分
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        rules: List[Tuple[str, VersionFunc]],
+        versions: DataVersions = event_versions,
+        cache: SharedCache = shared_cache,
+        ttl: float = 60.0,
+        max_age: int = 0,
+    ):
+        self.app = app
+        self.rules = [(re.compile(pattern), func) for pattern, func in rules]
+        self.versions = versions
+        self.cache = cache
+        self.ttl = ttl
+        self.cache_control = (
+            f"max-age={max_age}, must-revalidate" if max_age > 0 else "no-cache"
+        ).encode()
+        # 本进程内正在计算的缓存键
+        self._inflight: Dict[str, "asyncio.Future[Optional[CachedResponse]]"] = {}
+
+    def _match(self, path: str) -> Optional[Tuple[re.Match, VersionFunc]]:
+        for pattern, func in self.rules:
+            match = pattern.match(path)
+            if match:
+                return match, func
+        return None
+
+    async def _call(self, func: Callable[..., Any], *args: Any) -> Any:
+        """本进程内的后端直接调用，远程后端放到线程池，避免阻塞事件循环"""
+        if self.cache.backend.local:
+            return func(*args)
+        return await run_in_threadpool(func, *args)
+
+    def _lookup_key(self, match: re.Match, version_func: VersionFunc, scope: Scope) -> str:
+        query = dict(parse_qsl(scope["query_string"].decode("latin-1")))
+        # 版本号在计算响应之前读取，计算期间发生的写入会让这次的缓存项在下次请求时失效
+        version = version_func(match, query)
+        return f"response:{version!r}:{cache_key(scope['path'], scope['query_string'])}"
+
+    async def _send_entry(self, send: Send, entry: CachedResponse, if_none_match: Optional[bytes]) -> None:
+        cache_headers = [(b"etag", entry.etag), (b"cache-control", self.cache_control)]
+        if if_none_match is not None and etag_matches(if_none_match, entry.etag):
+            headers = [(k, v) for k, v in entry.headers if k.lower() not in _BODY_HEADERS] + cache_headers
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        headers = entry.headers + cache_headers + [(b"content-length", str(len(entry.body)).encode())]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": entry.body})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        matched = self._match(scope["path"])
+        if matched is None:
+            await self.app(scope, receive, send)
+            return
+
+        # 刷新可能需要检查文件，到期时才放到线程池执行
+        if self.versions.refresh_due():
+            await run_in_threadpool(self.versions.refresh)
+        key = await self._call(self._lookup_key, *matched, scope)
+        if_none_match = dict(scope["headers"]).get(b"if-none-match")
+
+        data = await self._call(self.cache.get, key)
+        if data is not None:
+            await self._send_entry(send, CachedResponse.loads(data), if_none_match)
+            return
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            # 同一个响应正在计算，等待其结果(计算失败或不可缓存时自己再算一次)
+            entry = await asyncio.shield(inflight)
+            if entry is not None:
+                await self._send_entry(send, entry, if_none_match)
+                return
+
+        future: "asyncio.Future[Optional[CachedResponse]]" = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        entry = None
+        try:
+            start: Dict[str, Any] = {}
+            chunks: List[bytes] = []
+
+            async def capture(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    start.update(message)
+                elif message["type"] == "http.response.body":
+                    chunks.append(message.get("body", b""))
+
+            await self.app(scope, receive, capture)
+
+            body = b"".join(chunks)
+            if start.get("status") != 200:
+                await send(start)
+                await send({"type": "http.response.body", "body": body})
+                return
+
+            headers = [(k, v) for k, v in start.get("headers", []) if k.lower() not in _SKIPPED_HEADERS]
+            entry = CachedResponse(etag=make_etag(body, headers), headers=headers, body=body)
+            await self._call(self.cache.set, key, entry.dumps(), self.ttl)
+        finally:
+            self._inflight.pop(key, None)
+            future.set_result(entry)
+        await self._send_entry(send, entry, if_none_match)
+
+
+def _symbol_version(group: str) -> VersionFunc:
+    return lambda match, query: event_versions.get(match.group(group))
+
+
+def _events_version(match: re.Match, query: Dict[str, str]) -> Any:
+    # 按股票过滤的列表只依赖该股票的版本号
+    return event_versions.get(query.get("stock_symbol"))
+
+
+def _stock_events_version(match: re.Match, query: Dict[str, str]) -> Any:
+    # 响应中的bar_index和close还依赖价格文件
+    from app.utils import csv_utils
+
+    symbol = match.group("symbol")
+    return event_versions.get(symbol), csv_utils.price_state(symbol)
+
+
+def event_cache_rules(prefix: str) -> List[Tuple[str, VersionFunc]]:
+    """事件相关GET接口的缓存规则(事件影响分析依赖价格数据，不在此缓存)"""
+    prefix = re.escape(prefix)
+    return [
+        (rf"^{prefix}/events/stock/(?P<symbol>[^/]+)/?$", _symbol_version("symbol")),
+        (rf"^{prefix}/stocks/(?P<symbol>[^/]+)/events/?$", _stock_events_version),
+        (rf"^{prefix}/events/?$", _events_version),
+        (rf"^{prefix}/events/(?!bulk/?$)[^/]+/?$", lambda match, query: event_versions.get()),
+    ]
+
+
+def add_response_cache(app: Any) -> None:
+    """按配置给应用加上事件接口的响应缓存"""
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return
+    app.add_middleware(
+        ResponseCacheMiddleware,
+        rules=event_cache_rules(settings.API_V1_STR),
+        ttl=settings.RESPONSE_CACHE_TTL,
+        max_age=settings.RESPONSE_CACHE_MAX_AGE,
+    )
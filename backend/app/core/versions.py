@@ -0,0 +1,49 @@
+"""
+按股票的数据版本号
+
+事件创建、更新、删除时递增对应股票的版本号和全局版本号，响应缓存把版本号写进缓存键，
+版本号变化后旧的缓存条目不再被读到。
+版本号存放在共享缓存后端中，使用redis后端时多个worker看到同一组版本号;
+存储层可以注册刷新函数，在读取版本号前把其他进程对文件的修改同步进来。
+"""
+from typing import Callable, List, Optional, Tuple
+
+from app.core.cache import SharedCache, shared_cache
+
+
+class DataVersions:
+    """某类数据按股票和全局的版本号"""
+
+    def __init__(self, namespace: str, cache: SharedCache = shared_cache):
+        self.namespace = namespace
+        self.cache = cache
+        # (刷新函数, 是否到期检查函数)
+        self._refreshers: List[Tuple[Callable[[], None], Optional[Callable[[], bool]]]] = []
+
+    def bump(self, symbol: Optional[str] = None) -> None:
+        """递增某只股票的版本号，同时递增全局版本号"""
+        self.cache.bump(self.namespace, symbol)
+
+    def get(self, symbol: Optional[str] = None) -> int:
+        """获取某只股票的版本号，symbol为None时返回全局版本号"""
+        return self.cache.version(self.namespace, symbol)
+
+    def add_refresher(self, callback: Callable[[], None], due: Optional[Callable[[], bool]] = None) -> None:
+        """
+        注册读取版本号前调用的刷新函数(例如按时间间隔检查文件变化的存储)
+
+        due返回刷新是否需要做实际工作(访问磁盘等)，不提供时认为总是需要
+        """
+        self._refreshers.append((callback, due))
+
+    def refresh_due(self) -> bool:
+        """是否有刷新函数需要执行，为False时可以跳过refresh"""
+        return any(due is None or due() for _, due in self._refreshers)
+
+    def refresh(self) -> None:
+        for callback, _ in self._refreshers:
+            callback()
+
+
+# 事件数据的版本号
+event_versions = DataVersions("events")
@@ -1,8 +1,13 @@
 from app.crud.event import get as get_event
 from app.crud.event import get_multi as get_multi_events
+from app.crud.event import count as count_events
 from app.crud.event import create as create_event
+from app.crud.event import create_multi as create_multi_events
 from app.crud.event import update as update_event
 from app.crud.event import remove as remove_event
+from app.crud.price import get_range as get_price_range
+from app.crud.price import create_multi as create_multi_prices
 
 # 为便于引用，创建子模块
 event = __import__('app.crud.event', fromlist=['*'])
+price = __import__('app.crud.price', fromlist=['*'])
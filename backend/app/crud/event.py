@@ -1,11 +1,46 @@
+import enum
 import uuid
-from typing import List, Optional, Dict, Any, Union
+from typing import Callable, List, Optional, Dict, Any, Tuple, Union
 
-from sqlalchemy.orm import Session
+from sqlalchemy import func, literal, tuple_
+from sqlalchemy.orm import Query, Session
 from fastapi.encoders import jsonable_encoder
 
+from app.core.versions import event_versions
 from app.db.models.event import Event, EventDurationType, EventCategory, EventImpact
-from app.schemas.event import EventCreate, EventUpdate
+from app.schemas.event import EventCreate, EventUpdate, EventListItem
+
+
+# 列表接口只需要的列
+_LIST_ITEM_FIELDS = tuple(EventListItem.model_fields)
+_LIST_ITEM_COLUMNS = [getattr(Event, field) for field in _LIST_ITEM_FIELDS]
+
+
+# 事件写入后的回调，参数为(事件字典, 是否删除)，只通知本进程内的写入
+_listeners: List[Callable[[Dict[str, Any], bool], None]] = []
+
+
+def add_listener(callback: Callable[[Dict[str, Any], bool], None]) -> None:
+    """注册事件创建、更新和删除后的回调"""
+    _listeners.append(callback)
+
+
+def _notify(events: List[Dict[str, Any]], removed: bool = False) -> None:
+    for event in events:
+        for callback in _listeners:
+            callback(event, removed)
+    # 每只受影响的股票只递增一次版本号
+    for symbol in {event["stock_symbol"] for event in events}:
+        event_versions.bump(symbol)
+
+
+def _brief(obj: Event) -> Dict[str, Any]:
+    return {"id": obj.id, "stock_symbol": obj.stock_symbol, "start_time": obj.start_time}
+
+
+def _plain(value: Any) -> Any:
+    """枚举列取其字符串值"""
+    return value.value if isinstance(value, enum.Enum) else value
 
 
 def get(db: Session, event_id: str) -> Optional[Event]:
@@ -13,11 +48,9 @@ def get(db: Session, event_id: str) -> Optional[Event]:
     return db.query(Event).filter(Event.id == event_id).first()
 
 
-def get_multi(
-    db: Session, 
-    *, 
-    skip: int = 0, 
-    limit: int = 100,
+def _filter(
+    query: Query,
+    *,
     stock_symbol: Optional[str] = None,
     min_level: Optional[int] = None,
     max_level: Optional[int] = None,
@@ -26,15 +59,13 @@ def get_multi(
     duration_type: Optional[str] = None,
     category: Optional[str] = None,
     impact: Optional[str] = None
-) -> List[Event]:
-    """获取多个事件，支持过滤"""
-    query = db.query(Event)
-    
-    # 应用过滤条件
+) -> Query:
+    """应用事件过滤条件"""
     if stock_symbol:
         query = query.filter(Event.stock_symbol == stock_symbol)
     if min_level is not None:
-        query = query.filter(Event.level >= min_level)
+        # 级别直接写进SQL，查询计划才能匹配部分索引的WHERE level >= 4
+        query = query.filter(Event.level >= literal(int(min_level), literal_execute=True))
     if max_level is not None:
         query = query.filter(Event.level <= max_level)
     if start_time is not None:
@@ -47,46 +78,84 @@ def get_multi(
         query = query.filter(Event.category == EventCategory(category))
     if impact is not None:
         query = query.filter(Event.impact == EventImpact(impact))
+    return query
+
+
+def get_multi(
+    db: Session, 
+    *, 
+    skip: int = 0, 
+    limit: int = 100,
+    cursor: Optional[Tuple[int, str]] = None,
+    **filters: Any
+) -> List[Event]:
+    """获取多个事件，支持过滤
+    
+    cursor为解码后的(start_time, id)游标，只返回排序在其之后的事件，
+    使用(stock_symbol, start_time, id)复合索引定位，翻页深度不影响性能
+    """
+    query = _filter(db.query(Event), **filters)
+        
+    if cursor is not None:
+        query = query.filter(tuple_(Event.start_time, Event.id) < tuple_(*cursor))
         
     # 排序、分页并返回结果
-    return query.order_by(Event.start_time.desc()).offset(skip).limit(limit).all()
+    return (
+        query.order_by(Event.start_time.desc(), Event.id.desc())
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
 
 
-def create(db: Session, *, obj_in: EventCreate) -> Event:
-    """创建事件"""
-    obj_in_data = jsonable_encoder(obj_in)
+def get_multi_items(
+    db: Session,
+    *,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[Tuple[int, str]] = None,
+    **filters: Any
+) -> List[Dict[str, Any]]:
+    """获取事件列表项，只查询EventListItem需要的列并直接返回字典，不构建ORM对象"""
+    query = _filter(db.query(*_LIST_ITEM_COLUMNS), **filters)
     
-    # 处理枚举类型
-    duration_type = EventDurationType(obj_in_data.pop("duration_type"))
-    category = EventCategory(obj_in_data.pop("category"))
-    impact = None
-    if obj_in_data.get("impact"):
-        impact = EventImpact(obj_in_data.pop("impact"))
+    if cursor is not None:
+        query = query.filter(tuple_(Event.start_time, Event.id) < tuple_(*cursor))
     
-    # 生成UUID
-    db_obj = Event(
-        **obj_in_data, 
-        id=str(uuid.uuid4()),
-        duration_type=duration_type,
-        category=category,
-        impact=impact
+    rows = (
+        query.order_by(Event.start_time.desc(), Event.id.desc())
+        .offset(skip)
+        .limit(limit)
+        .all()
     )
-    db.add(db_obj)
-    db.commit()
-    db.refresh(db_obj)
-    return db_obj
+    return [
+        {field: _plain(value) for field, value in zip(_LIST_ITEM_FIELDS, row)}
+        for row in rows
+    ]
 
 
-def update(
-    db: Session, *, db_obj: Event, obj_in: Union[EventUpdate, Dict[str, Any]]
-) -> Event:
-    """更新事件"""
-    obj_data = jsonable_encoder(db_obj)
-    
+def count(db: Session, **filters: Any) -> int:
+    """统计符合过滤条件的事件数量(只统计索引列，不加载事件行)"""
+    query = _filter(db.query(func.count(Event.id)), **filters)
+    return query.scalar()
+
+
+def _create_values(obj_in: EventCreate) -> Dict[str, Any]:
+    """新事件的列值: 生成UUID并把枚举字段换成数据库枚举"""
+    obj_in_data = obj_in.model_dump()
+    obj_in_data["id"] = str(uuid.uuid4())
+    obj_in_data["duration_type"] = EventDurationType(obj_in_data["duration_type"])
+    obj_in_data["category"] = EventCategory(obj_in_data["category"])
+    obj_in_data["impact"] = EventImpact(obj_in_data["impact"]) if obj_in_data.get("impact") else None
+    return obj_in_data
+
+
+def _update_values(obj_in: Union[EventUpdate, Dict[str, Any]]) -> Dict[str, Any]:
+    """更新请求中设置了的字段，枚举字段换成数据库枚举(version只用于模拟数据的乐观锁)"""
     if isinstance(obj_in, dict):
-        update_data = obj_in
+        update_data = dict(obj_in)
     else:
-        update_data = obj_in.dict(exclude_unset=True)
+        update_data = obj_in.model_dump(exclude_unset=True, exclude={"version"})
     
     # 处理枚举类型
     if "duration_type" in update_data:
@@ -95,6 +164,37 @@ def update(
         update_data["category"] = EventCategory(update_data["category"])
     if "impact" in update_data:
         update_data["impact"] = EventImpact(update_data["impact"]) if update_data["impact"] else None
+    return update_data
+
+
+def create(db: Session, *, obj_in: EventCreate) -> Event:
+    """创建事件"""
+    db_obj = Event(**_create_values(obj_in))
+    db.add(db_obj)
+    db.commit()
+    db.refresh(db_obj)
+    _notify([_brief(db_obj)])
+    return db_obj
+
+
+def create_multi(db: Session, *, objs_in: List[EventCreate]) -> List[str]:
+    """批量创建事件，单次executemany插入并只提交一次"""
+    mappings = [_create_values(obj_in) for obj_in in objs_in]
+    
+    if mappings:
+        db.bulk_insert_mappings(Event, mappings)
+        db.commit()
+        _notify(mappings)
+    return [mapping["id"] for mapping in mappings]
+
+
+def update(
+    db: Session, *, db_obj: Event, obj_in: Union[EventUpdate, Dict[str, Any]]
+) -> Event:
+    """更新事件"""
+    obj_data = jsonable_encoder(db_obj)
+    previous = _brief(db_obj)
+    update_data = _update_values(obj_in)
     
     for field in obj_data:
         if field in update_data:
@@ -103,12 +203,16 @@ def update(
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    _notify([previous], removed=True)
+    _notify([_brief(db_obj)])
     return db_obj
 
 
 def remove(db: Session, *, event_id: str) -> Event:
     """删除事件"""
     obj = db.query(Event).get(event_id)
+    removed = _brief(obj)
     db.delete(obj)
     db.commit()
+    _notify([removed], removed=True)
     return obj 
\ No newline at end of file
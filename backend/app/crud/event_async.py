@@ -0,0 +1,117 @@
+"""
+事件的异步数据库操作(AsyncSession)
+
+过滤条件、列投影和写入后的通知与app/crud/event.py共用，只是查询用select语句执行。
+"""
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.event import (
+    _LIST_ITEM_COLUMNS,
+    _LIST_ITEM_FIELDS,
+    _brief,
+    _create_values,
+    _filter,
+    _notify,
+    _plain,
+    _update_values,
+)
+from app.db.models.event import Event
+from app.schemas.event import EventCreate, EventUpdate
+
+
+async def get(db: AsyncSession, event_id: str) -> Optional[Event]:
+    """获取单个事件"""
+    return await db.get(Event, event_id)
+
+
+def _page(statement: Any, *, skip: int, limit: int, cursor: Optional[Tuple[int, str]]) -> Any:
+    if cursor is not None:
+        statement = statement.filter(tuple_(Event.start_time, Event.id) < tuple_(*cursor))
+    return statement.order_by(Event.start_time.desc(), Event.id.desc()).offset(skip).limit(limit)
+
+
+async def get_multi(
+    db: AsyncSession,
+    *,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[Tuple[int, str]] = None,
+    **filters: Any
+) -> List[Event]:
+    """获取多个事件，参数同crud.event.get_multi"""
+    statement = _page(_filter(select(Event), **filters), skip=skip, limit=limit, cursor=cursor)
+    return list((await db.scalars(statement)).all())
+
+
+async def get_multi_items(
+    db: AsyncSession,
+    *,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[Tuple[int, str]] = None,
+    **filters: Any
+) -> List[Dict[str, Any]]:
+    """获取事件列表项，只查询EventListItem需要的列"""
+    statement = _page(_filter(select(*_LIST_ITEM_COLUMNS), **filters), skip=skip, limit=limit, cursor=cursor)
+    rows = (await db.execute(statement)).all()
+    return [
+        {field: _plain(value) for field, value in zip(_LIST_ITEM_FIELDS, row)}
+        for row in rows
+    ]
+
+
+async def count(db: AsyncSession, **filters: Any) -> int:
+    """统计符合过滤条件的事件数量"""
+    return await db.scalar(_filter(select(func.count(Event.id)), **filters))
+
+
+async def create(db: AsyncSession, *, obj_in: EventCreate) -> Event:
+    """创建事件"""
+    db_obj = Event(**_create_values(obj_in))
+    db.add(db_obj)
+    await db.commit()
+    await db.refresh(db_obj)
+    # 版本号可能在远程缓存中，回调放到线程池执行
+    await run_in_threadpool(_notify, [_brief(db_obj)])
+    return db_obj
+
+
+async def create_multi(db: AsyncSession, *, objs_in: List[EventCreate]) -> List[str]:
+    """批量创建事件，单次executemany插入并只提交一次"""
+    mappings = [_create_values(obj_in) for obj_in in objs_in]
+    if mappings:
+        await db.execute(insert(Event), mappings)
+        await db.commit()
+        await run_in_threadpool(_notify, mappings)
+    return [mapping["id"] for mapping in mappings]
+
+
+async def update(
+    db: AsyncSession, *, db_obj: Event, obj_in: Union[EventUpdate, Dict[str, Any]]
+) -> Event:
+    """更新事件"""
+    previous = _brief(db_obj)
+    for field, value in _update_values(obj_in).items():
+        if hasattr(Event, field):
+            setattr(db_obj, field, value)
+    await db.commit()
+    await db.refresh(db_obj)
+    await run_in_threadpool(_notify, [previous], True)
+    await run_in_threadpool(_notify, [_brief(db_obj)])
+    return db_obj
+
+
+async def remove(db: AsyncSession, *, event_id: str) -> Optional[Event]:
+    """删除事件，不存在时返回None"""
+    obj = await db.get(Event, event_id)
+    if obj is None:
+        return None
+    removed = _brief(obj)
+    await db.delete(obj)
+    await db.commit()
+    await run_in_threadpool(_notify, [removed], True)
+    return obj
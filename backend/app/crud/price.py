@@ -0,0 +1,55 @@
+from datetime import datetime
+from typing import Any, List, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.db import partitions
+from app.db.models.price import StockPrice
+from app.schemas.stock import StockPriceCreate
+
+
+def range_statement(
+    *columns: Any,
+    stock_symbol: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> Any:
+    """
+    按日期范围(闭区间)查询价格的语句，按日期升序
+
+    date上的条件让PostgreSQL只扫描范围内的分区，分区内使用(stock_symbol, date)索引
+    """
+    statement = select(*(columns or (StockPrice,))).where(StockPrice.stock_symbol == stock_symbol)
+    if start_date is not None:
+        statement = statement.where(StockPrice.date >= start_date)
+    if end_date is not None:
+        statement = statement.where(StockPrice.date <= end_date)
+    return statement.order_by(StockPrice.date)
+
+
+def get_range(
+    db: Session,
+    *,
+    stock_symbol: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> List[StockPrice]:
+    """获取股票在日期范围内的价格"""
+    statement = range_statement(stock_symbol=stock_symbol, start_date=start_date, end_date=end_date)
+    return list(db.execute(statement).scalars())
+
+
+def create_multi(db: Session, *, objs_in: List[StockPriceCreate]) -> int:
+    """
+    批量写入价格，返回写入行数
+
+    写入前创建数据日期范围内缺少的分区(PostgreSQL分区表)
+    """
+    if not objs_in:
+        return 0
+    dates = [obj_in.date for obj_in in objs_in]
+    partitions.ensure_partitions(db.get_bind(), min(dates), max(dates))
+    db.execute(insert(StockPrice), [obj_in.model_dump() for obj_in in objs_in])
+    db.commit()
+    return len(objs_in)
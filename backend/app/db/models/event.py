@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, func, JSON, Enum
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, func, JSON, Enum, Index, text
 from sqlalchemy.orm import relationship
 import enum
 
 from app.db.base_class import Base
 
 
+# 重要事件的最低级别，部分索引ix_events_high_level_start_id只收录这些事件
+HIGH_LEVEL = 4
+
+
 class EventDurationType(enum.Enum):
     continuous = "continuous"
     temporary = "temporary"
@@ -45,7 +49,24 @@ class Event(Base):
     updated_at = Column(DateTime, nullable=False, default=func.now(), onupdate=func.now())
     
     # 关联股票代码
-    stock_symbol = Column(String(20), ForeignKey("stocks.symbol"), nullable=False, index=True)
+    # 不单独建索引，按股票查询使用以stock_symbol开头的复合索引
+    stock_symbol = Column(String(20), ForeignKey("stocks.symbol"), nullable=False)
     
     # 关联股票
-    stock = relationship("Stock", back_populates="events") 
\ No newline at end of file
+    stock = relationship("Stock", back_populates="events")
+    
+    # 列表接口按(start_time, id)倒序分页，索引反向扫描即可按序返回，不需要额外排序
+    __table_args__ = (
+        # WHERE stock_symbol = ? AND (start_time, id) < (?, ?)
+        Index("ix_events_symbol_start_id", "stock_symbol", "start_time", "id"),
+        # WHERE category = ? ORDER BY start_time DESC, id DESC
+        Index("ix_events_category_start_id", "category", "start_time", "id"),
+        # 只收录重要事件的部分索引: WHERE level >= 4 ORDER BY start_time DESC, id DESC
+        Index(
+            "ix_events_high_level_start_id",
+            "start_time",
+            "id",
+            postgresql_where=text(f"level >= {HIGH_LEVEL}"),
+            sqlite_where=text(f"level >= {HIGH_LEVEL}"),
+        ),
+    )
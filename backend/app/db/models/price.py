@@ -1,15 +1,26 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, func, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, func, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import Base
 
 
 class StockPrice(Base):
-    """股票历史价格数据模型"""
+    """
+    股票历史价格数据模型
+
+    PostgreSQL上执行迁移后为按date范围分区的表，主键为(id, date)，
+    分区由app/db/partitions.py自动创建
+
+    模型的主键有意只声明id: SQLite只对单列INTEGER主键自增，复合主键下
+    插入不会生成id。id在两种数据库上都唯一，ORM按id定位行不受影响；
+    分区表的主键必须包含分区键date，这一点只由迁移在PostgreSQL上建立
+    """
     __tablename__ = "stock_prices"
 
+    # 主键声明与PostgreSQL分区表的(id, date)不同，原因见类文档
     id = Column(Integer, primary_key=True, index=True)
-    stock_symbol = Column(String(20), ForeignKey("stocks.symbol"), nullable=False, index=True)
+    # 不单独建索引，按股票查询使用uix_stock_date和覆盖索引
+    stock_symbol = Column(String(20), ForeignKey("stocks.symbol"), nullable=False)
     date = Column(DateTime, nullable=False, index=True)
     open = Column(Float, nullable=False)
     high = Column(Float, nullable=False)
@@ -23,4 +34,19 @@ class StockPrice(Base):
     # 确保每个股票每天只有一条记录
     __table_args__ = (
         UniqueConstraint('stock_symbol', 'date', name='uix_stock_date'),
+        # 按日期范围取收盘价和成交量的覆盖索引，只扫描索引不回表。
+        # PostgreSQL用INCLUDE附带列，SQLite没有INCLUDE，把列放进索引键
+        Index(
+            "ix_stock_prices_symbol_date_cover",
+            "stock_symbol",
+            "date",
+            postgresql_include=["close", "volume"],
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_stock_prices_symbol_date_cover",
+            "stock_symbol",
+            "date",
+            "close",
+            "volume",
+        ).ddl_if(callable_=lambda ddl, target, bind, dialect, **kw: dialect.name != "postgresql"),
     ) 
\ No newline at end of file
@@ -0,0 +1,129 @@
+"""
+stock_prices按日期范围分区(PostgreSQL)
+
+迁移b7e4d2a91c35把stock_prices改为按date范围分区的父表，每年或每月一个分区:
+
+    stock_prices_y2024        [2024-01-01, 2025-01-01)     PRICE_PARTITION_INTERVAL=year
+    stock_prices_y2024m03     [2024-03-01, 2024-04-01)     PRICE_PARTITION_INTERVAL=month
+
+带日期条件的查询只扫描对应分区(分区裁剪)，旧数据可以整个分区DETACH/DROP，
+VACUUM也只处理有写入的分区。分区在以下时机自动创建:
+    - 应用启动时创建当前及之后PRICE_PARTITIONS_AHEAD个分区
+    - crud.price.create_multi写入前创建数据日期范围内缺少的分区
+
+已确认存在的分区名缓存在进程内，DETACH/DROP旧分区后需要重启应用才会重新创建。
+SQLite和未执行迁移的PostgreSQL上stock_prices是普通表，这里的函数不做任何操作。
+"""
+import threading
+from datetime import datetime
+from typing import List, Optional, Set
+
+from sqlalchemy import exc, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.config import settings
+
+PARENT_TABLE = "stock_prices"
+
+# 本进程已确认存在的分区
+_known: Set[str] = set()
+_known_lock = threading.Lock()
+
+
+def period_start(day: datetime, interval: Optional[str] = None) -> datetime:
+    """day所在分区的起始时间"""
+    interval = interval or settings.PRICE_PARTITION_INTERVAL
+    return datetime(day.year, day.month if interval == "month" else 1, 1)
+
+
+def next_period(start: datetime, interval: Optional[str] = None) -> datetime:
+    """下一个分区的起始时间"""
+    interval = interval or settings.PRICE_PARTITION_INTERVAL
+    if interval == "year":
+        return datetime(start.year + 1, 1, 1)
+    return datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+
+def periods(start: datetime, end: datetime, interval: Optional[str] = None) -> List[datetime]:
+    """覆盖[start, end]所需分区的起始时间"""
+    result = []
+    current = period_start(start, interval)
+    while current <= end:
+        result.append(current)
+        current = next_period(current, interval)
+    return result
+
+
+def partition_name(start: datetime, interval: Optional[str] = None) -> str:
+    """分区表名"""
+    interval = interval or settings.PRICE_PARTITION_INTERVAL
+    if interval == "year":
+        return f"{PARENT_TABLE}_y{start.year}"
+    return f"{PARENT_TABLE}_y{start.year}m{start.month:02d}"
+
+
+def partition_ddl(start: datetime, interval: Optional[str] = None) -> str:
+    """创建分区的DDL，分区已存在时不做任何操作"""
+    end = next_period(start, interval)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(start, interval)} PARTITION OF {PARENT_TABLE} "
+        f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+    )
+
+
+def is_partitioned(connection: Connection) -> bool:
+    """stock_prices是否为分区表"""
+    if connection.dialect.name != "postgresql":
+        return False
+    return connection.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"),
+        {"table": PARENT_TABLE},
+    ).first() is not None
+
+
+def ensure_partitions(engine: Engine, start: datetime, end: datetime) -> List[str]:
+    """
+    创建覆盖[start, end]所需的分区
+
+    每个分区在单独的事务中创建，不影响调用方的事务。多个进程同时创建同一分区时，
+    失败的一方确认分区已存在后继续。
+
+    Returns:
+        List[str]: 本次新建的分区名
+    """
+    if engine.dialect.name != "postgresql":
+        return []
+    missing = [start_ for start_ in periods(start, end) if partition_name(start_) not in _known]
+    if not missing:
+        return []
+
+    exists = text("SELECT to_regclass(:name) IS NOT NULL")
+    created = []
+    with engine.connect() as connection:
+        if not is_partitioned(connection):
+            return []
+        connection.commit()
+        for start_ in missing:
+            name = partition_name(start_)
+            if not connection.execute(exists, {"name": name}).scalar():
+                try:
+                    connection.exec_driver_sql(partition_ddl(start_))
+                    connection.commit()
+                    created.append(name)
+                except exc.DBAPIError:
+                    connection.rollback()
+                    if not connection.execute(exists, {"name": name}).scalar():
+                        raise
+            connection.commit()
+            with _known_lock:
+                _known.add(name)
+    return created
+
+
+def ensure_upcoming_partitions(engine: Engine, now: Optional[datetime] = None) -> List[str]:
+    """创建当前及之后PRICE_PARTITIONS_AHEAD个分区"""
+    start = period_start(now or datetime.now())
+    end = start
+    for _ in range(settings.PRICE_PARTITIONS_AHEAD):
+        end = next_period(end)
+    return ensure_partitions(engine, start, end)
@@ -0,0 +1,183 @@
+"""
+数据库引擎配置和连接池监控
+
+引擎参数由Settings决定:
+    - 连接池大小按数据库类型分别配置(SQLite只有一个写入者，连接多了只会互相等待)
+    - SQLite连接建立时设置WAL、synchronous、mmap和busy_timeout，允许跨线程使用连接
+    - SQLAlchemy编译缓存和PostgreSQL驱动端的预编译语句缓存
+
+连接池换成带计时的子类，记录每次取连接的等待时间和超时次数，
+连同当前借出数、溢出数一起通过/api/system/pool返回，用于按实际负载调整连接池大小。
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Type
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from app.core.config import settings
+
+# 计算等待时间分位数保留的最近样本数
+_RECENT_WAITS = 1024
+
+
+class PoolMetrics:
+    """一个引擎连接池的累计统计，线程安全"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._recent: Deque[float] = deque(maxlen=_RECENT_WAITS)
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self._recent.append(seconds)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def record_connect(self) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def record_invalidation(self) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            recent = sorted(self._recent)
+            p95 = recent[int(len(recent) * 0.95) - 1] if recent else 0.0
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "wait_p95_ms": round(p95 * 1000, 3),
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+class _TimedCheckout:
+    """连接池混入类: 给取连接计时，metrics由instrumented_pool_class设置"""
+
+    metrics: PoolMetrics
+
+    def _do_get(self) -> Any:
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+
+def instrumented_pool_class(base: Type[Pool], metrics: PoolMetrics) -> Type[Pool]:
+    """
+    绑定了metrics的计时连接池类
+
+    引擎dispose或连接失效后按self.__class__重建连接池，统计会延续到新的连接池
+    """
+    return type(f"Instrumented{base.__name__}", (_TimedCheckout, base), {"metrics": metrics})
+
+
+def _is_memory_sqlite(url: Any) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(uri: str, metrics: PoolMetrics, is_async: bool = False) -> Dict[str, Any]:
+    """
+    create_engine/create_async_engine的参数
+
+    参数:
+        uri: 数据库连接串
+        metrics: 连接池统计
+        is_async: 是否用于异步引擎
+    """
+    url = make_url(str(uri))
+    backend = url.get_backend_name()
+    options: Dict[str, Any] = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "query_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    }
+    connect_args: Dict[str, Any] = {}
+
+    if backend == "sqlite":
+        # 连接池中的连接会被不同线程取用
+        connect_args["check_same_thread"] = False
+        pool_size, max_overflow = settings.SQLITE_POOL_SIZE, settings.SQLITE_MAX_OVERFLOW
+    else:
+        pool_size, max_overflow = settings.POSTGRES_POOL_SIZE, settings.POSTGRES_MAX_OVERFLOW
+        if url.get_driver_name() == "asyncpg":
+            connect_args["prepared_statement_cache_size"] = settings.POSTGRES_STATEMENT_CACHE_SIZE
+        elif url.get_driver_name() == "psycopg":
+            # 同一条语句执行到第几次时在服务端预编译，None表示不预编译
+            connect_args["prepare_threshold"] = settings.POSTGRES_PREPARE_THRESHOLD
+
+    if not _is_memory_sqlite(url):
+        # 内存SQLite使用单连接池，不适用连接池大小参数
+        base = AsyncAdaptedQueuePool if is_async else QueuePool
+        options.update(
+            poolclass=instrumented_pool_class(base, metrics),
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        if settings.SQLITE_WAL:
+            # WAL下读不阻塞写，写也不阻塞读
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    finally:
+        cursor.close()
+
+
+def instrument_engine(engine: Engine, metrics: PoolMetrics) -> None:
+    """注册连接建立和失效的统计，SQLite连接建立时设置PRAGMA(异步引擎传入sync_engine)"""
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    event.listen(engine, "connect", lambda dbapi_connection, record: metrics.record_connect())
+    event.listen(engine, "invalidate", lambda dbapi_connection, record, exception: metrics.record_invalidation())
+
+
+def pool_status(engine: Optional[Engine], metrics: PoolMetrics) -> Optional[Dict[str, Any]]:
+    """连接池当前状态和累计统计，引擎不存在时返回None"""
+    if engine is None:
+        return None
+    pool = engine.pool
+    status: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+        )
+    status.update(metrics.snapshot())
+    return status
@@ -1,22 +1,65 @@
+import importlib.util
+from typing import Optional
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.db.pool import PoolMetrics, engine_options, instrument_engine
+
+# 连接池统计，通过/api/system/pool查看
+pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
 
-# 创建数据库引擎
+# 创建数据库引擎(连接池和SQLite参数见app/db/pool.py)
 engine = create_engine(
     settings.DATABASE_URI,
-    pool_pre_ping=True,
+    **engine_options(settings.DATABASE_URI, pool_metrics),
 )
+instrument_engine(engine, pool_metrics)
 
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 数据库类型 -> (异步方言, 驱动模块)
+_ASYNC_DRIVERS = {
+    "sqlite": ("sqlite+aiosqlite", "aiosqlite"),
+    "postgresql": ("postgresql+asyncpg", "asyncpg"),
+}
+
+
+def async_database_uri(uri: str) -> Optional[str]:
+    """同步连接串对应的异步驱动连接串，驱动未安装时返回None"""
+    url = make_url(str(uri))
+    driver = _ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None or importlib.util.find_spec(driver[1]) is None:
+        return None
+    return url.set(drivername=driver[0]).render_as_string(hide_password=False)
+
+
+# 异步引擎和会话工厂(pip install "stock-reason-backend[async]")，
+# 驱动未安装时为None，异步接口退回到线程池中使用同步会话
+_async_uri = async_database_uri(settings.DATABASE_URI)
+async_engine = (
+    create_async_engine(_async_uri, **engine_options(_async_uri, async_pool_metrics, is_async=True))
+    if _async_uri
+    else None
+)
+if async_engine is not None:
+    instrument_engine(async_engine.sync_engine, async_pool_metrics)
+AsyncSessionLocal = (
+    async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    if async_engine is not None
+    else None
+)
+
 # 依赖项函数，用于获取数据库会话
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
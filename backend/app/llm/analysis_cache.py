@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.core.cache import SharedCache
+
+# 默认缓存文件位置: backend/data/llm_analysis_cache.sqlite3
+DEFAULT_CACHE_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "llm_analysis_cache.sqlite3"
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """归一化新闻文本: NFKC、转小写、合并空白，转载时的排版差异不影响缓存命中"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip().lower()
+
+
+def cache_key(news_text: str, stock_symbol: str, model_name: str, prompt_version: str) -> str:
+    """
+    计算缓存键
+
+    参数:
+        news_text: 新闻文本
+        stock_symbol: 股票代码
+        model_name: 模型名称
+        prompt_version: 提示词版本，提示词变化时需要同步修改以使旧结果失效
+
+    返回:
+        sha256十六进制摘要
+    """
+    payload = "\x1f".join((normalize_text(news_text), stock_symbol.upper(), model_name, prompt_version))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """
+    以内容哈希为键的LLM分析结果缓存
+
+    存放在SQLite文件中，跨进程、跨重启保留。条目数超过max_entries时
+    按最近使用时间淘汰最旧的条目(LRU)，并记录命中/未命中次数
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_FILE, max_entries: int = 100000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: Optional[int] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_cache ("
+                "key TEXT PRIMARY KEY, result TEXT NOT NULL, last_used REAL NOT NULL) WITHOUT ROWID"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_analysis_cache_last_used ON analysis_cache (last_used)"
+            )
+            self._entries = conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存的分析结果，命中时刷新其最近使用时间"""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT result FROM analysis_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE analysis_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[Dict[str, Any]]]:
+        """批量读取，一条查询取回所有命中的条目"""
+        if not keys:
+            return []
+        found: Dict[str, str] = {}
+        with self._lock:
+            conn = self._connect()
+            # SQLite单条语句的参数个数有上限，分批查询
+            for i in range(0, len(keys), 500):
+                chunk = list(keys[i:i + 500])
+                placeholders = ",".join("?" * len(chunk))
+                found.update(conn.execute(
+                    f"SELECT key, result FROM analysis_cache WHERE key IN ({placeholders})", chunk
+                ).fetchall())
+                hit = [key for key in chunk if key in found]
+                if hit:
+                    conn.execute(
+                        f"UPDATE analysis_cache SET last_used = ? WHERE key IN ({','.join('?' * len(hit))})",
+                        (time.time(), *hit),
+                    )
+            self.hits += sum(key in found for key in keys)
+            self.misses += sum(key not in found for key in keys)
+        return [json.loads(found[key]) if key in found else None for key in keys]
+
+    def set(self, key: str, result: Dict[str, Any]) -> None:
+        """写入分析结果，超出容量时淘汰最久未使用的条目"""
+        payload = json.dumps(result, ensure_ascii=False)
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO analysis_cache (key, result, last_used) VALUES (?, ?, ?)",
+                (key, payload, time.time()),
+            )
+            if cursor.rowcount == 0:
+                conn.execute(
+                    "UPDATE analysis_cache SET result = ?, last_used = ? WHERE key = ?",
+                    (payload, time.time(), key),
+                )
+                return
+            self._entries += 1
+            if self._entries > self.max_entries:
+                # 一次多淘汰10%，避免每次写入都触发淘汰
+                excess = self._entries - self.max_entries + max(self.max_entries // 10, 1)
+                cursor = conn.execute(
+                    "DELETE FROM analysis_cache WHERE key IN ("
+                    "SELECT key FROM analysis_cache ORDER BY last_used LIMIT ?)",
+                    (excess,),
+                )
+                self._entries -= cursor.rowcount
+                self.evictions += cursor.rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connect().execute("DELETE FROM analysis_cache")
+            self._entries = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """命中率等统计信息"""
+        with self._lock:
+            self._connect()
+            entries = self._entries
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class SharedAnalysisCache:
+    """
+    存放在共享缓存后端(见app/core/cache.py)中的分析结果缓存，接口与AnalysisCache相同
+
+    使用redis后端时多台机器上的worker共享分析结果，条目按ttl过期，淘汰由后端负责
+    """
+
+    def __init__(self, cache: SharedCache, ttl: Optional[float] = 7 * 86400):
+        self.cache = cache
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(key: str) -> str:
+        return f"llm_analysis:{key}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.get_many([key])[0]
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[Dict[str, Any]]]:
+        """一次往返读取多个结果"""
+        values = self.cache.get_many([self._key(key) for key in keys])
+        results = [json.loads(value) if value is not None else None for value in values]
+        hits = sum(result is not None for result in results)
+        self.hits += hits
+        self.misses += len(results) - hits
+        return results
+
+    def set(self, key: str, result: Dict[str, Any]) -> None:
+        self.cache.set(self._key(key), json.dumps(result, ensure_ascii=False).encode("utf-8"), self.ttl)
+
+    def clear(self) -> None:
+        # 共享后端中的条目按ttl过期，这里只重置统计
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
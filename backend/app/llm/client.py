@@ -0,0 +1,17 @@
+from typing import Protocol
+
+
+class TransientLLMError(Exception):
+    """可重试的LLM调用错误(限流、超时、服务端5xx等)"""
+
+
+class LLMClient(Protocol):
+    """NewsAnalyzer使用的最小LLM客户端接口"""
+
+    async def complete(self, prompt: str) -> str:
+        """
+        发送提示词并返回模型的文本输出
+
+        可重试的失败应抛出TransientLLMError
+        """
+        ...
@@ -0,0 +1,211 @@
+"""
+近似重复新闻检测(MinHash-LSH)
+
+转载新闻往往只在标点、来源署名或个别句子上不同。对归一化文本取字符k-gram
+(对中英文都适用)，用MinHash估计Jaccard相似度，再按LSH分段分桶，
+新文章只需与同桶的候选比较，索引可以增量维护，数十万篇时查询仍是常数级
+"""
+import itertools
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from app.llm.analysis_cache import normalize_text
+
+_MASK32 = np.uint64(0xFFFFFFFF)
+_SHIFT32 = np.uint64(32)
+# 滚动哈希的乘数(大奇数)
+_ROLLING_BASE = np.uint64(0x100000001B3)
+# 没有URL的新闻使用的唯一键
+_anonymous_keys = itertools.count()
+
+
+def shingle_hashes(text: str, k: int = 5) -> np.ndarray:
+    """
+    计算归一化文本所有字符k-gram的32位哈希(去重)
+
+    用确定性的多项式哈希而不是内置hash()，结果不随进程变化
+    """
+    codes = np.frombuffer(normalize_text(text).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    if len(codes) == 0:
+        return np.zeros(0, dtype=np.uint64)
+    if len(codes) < k:
+        k = len(codes)
+    hashes = np.zeros(len(codes) - k + 1, dtype=np.uint64)
+    # uint64按2^64取模溢出，这里正是需要的行为
+    with np.errstate(over="ignore"):
+        for j in range(k):
+            hashes = hashes * _ROLLING_BASE + codes[j:len(codes) - k + 1 + j]
+    return np.unique((hashes ^ (hashes >> _SHIFT32)) & _MASK32)
+
+
+class MinHasher:
+    """
+    MinHash签名生成器
+
+    使用multiply-shift哈希族: h_i(x) = ((a_i * x + b_i) mod 2^64) >> 32
+    """
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+    def signature(self, hashes: np.ndarray) -> np.ndarray:
+        if len(hashes) == 0:
+            return np.full(self.num_perm, 0xFFFFFFFF, dtype=np.uint32)
+        with np.errstate(over="ignore"):
+            values = (self._a[:, None] * hashes[None, :] + self._b[:, None]) >> _SHIFT32
+        return values.min(axis=1).astype(np.uint32)
+
+
+class NearDuplicateIndex:
+    """
+    增量的MinHash-LSH近似重复索引
+
+    每个簇保留第一篇加入的文章作为代表，add()返回新文章所属簇的代表键。
+    签名分为bands段、每段rows行，任一段完全相同即成为候选，
+    再用签名的一致比例估计Jaccard相似度，不低于threshold才视为重复
+
+    参数:
+        threshold: Jaccard相似度阈值
+        num_perm: 签名长度
+        bands: LSH分段数，需整除num_perm；段数越多召回越高、候选越多
+        shingle_size: 字符k-gram长度
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        num_perm: int = 128,
+        bands: int = 32,
+        shingle_size: int = 5,
+        seed: int = 1,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self._hasher = MinHasher(num_perm, seed)
+        # 每段一个桶表: 段内容 -> 簇代表键列表
+        self._buckets: List[Dict[bytes, List[Hashable]]] = [{} for _ in range(bands)]
+        # 簇代表键 -> 签名
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+        # 文章键 -> 簇代表键
+        self._cluster_of: Dict[Hashable, Hashable] = {}
+
+    def __len__(self) -> int:
+        return len(self._cluster_of)
+
+    @property
+    def cluster_count(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, text: str) -> np.ndarray:
+        return self._hasher.signature(shingle_hashes(text, self.shingle_size))
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def query(self, text: str) -> Optional[Tuple[Hashable, float]]:
+        """查找最相似的簇，返回(代表键, 估计相似度)，没有达到阈值的簇时返回None"""
+        return self._query(self.signature(text))
+
+    def _query(self, signature: np.ndarray) -> Optional[Tuple[Hashable, float]]:
+        candidates = set()
+        for band, key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(band.get(key, ()))
+        best = None
+        for representative in candidates:
+            similarity = float(np.mean(self._signatures[representative] == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (representative, similarity)
+        return best
+
+    def add(self, key: Hashable, text: str) -> Hashable:
+        """
+        加入一篇文章
+
+        返回:
+            所属簇的代表键；与已有文章都不相似时文章自己成为新簇的代表，返回key
+        """
+        if key in self._cluster_of:
+            return self._cluster_of[key]
+
+        signature = self.signature(text)
+        match = self._query(signature)
+        if match is not None:
+            self._cluster_of[key] = match[0]
+            return match[0]
+
+        self._signatures[key] = signature
+        for band, band_key in zip(self._buckets, self._band_keys(signature)):
+            band.setdefault(band_key, []).append(key)
+        self._cluster_of[key] = key
+        return key
+
+    def representative(self, key: Hashable) -> Optional[Hashable]:
+        return self._cluster_of.get(key)
+
+
+@dataclass
+class NewsCluster:
+    """一组近似重复的新闻"""
+    # 簇代表的键(url或匿名键)
+    representative: Hashable
+    # 本次列表中属于该簇的新闻下标，按输入顺序
+    positions: List[int]
+    # 代表是否来自之前加入索引的文章，此时本次列表中只有它的重复项
+    earlier: bool = False
+
+
+def cluster_news(
+    news_list: List[Dict[str, Any]],
+    index: Optional[NearDuplicateIndex] = None,
+    text_field: str = "content",
+) -> List[NewsCluster]:
+    """
+    把新闻列表按近似重复分簇
+
+    参数:
+        news_list: 新闻字典列表
+        index: 可复用的索引，为None时只在本次列表内去重
+        text_field: 用于比较的文本字段
+
+    返回:
+        簇列表，按各簇第一篇新闻在输入中的顺序排列。
+        代表来自之前加入索引的文章时earlier为True
+    """
+    if index is None:
+        index = NearDuplicateIndex()
+
+    clusters: Dict[Hashable, NewsCluster] = {}
+    # 本次调用新加入索引的键
+    added = set()
+    for i, news in enumerate(news_list):
+        key = news.get("url") or f"anonymous:{next(_anonymous_keys)}"
+        text = news.get(text_field) or news.get("title") or ""
+        if index.representative(key) is None:
+            added.add(key)
+        representative = index.add(key, text)
+        cluster = clusters.get(representative)
+        if cluster is None:
+            cluster = clusters[representative] = NewsCluster(
+                representative, [], earlier=representative not in added
+            )
+        cluster.positions.append(i)
+    return list(clusters.values())
+
+
+def merge_values(news_list: List[Dict[str, Any]], positions: List[int], field: str) -> List[str]:
+    """按顺序合并一个簇内各新闻的某个字段(去重、跳过空值)"""
+    merged: List[str] = []
+    for i in positions:
+        value = news_list[i].get(field)
+        if value and value not in merged:
+            merged.append(value)
+    return merged
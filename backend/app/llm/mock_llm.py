@@ -0,0 +1,78 @@
+import asyncio
+import json
+import random
+import re
+from typing import Any, Dict, Optional
+
+from app.llm.client import TransientLLMError
+from app.llm.tokens import estimate_tokens
+
+
+class MockLLMClient:
+    """
+    本地模拟的LLM客户端
+
+    按配置的延迟返回固定结构的事件JSON，可以按比例注入可重试错误和
+    无法解析的输出，用于离线开发和批量分析的基准测试。
+    打包提示词([新闻0]、[新闻1]...)返回对应长度的JSON数组
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.5,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: Optional[int] = None,
+        latency_per_1k_tokens: float = 0.0,
+        malformed_rate: float = 0.0,
+    ):
+        """
+        参数:
+            latency: 每次调用的平均延迟(秒)
+            jitter: 延迟的随机浮动范围(秒)
+            failure_rate: 抛出TransientLLMError的概率
+            seed: 随机数种子
+            latency_per_1k_tokens: 每1000个提示词token增加的延迟(秒)
+            malformed_rate: 打包请求返回截断JSON的概率
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.latency_per_1k_tokens = latency_per_1k_tokens
+        self.malformed_rate = malformed_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+
+    @staticmethod
+    def _response(stock_symbol: str) -> Dict[str, Any]:
+        return {
+            "has_event": True,
+            "title": f"{stock_symbol}公司发布季度财报",
+            "description": f"{stock_symbol}公司发布第三季度财报，收入超出市场预期，但利润略低于分析师预测",
+            "level": 3,  # 中等重要性
+            "reasoning": "财报是重要的公司信息，但影响是中性的，因此评为3级"
+        }
+
+    async def complete(self, prompt: str) -> str:
+        self.calls += 1
+        delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+        delay += self.latency_per_1k_tokens * estimate_tokens(prompt) / 1000
+        await asyncio.sleep(max(delay, 0.0))
+        if self._random.random() < self.failure_rate:
+            raise TransientLLMError("mock LLM transient failure")
+
+        match = re.search(r"股票 (\S+) 相关", prompt)
+        stock_symbol = match.group(1) if match else "UNKNOWN"
+
+        indexes = re.findall(r"\[新闻(\d+)\]", prompt)
+        if not indexes:
+            return json.dumps(self._response(stock_symbol), ensure_ascii=False)
+
+        raw = json.dumps(
+            [{"index": int(i), **self._response(stock_symbol)} for i in indexes],
+            ensure_ascii=False,
+        )
+        if self._random.random() < self.malformed_rate:
+            # 模拟输出被截断
+            return raw[:len(raw) // 2]
+        return raw
@@ -1,48 +1,103 @@
+import asyncio
+import json
 import logging
-from typing import List, Dict, Any, Optional
+import time
+from dataclasses import dataclass, asdict
+from typing import List, Dict, Any, Optional, Union
+
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+
+from app.core.cache import shared_cache
+from app.core.config import settings
+from app.llm.analysis_cache import DEFAULT_CACHE_FILE, AnalysisCache, SharedAnalysisCache, cache_key
+from app.llm.client import LLMClient, TransientLLMError
+from app.llm.dedup import NearDuplicateIndex, NewsCluster, cluster_news, merge_values
+from app.llm.mock_llm import MockLLMClient
+from app.llm.rate_limit import RateLimiter
+from app.llm.tokens import estimate_tokens
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class BatchStats:
+    """一次批量分析的吞吐指标"""
+    articles: int = 0
+    duplicates: int = 0
+    merged: int = 0
+    events: int = 0
+    failed: int = 0
+    llm_calls: int = 0
+    cache_hits: int = 0
+    retries: int = 0
+    packs: int = 0
+    pack_splits: int = 0
+    prompt_tokens: int = 0
+    rate_limit_wait: float = 0.0
+    elapsed: float = 0.0
+
+    @property
+    def articles_per_second(self) -> float:
+        return self.articles / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def tokens_per_article(self) -> float:
+        return self.prompt_tokens / self.articles if self.articles else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["articles_per_second"] = self.articles_per_second
+        data["tokens_per_article"] = self.tokens_per_article
+        return data
+
+
 class NewsAnalyzer:
     """新闻分析服务，使用LLM分析新闻并提取相关事件"""
-    
-    def __init__(self, model_name: str = "gpt-3.5-turbo"):
+
+    def __init__(
+        self,
+        model_name: str = "gpt-3.5-turbo",
+        client: Optional[LLMClient] = None,
+        max_concurrency: int = settings.LLM_MAX_CONCURRENCY,
+        requests_per_minute: Optional[int] = settings.LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: Optional[int] = settings.LLM_TOKENS_PER_MINUTE,
+        max_retries: int = settings.LLM_MAX_RETRIES,
+        cache: Optional[Union[AnalysisCache, SharedAnalysisCache]] = None,
+        prompt_version: str = settings.DEFAULT_PROMPT_VERSION,
+        dedup_index: Optional[NearDuplicateIndex] = None,
+        pack_token_budget: int = settings.LLM_PACK_TOKEN_BUDGET,
+        pack_max_articles: int = settings.LLM_PACK_MAX_ARTICLES,
+    ):
         self.model_name = model_name
-        # 此处应初始化LLM客户端
-        # self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        
-    async def analyze_news(
-        self, 
-        news_text: str, 
-        stock_symbol: str,
-        news_source: Optional[str] = None,
-        news_url: Optional[str] = None
-    ) -> Dict[str, Any]:
-        """
-        分析新闻文本，提取与特定股票相关的事件
-        
-        参数:
-            news_text: 新闻文本内容
-            stock_symbol: 股票代码
-            news_source: 新闻来源
-            news_url: 新闻URL
-            
-        返回:
-            事件信息字典，包括事件标题、描述、重要程度等
-        """
-        logger.info(f"分析与{stock_symbol}相关的新闻")
-        
-        # 这里应该调用LLM进行分析
-        # 以下是模拟返回结果
-        
-        # 提示词示例
-        prompt = f"""
+        self.prompt_version = prompt_version
+        # 未指定客户端时使用本地模拟LLM
+        # 实际部署时传入真实客户端，如封装OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.client = client if client is not None else MockLLMClient(latency=settings.LLM_MOCK_LATENCY)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        # 分析结果缓存，为None时每篇新闻都调用LLM
+        self.cache = cache
+        # 正在分析中的缓存键，同一批次内的相同新闻只调用一次LLM
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # 跨批次的近似重复索引，为None时只在每个批次内去重
+        self.dedup_index = dedup_index
+        # 打包模式下每个请求的token预算和最多文章数
+        self.pack_token_budget = pack_token_budget
+        self.pack_max_articles = pack_max_articles
+        # 最近一次批量分析的指标
+        self.last_batch_stats: Optional[BatchStats] = None
+        # 最近一次批量分析中属于之前批次事件的重复新闻，见batch_analyze_news
+        self.last_merges: List[Dict[str, Any]] = []
+
+    def _build_prompt(self, news_text: str, stock_symbol: str) -> str:
+        """构造单篇新闻的分析提示词"""
+        return f"""
         请分析以下与股票 {stock_symbol} 相关的新闻，提取出关键事件信息:
-        
+
         新闻内容:
         {news_text}
-        
+
         请返回以下格式的JSON:
         {{
             "has_event": true/false,  // 是否包含值得关注的事件
@@ -52,49 +107,390 @@ class NewsAnalyzer:
             "reasoning": "重要程度判断理由"
         }}
         """
-        
-        # 实际实现中应调用LLM API，这里只是模拟
-        mock_response = {
-            "has_event": True,
-            "title": f"{stock_symbol}公司发布季度财报",
-            "description": f"{stock_symbol}公司发布第三季度财报，收入超出市场预期，但利润略低于分析师预测",
-            "level": 3,  # 中等重要性
-            "reasoning": "财报是重要的公司信息，但影响是中性的，因此评为3级"
-        }
-        
-        if mock_response["has_event"]:
+
+    def _build_packed_prompt(self, news_texts: List[str], stock_symbol: str) -> str:
+        """构造多篇新闻的打包提示词，说明只出现一次，要求按编号返回JSON数组"""
+        articles = "\n".join(f"[新闻{i}]\n{text}\n" for i, text in enumerate(news_texts))
+        return f"""
+        请分别分析以下{len(news_texts)}篇与股票 {stock_symbol} 相关的新闻，提取出每篇的关键事件信息:
+
+        {articles}
+        请按新闻编号顺序返回JSON数组，每篇新闻一个对象:
+        [
+            {{
+                "index": 0,  // 新闻编号
+                "has_event": true/false,  // 是否包含值得关注的事件
+                "title": "事件标题",
+                "description": "事件详细描述",
+                "level": 1-5,  // 事件重要程度，1最低，5最高
+                "reasoning": "重要程度判断理由"
+            }}
+        ]
+        """
+
+    def _pack(self, news_texts: List[str], stock_symbol: str) -> List[List[int]]:
+        """按token预算把文章贪心分组，单篇超出预算的文章单独成组"""
+        overhead = estimate_tokens(self._build_packed_prompt([], stock_symbol))
+        packs: List[List[int]] = []
+        current: List[int] = []
+        used = overhead
+        for i, text in enumerate(news_texts):
+            tokens = estimate_tokens(text) + 8  # 编号等分隔内容
+            if current and (used + tokens > self.pack_token_budget or len(current) >= self.pack_max_articles):
+                packs.append(current)
+                current, used = [], overhead
+            current.append(i)
+            used += tokens
+        if current:
+            packs.append(current)
+        return packs
+
+    @staticmethod
+    def _parse_packed(raw: str, count: int) -> Optional[List[Dict[str, Any]]]:
+        """解析打包请求返回的JSON数组，格式不对或缺少任何一篇的结果时返回None"""
+        try:
+            items = json.loads(raw)
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(items, list):
+            return None
+        by_index = {}
+        for position, item in enumerate(items):
+            if not isinstance(item, dict):
+                return None
+            by_index[item.get("index", position)] = item
+        if any(i not in by_index for i in range(count)):
+            return None
+        return [by_index[i] for i in range(count)]
+
+    async def _complete(self, prompt: str, stats: Optional[BatchStats] = None) -> str:
+        """经过限流和重试调用LLM，可重试错误按带抖动的指数退避重试"""
+        tokens = estimate_tokens(prompt)
+
+        def _count_retry(retry_state) -> None:
+            if stats is not None:
+                stats.retries += 1
+            logger.warning(f"LLM第{retry_state.attempt_number}次调用失败，准备重试: {retry_state.outcome.exception()}")
+
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(self.max_retries + 1),
+            wait=wait_random_exponential(multiplier=0.5, max=10),
+            retry=retry_if_exception_type(TransientLLMError),
+            before_sleep=_count_retry,
+            reraise=True,
+        ):
+            with attempt:
+                waited = await self.rate_limiter.acquire(tokens)
+                if stats is not None:
+                    stats.llm_calls += 1
+                    stats.prompt_tokens += tokens
+                    stats.rate_limit_wait += waited
+                return await self.client.complete(prompt)
+
+    async def _request_response(
+        self,
+        news_text: str,
+        stock_symbol: str,
+        stats: Optional[BatchStats] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """调用LLM并解析返回的JSON，无法解析时返回None"""
+        raw = await self._complete(self._build_prompt(news_text, stock_symbol), stats)
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            logger.warning(f"无法解析LLM返回的JSON: {raw[:200]}")
+            return None
+
+    async def _get_response(
+        self,
+        news_text: str,
+        stock_symbol: str,
+        stats: Optional[BatchStats] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        获取LLM对一篇新闻的解析结果，优先使用缓存
+
+        缓存键由归一化的新闻文本、股票代码、模型名称和提示词版本组成，
+        同一内容正在分析时等待已有的请求而不重复调用
+        """
+        if self.cache is None:
+            return await self._request_response(news_text, stock_symbol, stats)
+
+        key = cache_key(news_text, stock_symbol, self.model_name, self.prompt_version)
+        # 缓存读写访问SQLite文件或远程缓存，放到线程中执行以免阻塞事件循环
+        cached = None
+        if key not in self._inflight:
+            cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is None and key in self._inflight:
+            cached = await asyncio.shield(self._inflight[key])
+        if cached is not None:
+            if stats is not None:
+                stats.cache_hits += 1
+            return cached
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await self._request_response(news_text, stock_symbol, stats)
+            if response is not None:
+                await asyncio.to_thread(self.cache.set, key, response)
+            future.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有等待者时避免"exception was never retrieved"警告
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _analyze(
+        self,
+        news_text: str,
+        stock_symbol: str,
+        news_source: Optional[str] = None,
+        news_url: Optional[str] = None,
+        stats: Optional[BatchStats] = None,
+    ) -> Optional[Dict[str, Any]]:
+        logger.info(f"分析与{stock_symbol}相关的新闻")
+
+        response = await self._get_response(news_text, stock_symbol, stats)
+        return self._event_from_response(response, news_source, news_url)
+
+    @staticmethod
+    def _event_from_response(
+        response: Optional[Dict[str, Any]],
+        news_source: Optional[str] = None,
+        news_url: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """LLM解析结果转换为事件信息字典，没有事件时返回None"""
+        if response and response.get("has_event"):
             return {
-                "title": mock_response["title"],
-                "description": mock_response["description"],
-                "level": mock_response["level"],
+                "title": response["title"],
+                "description": response["description"],
+                "level": response["level"],
                 "source": news_source,
                 "url": news_url
             }
         else:
             return None
-            
-    async def batch_analyze_news(
-        self, 
-        news_list: List[Dict[str, Any]], 
-        stock_symbol: str
-    ) -> List[Dict[str, Any]]:
-        """批量分析新闻文本"""
-        events = []
-        
-        for news in news_list:
-            event = await self.analyze_news(
-                news_text=news.get("content", ""),
-                stock_symbol=stock_symbol,
-                news_source=news.get("source"),
-                news_url=news.get("url")
+
+    async def _analyze_pack(
+        self,
+        news_texts: List[str],
+        stock_symbol: str,
+        stats: BatchStats,
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        用一个请求分析多篇新闻
+
+        返回结果无法解析时对半拆分后分别重试，拆到单篇时退回单篇提示词
+        """
+        if len(news_texts) == 1:
+            return [await self._request_response(news_texts[0], stock_symbol, stats)]
+
+        raw = await self._complete(self._build_packed_prompt(news_texts, stock_symbol), stats)
+        responses = self._parse_packed(raw, len(news_texts))
+        if responses is not None:
+            return responses
+
+        logger.warning(f"无法解析{len(news_texts)}篇新闻的打包结果，拆分后重试")
+        stats.pack_splits += 1
+        mid = len(news_texts) // 2
+        left = await self._analyze_pack(news_texts[:mid], stock_symbol, stats)
+        right = await self._analyze_pack(news_texts[mid:], stock_symbol, stats)
+        return left + right
+
+    def _store_many(self, items: List[Any]) -> None:
+        """把一组(缓存键, 解析结果)写入缓存，在线程中执行"""
+        for key, response in items:
+            self.cache.set(key, response)
+
+    async def _packed_responses(
+        self,
+        news_texts: List[str],
+        stock_symbol: str,
+        semaphore: asyncio.Semaphore,
+        stats: BatchStats,
+    ) -> List[Optional[Dict[str, Any]]]:
+        """打包模式: 先查缓存，未命中的文章按token预算分组并发请求"""
+        responses: List[Optional[Dict[str, Any]]] = [None] * len(news_texts)
+        keys: List[Optional[str]] = [None] * len(news_texts)
+        pending: List[int] = []
+        if self.cache is not None:
+            keys = [cache_key(text, stock_symbol, self.model_name, self.prompt_version) for text in news_texts]
+            # 一次批量读取所有文章的缓存
+            responses = await asyncio.to_thread(self.cache.get_many, keys)
+        for i in range(len(news_texts)):
+            if responses[i] is None:
+                pending.append(i)
+            else:
+                stats.cache_hits += 1
+
+        async def _run(pack: List[int]) -> None:
+            async with semaphore:
+                try:
+                    results = await self._analyze_pack([news_texts[i] for i in pack], stock_symbol, stats)
+                except Exception as e:
+                    stats.failed += len(pack)
+                    logger.error(f"{len(pack)}篇新闻的打包分析失败: {e}")
+                    return
+            stored = []
+            for i, response in zip(pack, results):
+                responses[i] = response
+                if response is not None and keys[i] is not None:
+                    stored.append((keys[i], response))
+            if stored:
+                await asyncio.to_thread(self._store_many, stored)
+
+        packs = [[pending[j] for j in pack] for pack in self._pack([news_texts[i] for i in pending], stock_symbol)]
+        stats.packs = len(packs)
+        await asyncio.gather(*(_run(pack) for pack in packs))
+        return responses
+
+    async def analyze_news(
+        self,
+        news_text: str,
+        stock_symbol: str,
+        news_source: Optional[str] = None,
+        news_url: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        分析新闻文本，提取与特定股票相关的事件
+
+        参数:
+            news_text: 新闻文本内容
+            stock_symbol: 股票代码
+            news_source: 新闻来源
+            news_url: 新闻URL
+
+        返回:
+            事件信息字典，包括事件标题、描述、重要程度等；没有值得关注的事件时返回None
+        """
+        return await self._analyze(news_text, stock_symbol, news_source, news_url)
+
+    async def analyze_news_list(
+        self,
+        news_list: List[Dict[str, Any]],
+        stock_symbol: str,
+        max_concurrency: Optional[int] = None,
+        packed: bool = False,
+        stats: Optional[BatchStats] = None
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        并发分析一组新闻(不去重)，返回与输入一一对应的事件
+
+        没有事件或重试后仍失败的新闻对应None。参数含义同batch_analyze_news
+        """
+        if stats is None:
+            stats = BatchStats(articles=len(news_list))
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+
+        async def _worker(news: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                try:
+                    return await self._get_response(news.get("content", ""), stock_symbol, stats)
+                except Exception as e:
+                    stats.failed += 1
+                    logger.error(f"新闻分析失败({news.get('url')}): {e}")
+                    return None
+
+        if packed:
+            responses = await self._packed_responses(
+                [news.get("content", "") for news in news_list], stock_symbol, semaphore, stats
             )
-            
+        else:
+            # gather按输入顺序返回结果
+            responses = await asyncio.gather(*(_worker(news) for news in news_list))
+
+        events: List[Optional[Dict[str, Any]]] = []
+        for news, response in zip(news_list, responses):
+            event = self._event_from_response(response, news.get("source"), news.get("url"))
             if event:
                 # 添加时间戳
                 event["time"] = news.get("timestamp")
+            events.append(event)
+        return events
+
+    async def batch_analyze_news(
+        self,
+        news_list: List[Dict[str, Any]],
+        stock_symbol: str,
+        max_concurrency: Optional[int] = None,
+        dedupe: bool = True,
+        packed: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        并发批量分析新闻文本
+
+        dedupe为True时先按MinHash-LSH把近似重复的新闻分簇，每簇只分析第一篇，
+        其余新闻的来源和链接合并到事件的sources/urls中。配置了dedup_index时跨批次去重:
+        与之前批次的新闻重复的新闻不再分析，也不产生事件，其来源和链接记录在last_merges中，
+        每项为{"url": 簇代表的url, "sources": [...], "urls": [...]}，由调用方合并到
+        代表所产生的事件(事件urls的第一项)
+
+        packed为True时把多篇新闻打包进一个请求(不超过pack_token_budget个token、
+        pack_max_articles篇)，模型返回JSON数组，重复的说明部分只付一次费用。
+
+        最多同时发出max_concurrency个请求(默认取实例配置)，受请求数和token数限流，
+        可重试错误自动重试。返回的事件顺序与输入新闻一致，重试后仍失败的新闻记录日志后跳过。
+        吞吐指标保存在last_batch_stats中。
+        """
+        stats = BatchStats(articles=len(news_list))
+        started = time.perf_counter()
+        merges: List[Dict[str, Any]] = []
+        if dedupe:
+            clusters = cluster_news(news_list, self.dedup_index)
+        else:
+            clusters = [NewsCluster(i, [i]) for i in range(len(news_list))]
+        stats.duplicates = len(news_list) - sum(1 for cluster in clusters if not cluster.earlier)
+
+        new_clusters = []
+        for cluster in clusters:
+            if cluster.earlier:
+                merges.append({
+                    "url": cluster.representative,
+                    "sources": merge_values(news_list, cluster.positions, "source"),
+                    "urls": merge_values(news_list, cluster.positions, "url"),
+                })
+                stats.merged += len(cluster.positions)
+            else:
+                new_clusters.append(cluster)
+
+        results = await self.analyze_news_list(
+            [news_list[cluster.positions[0]] for cluster in new_clusters],
+            stock_symbol,
+            max_concurrency=max_concurrency,
+            packed=packed,
+            stats=stats,
+        )
+
+        events = []
+        for cluster, event in zip(new_clusters, results):
+            if event:
+                event["sources"] = merge_values(news_list, cluster.positions, "source")
+                event["urls"] = merge_values(news_list, cluster.positions, "url")
                 events.append(event)
-                
+
+        stats.events = len(events)
+        stats.elapsed = time.perf_counter() - started
+        self.last_batch_stats = stats
+        self.last_merges = merges
+        logger.info(
+            f"批量分析完成: {stats.articles}篇新闻({stats.duplicates}篇重复, {stats.merged}篇属于之前的事件), {stats.events}个事件, {stats.failed}篇失败, "
+            f"{stats.retries}次重试, {stats.cache_hits}次缓存命中, 耗时{stats.elapsed:.2f}s ({stats.articles_per_second:.1f}篇/秒)"
+        )
         return events
 
 
-news_analyzer = NewsAnalyzer() 
\ No newline at end of file
+news_analyzer = NewsAnalyzer(
+    model_name=settings.DEFAULT_LLM_NAME,
+    cache=(
+        SharedAnalysisCache(shared_cache, ttl=settings.LLM_CACHE_TTL)
+        if settings.LLM_CACHE_BACKEND == "shared"
+        else AnalysisCache(settings.LLM_CACHE_FILE or DEFAULT_CACHE_FILE, max_entries=settings.LLM_CACHE_MAX_ENTRIES)
+    ) if settings.LLM_CACHE_ENABLED else None,
+)
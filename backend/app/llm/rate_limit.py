@@ -0,0 +1,75 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    异步令牌桶
+
+    按每分钟rate_per_minute的速率补充，容量默认等于一分钟的配额，
+    允许突发但长期速率不超过限制
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """
+        取出amount个令牌，不足时等待补充
+
+        超过容量的请求按容量计算，避免永远等不到
+
+        返回:
+            等待的秒数
+        """
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        # 持锁等待保证先到先得，后来的请求不会插队
+        async with self._lock:
+            self._refill()
+            while self._tokens < amount:
+                delay = (amount - self._tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+                self._refill()
+            self._tokens -= amount
+        return waited
+
+
+class RateLimiter:
+    """同时限制每分钟请求数和每分钟token数，任一限制为None时不启用"""
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    async def acquire(self, tokens: int = 0) -> float:
+        """
+        为一次调用申请配额
+
+        参数:
+            tokens: 本次调用预计消耗的token数
+
+        返回:
+            等待的秒数
+        """
+        waited = 0.0
+        if self.requests is not None:
+            waited += await self.requests.acquire(1)
+        if self.tokens is not None and tokens > 0:
+            waited += await self.tokens.acquire(tokens)
+        return waited
@@ -0,0 +1,21 @@
+import re
+
+# 连续的ASCII字母数字、单个CJK字符、其余非空白符号分别计数
+_TOKEN_PATTERN = re.compile(r"[A-Za-z0-9]+|[\u3400-\u9fff\uf900-\ufaff]|[^\sA-Za-z0-9]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本的token数，用于限流和打包预算
+
+    不依赖具体模型的分词器: 中文约每字1个token，英文单词和数字约每4个字符1个token，
+    标点等符号各算1个token。结果偏保守，适合做上限估计
+    """
+    tokens = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        piece = match.group()
+        if piece.isascii() and piece.isalnum():
+            tokens += (len(piece) + 3) // 4
+        else:
+            tokens += 1
+    return tokens + 1
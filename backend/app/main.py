@@ -1,18 +1,22 @@
+import anyio.to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 import os
 
 from app.api.api import api_router
 from app.core.config import settings
+from app.core.response_cache import add_response_cache
 
 # 根据环境变量决定是否使用数据库
 USE_DATABASE = os.getenv("USE_DATABASE", "false").lower() == "true"
 
 if USE_DATABASE:
     from app.db.base import Base
-    from app.db.session import engine, SessionLocal
+    from app.db.session import async_engine, engine, SessionLocal
     from app.db.init_db import init_db
+    from app.db.partitions import ensure_upcoming_partitions
 
 
 def create_tables():
@@ -26,9 +30,14 @@ def get_application():
     _app = FastAPI(
         title=settings.PROJECT_NAME,
         openapi_url=f"{settings.API_V1_STR}/openapi.json",
-        description="股票事件追踪系统API"
+        description="股票事件追踪系统API",
+        # 默认使用orjson序列化响应
+        default_response_class=ORJSONResponse,
     )
 
+    # 事件接口的响应缓存，放在CORS之内，缓存命中和304响应同样带CORS头
+    add_response_cache(_app)
+
     # 设置CORS
     origins = []
     try:
@@ -47,6 +56,8 @@ def get_application():
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # 允许前端读取分页游标等自定义响应头
+        expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag"],
     )
 
     # 挂载API路由
@@ -61,10 +72,15 @@ app = get_application()
 @app.on_event("startup")
 async def startup_event():
     """应用启动事件"""
+    # 剩余的同步处理函数、同步数据库会话和文件读写都在这个线程池中执行
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    
     # 如果使用数据库，创建表并初始化
     if USE_DATABASE:
         # 创建数据库表
         create_tables()
+        # PostgreSQL分区表提前创建后续日期的价格分区
+        ensure_upcoming_partitions(engine)
         
         # 初始化数据库
         db = SessionLocal()
@@ -73,4 +89,19 @@ async def startup_event():
         finally:
             db.close()
     else:
-        print("使用模拟数据，不连接数据库") 
\ No newline at end of file
+        print("使用模拟数据，不连接数据库")
+        # 启动时一次性加载事件文件到内存
+        from app.core.versions import event_versions
+        from app.mock_data import events as mock_events
+        mock_events.warm_up()
+        # 响应缓存读取版本号前先同步其他进程对事件文件的修改
+        event_versions.add_refresher(mock_events.refresh, due=mock_events.refresh_due) 
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭事件: 关闭连接池中的数据库连接"""
+    if USE_DATABASE:
+        if async_engine is not None:
+            await async_engine.dispose()
+        engine.dispose()
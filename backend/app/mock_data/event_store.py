@@ -0,0 +1,993 @@
+import bisect
+import contextlib
+import heapq
+import itertools
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within one process
+    fcntl = None
+
+# (start_time, event id as string) - the order every per-symbol list is kept in
+SortKey = Tuple[int, str]
+
+# (json mtime_ns, json size, journal mtime_ns, journal size) of one symbol
+FileState = Tuple[int, int, int, int]
+
+JOURNAL_SUFFIX = ".journal"
+
+# Event fields with a secondary index
+INDEXED_FIELDS = ("level", "category", "impact", "duration_type")
+
+
+class VersionConflict(Exception):
+    """An update was based on an older version of the event than the stored one."""
+
+    def __init__(self, event_id: Any, current: int):
+        super().__init__(f"event {event_id} is at version {current}")
+        self.event_id = event_id
+        self.current = current
+
+
+def event_key(event: Dict[str, Any]) -> str:
+    """Return the lookup key of an event (ids may be ints or uuid strings on disk)."""
+    return str(event["id"])
+
+
+def sort_key(event: Dict[str, Any]) -> SortKey:
+    """Return the (start_time, id) key used to order events."""
+    return (event["start_time"], event_key(event))
+
+
+def _first(key: SortKey) -> int:
+    return key[0]
+
+
+def _fsync_dir(directory: str) -> None:
+    """Flush a directory entry change (rename/unlink) to disk where supported."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_json(path: str, data: Any) -> None:
+    """Write JSON to a temp file, fsync it and rename it over ``path``.
+
+    Readers see either the old or the new file, never a half-written one.
+    """
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp_path)
+        raise
+    _fsync_dir(directory)
+
+
+class EventDirectory:
+    """Persistent event id -> stock symbol map kept in a small SQLite file.
+
+    Lets a cold process answer a single-event lookup by opening only the one
+    stock file that holds the event. The file also records the file state
+    each symbol was indexed at, so an unchanged symbol is not re-indexed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS event_index ("
+                "id TEXT PRIMARY KEY, stock_symbol TEXT NOT NULL) WITHOUT ROWID"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_event_index_symbol ON event_index (stock_symbol)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS file_states ("
+                "stock_symbol TEXT PRIMARY KEY, state TEXT NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def lookup(self, event_id: Any) -> Optional[str]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT stock_symbol FROM event_index WHERE id = ?", (str(event_id),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, event_id: Any, stock_symbol: str) -> None:
+        with self._lock:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO event_index (id, stock_symbol) VALUES (?, ?)",
+                (str(event_id), stock_symbol),
+            )
+
+    def remove(self, event_id: Any) -> None:
+        with self._lock:
+            self._connect().execute("DELETE FROM event_index WHERE id = ?", (str(event_id),))
+
+    def file_state(self, stock_symbol: str) -> Optional[FileState]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT state FROM file_states WHERE stock_symbol = ?", (stock_symbol,)
+            ).fetchone()
+        return tuple(json.loads(row[0])) if row else None
+
+    def reindex_symbol(
+        self, stock_symbol: str, event_ids: Iterable[str], state: Optional[FileState]
+    ) -> None:
+        """Replace every entry of a symbol in one transaction."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN")
+            try:
+                conn.execute("DELETE FROM event_index WHERE stock_symbol = ?", (stock_symbol,))
+                conn.executemany(
+                    "INSERT OR REPLACE INTO event_index (id, stock_symbol) VALUES (?, ?)",
+                    ((event_id, stock_symbol) for event_id in event_ids),
+                )
+                self._record_file_state(conn, stock_symbol, state)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def record_file_state(self, stock_symbol: str, state: Optional[FileState]) -> None:
+        """Remember the file state a symbol's entries are current for."""
+        with self._lock:
+            self._record_file_state(self._connect(), stock_symbol, state)
+
+    @staticmethod
+    def _record_file_state(
+        conn: sqlite3.Connection, stock_symbol: str, state: Optional[FileState]
+    ) -> None:
+        if state is None:
+            conn.execute("DELETE FROM file_states WHERE stock_symbol = ?", (stock_symbol,))
+        else:
+            conn.execute(
+                "INSERT OR REPLACE INTO file_states (stock_symbol, state) VALUES (?, ?)",
+                (stock_symbol, json.dumps(list(state))),
+            )
+
+
+class SymbolIndex:
+    """Read-only indexes of one symbol's events.
+
+    Holds a by-id map, the (start_time, id) sort keys in ascending order and
+    secondary indexes on :data:`INDEXED_FIELDS`. Writers build a
+    new instance with :meth:`with_changes` and publish it by swapping a
+    reference; a published instance is never mutated, so readers use it
+    without taking any lock.
+    """
+
+    __slots__ = ("by_id", "keys", "indexes")
+
+    def __init__(
+        self,
+        by_id: Dict[str, Dict[str, Any]],
+        keys: List[SortKey],
+        indexes: Dict[str, Dict[Any, Set[str]]],
+    ):
+        self.by_id = by_id
+        self.keys = keys
+        self.indexes = indexes
+
+    @classmethod
+    def build(cls, events: Iterable[Dict[str, Any]]) -> "SymbolIndex":
+        """Index events from scratch (a later event replaces an earlier one with the same id)."""
+        by_id = {event_key(event): event for event in events}
+        indexes: Dict[str, Dict[Any, Set[str]]] = {field: {} for field in INDEXED_FIELDS}
+        for key, event in by_id.items():
+            for field, values in indexes.items():
+                values.setdefault(event.get(field), set()).add(key)
+        return cls(by_id, sorted(sort_key(event) for event in by_id.values()), indexes)
+
+    def with_changes(
+        self, puts: Iterable[Dict[str, Any]] = (), removed: Iterable[str] = ()
+    ) -> Tuple["SymbolIndex", List[Dict[str, Any]]]:
+        """Return a copy with ``puts`` stored and ``removed`` keys dropped.
+
+        Also returns the events that left the index, including the previous
+        version of every replaced event.
+        """
+        puts = list(puts)
+        if len(puts) > len(self.keys) // 4:
+            # Large batch: index everything once instead of inserting one by one
+            by_id = dict(self.by_id)
+            gone = [by_id.pop(key) for key in set(removed) if key in by_id]
+            for event in puts:
+                previous = by_id.pop(event_key(event), None)
+                if previous is not None:
+                    gone.append(previous)
+                by_id[event_key(event)] = event
+            return SymbolIndex.build(by_id.values()), gone
+
+        by_id = dict(self.by_id)
+        keys = list(self.keys)
+        indexes = {field: dict(values) for field, values in self.indexes.items()}
+        # Index sets copied for this change; like everything else they are
+        # not modified again once the new index is published
+        copied: Dict[Tuple[str, Any], Set[str]] = {}
+        gone: List[Dict[str, Any]] = []
+
+        def ids_for(field: str, value: Any) -> Set[str]:
+            ids = copied.get((field, value))
+            if ids is None:
+                ids = copied[(field, value)] = set(indexes[field].get(value, ()))
+            return ids
+
+        def drop(key: str) -> None:
+            event = by_id.pop(key, None)
+            if event is None:
+                return
+            skey = sort_key(event)
+            i = bisect.bisect_left(keys, skey)
+            if i < len(keys) and keys[i] == skey:
+                del keys[i]
+            for field in indexes:
+                ids_for(field, event.get(field)).discard(key)
+            gone.append(event)
+
+        for key in removed:
+            drop(key)
+        for event in puts:
+            key = event_key(event)
+            drop(key)
+            by_id[key] = event
+            bisect.insort(keys, sort_key(event))
+            for field in indexes:
+                ids_for(field, event.get(field)).add(key)
+
+        for (field, value), ids in copied.items():
+            if ids:
+                indexes[field][value] = ids
+            else:
+                indexes[field].pop(value, None)
+        return SymbolIndex(by_id, keys, indexes), gone
+
+    def candidates(
+        self,
+        min_level: Optional[int],
+        max_level: Optional[int],
+        duration_type: Optional[str],
+        category: Optional[str],
+        impact: Optional[str],
+    ) -> Optional[Set[str]]:
+        """Intersect the secondary indexes; None means no indexed filter applies."""
+        sets: List[Set[str]] = []
+        if min_level is not None or max_level is not None:
+            lo = min_level if min_level is not None else float("-inf")
+            hi = max_level if max_level is not None else float("inf")
+            level_ids: Set[str] = set()
+            for level, ids in self.indexes["level"].items():
+                if lo <= level <= hi:
+                    level_ids |= ids
+            sets.append(level_ids)
+        for field, value in (
+            ("duration_type", duration_type),
+            ("category", category),
+            ("impact", impact),
+        ):
+            if value is not None:
+                sets.append(self.indexes[field].get(value, set()))
+        if not sets:
+            return None
+        sets.sort(key=len)
+        result = set(sets[0])
+        for ids in sets[1:]:
+            result &= ids
+        return result
+
+    def time_range(self, start_time: Optional[int], end_time: Optional[int]) -> Tuple[int, int]:
+        """Positions [lo, hi) of the sort keys within the start_time range."""
+        lo = 0 if start_time is None else bisect.bisect_left(self.keys, start_time, key=_first)
+        hi = len(self.keys) if end_time is None else bisect.bisect_right(self.keys, end_time, key=_first)
+        return lo, hi
+
+
+_EMPTY_INDEX = SymbolIndex.build(())
+
+
+class EventStore:
+    """Resident, indexed copy of the per-symbol mock event files.
+
+    Every stock file is parsed once and kept in memory as plain dicts, with
+    one immutable :class:`SymbolIndex` per symbol holding:
+
+    - a by-id hash map,
+    - the symbol's sort keys, ordered by ``start_time``,
+    - secondary indexes on level/category/impact/duration_type.
+
+    Queries across symbols merge the per-symbol results in order.
+
+    The stocks directory is re-stat'ed at most every ``check_interval`` seconds
+    and only files whose mtime or size changed are parsed again, so reads
+    between two checks do no file I/O at all.
+
+    On disk each symbol is a ``{symbol}.json`` snapshot plus an append-only
+    ``{symbol}.journal`` of put/delete records. Writes append to the journal
+    of the affected symbol only; once it holds ``compact_threshold`` records
+    the snapshot is rewritten atomically and the journal dropped.
+
+    With a ``directory`` attached, :meth:`get` on a store that has not been
+    fully loaded yet reads only the file holding the requested event.
+
+    Writers hold :meth:`locked` for the symbols they touch: a per-symbol
+    ``flock`` on a hidden lock file (plus a thread lock) serializes writers
+    across threads and processes, and the symbol is re-synced from disk
+    before the caller reads or mutates it, so no process writes from a stale
+    view. Disk I/O and file-lock waits happen outside the store lock.
+
+    Only writers (and the periodic refresh) take the store lock. A write
+    builds new indexes for the symbols it touches and publishes them by
+    replacing the symbol map in one assignment; queries read whichever map is
+    current and never lock, so a long write never stalls them.
+
+    Listeners registered with :meth:`add_listener` are called with
+    ``(event, removed)`` for every event entering or leaving the indexes,
+    whether from a local write or from reloading a file changed on disk.
+    They run under the store lock and must not call back into the store.
+    """
+
+    def __init__(
+        self,
+        stocks_dir: str,
+        fallback_loader: Optional[Callable[[], List[Dict[str, Any]]]] = None,
+        check_interval: float = 1.0,
+        directory: Optional[EventDirectory] = None,
+        compact_threshold: int = 100,
+    ):
+        self.stocks_dir = stocks_dir
+        self.fallback_loader = fallback_loader
+        self.check_interval = check_interval
+        self.directory = directory
+        self.compact_threshold = compact_threshold
+
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._from_fallback = False
+        self._last_check = 0.0
+        self._file_state: Dict[str, FileState] = {}
+        self._symbol_checked: Dict[str, float] = {}
+        self._journal_entries: Dict[str, int] = {}
+
+        # symbol -> SymbolIndex, replaced as a whole on every write
+        self._symbols: Dict[str, SymbolIndex] = {}
+        # event id -> symbol, a lookup hint maintained by writers
+        self._symbol_of: Dict[str, str] = {}
+        self._listeners: List[Callable[[Dict[str, Any], bool], None]] = []
+        self._symbol_locks: Dict[str, threading.Lock] = {}
+        self._symbol_locks_guard = threading.Lock()
+
+    def add_listener(self, callback: Callable[[Dict[str, Any], bool], None]) -> None:
+        """Call ``callback(event, removed)`` on every index insert and removal."""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def _notify(self, event: Dict[str, Any], removed: bool) -> None:
+        for callback in self._listeners:
+            callback(event, removed)
+
+    # ------------------------------------------------------------------
+    # Loading and invalidation
+    # ------------------------------------------------------------------
+    def file_path(self, stock_symbol: str) -> str:
+        """Get the file path for a specific stock's events."""
+        return os.path.join(self.stocks_dir, f"{stock_symbol}.json")
+
+    def journal_path(self, stock_symbol: str) -> str:
+        """Get the append-only journal path for a specific stock's events."""
+        return os.path.join(self.stocks_dir, f"{stock_symbol}{JOURNAL_SUFFIX}")
+
+    def lock_path(self, stock_symbol: str) -> str:
+        """Hidden per-symbol lock file (skipped by the directory scan)."""
+        return os.path.join(self.stocks_dir, f".{stock_symbol}.lock")
+
+    @contextlib.contextmanager
+    def locked(self, *stock_symbols: str) -> Iterator[None]:
+        """Hold the write lock of the given symbols, synced with disk.
+
+        Locks are taken in sorted order so writers touching several symbols
+        cannot deadlock. Inside the block the in-memory copy of each symbol
+        includes every write other processes made before the lock was taken.
+        """
+        symbols = sorted(set(stock_symbols))
+        with contextlib.ExitStack() as stack:
+            for symbol in symbols:
+                with self._symbol_locks_guard:
+                    thread_lock = self._symbol_locks.setdefault(symbol, threading.Lock())
+                stack.enter_context(thread_lock)
+                if fcntl is not None:
+                    os.makedirs(self.stocks_dir, exist_ok=True)
+                    f = stack.enter_context(open(self.lock_path(symbol), "a+b"))
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                    stack.callback(fcntl.flock, f.fileno(), fcntl.LOCK_UN)
+            self.sync(symbols)
+            yield
+
+    def sync(self, stock_symbols: Iterable[str]) -> None:
+        """Reload the given symbols now if their files changed on disk.
+
+        Only meaningful while holding :meth:`locked` for the symbols: the
+        files are read outside the index lock and cannot change until the
+        parsed events are swapped in.
+        """
+        for symbol in stock_symbols:
+            state = self._stat_symbol(symbol)
+            with self._lock:
+                self._symbol_checked[symbol] = time.monotonic()
+                if state == self._file_state.get(symbol):
+                    continue
+            if state is None:
+                with self._lock:
+                    # Another process removed the symbol's last event
+                    self._drop_symbol(symbol)
+                    self._file_state.pop(symbol, None)
+                    self._journal_entries.pop(symbol, None)
+                    if self.directory is not None:
+                        self.directory.reindex_symbol(symbol, [], None)
+                continue
+            loaded = self._read_symbol(symbol)
+            with self._lock:
+                self._apply_symbol(symbol, state, loaded)
+
+    def _scan(self) -> Dict[str, FileState]:
+        """Stat every stock snapshot and journal, returning symbol -> file state."""
+        parts: Dict[str, List[int]] = {}
+        try:
+            entries = os.scandir(self.stocks_dir)
+        except FileNotFoundError:
+            return {}
+        with entries:
+            for entry in entries:
+                if entry.name.startswith(".") or not entry.is_file():
+                    continue
+                if entry.name.endswith(".json"):
+                    symbol, offset = entry.name[:-len(".json")], 0
+                elif entry.name.endswith(JOURNAL_SUFFIX):
+                    symbol, offset = entry.name[:-len(JOURNAL_SUFFIX)], 2
+                else:
+                    continue
+                st = entry.stat()
+                state = parts.setdefault(symbol, [0, 0, 0, 0])
+                state[offset], state[offset + 1] = st.st_mtime_ns, st.st_size
+        return {symbol: tuple(state) for symbol, state in parts.items()}
+
+    def _stat_symbol(self, stock_symbol: str) -> Optional[FileState]:
+        state = [0, 0, 0, 0]
+        for offset, path in ((0, self.file_path(stock_symbol)), (2, self.journal_path(stock_symbol))):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            state[offset], state[offset + 1] = st.st_mtime_ns, st.st_size
+        return tuple(state) if any(state) else None
+
+    def _read_symbol(self, stock_symbol: str) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+        """Parse a symbol's snapshot and replay its journal on top.
+
+        Returns (events, journal record count), or None if the snapshot is not
+        valid JSON (e.g. written by a tool that does not rename atomically).
+        """
+        try:
+            with open(self.file_path(stock_symbol), "r", encoding="utf-8") as f:
+                events = json.load(f)
+        except FileNotFoundError:
+            events = []
+        except json.JSONDecodeError:
+            return None
+
+        entries = 0
+        try:
+            with open(self.journal_path(stock_symbol), "r", encoding="utf-8") as f:
+                journal = f.read()
+        except FileNotFoundError:
+            return events, entries
+
+        by_key = {event_key(event): event for event in events}
+        for line in journal.splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Torn tail of an interrupted append
+                break
+            if record["op"] == "put":
+                by_key[event_key(record["event"])] = record["event"]
+            elif record["op"] == "del":
+                by_key.pop(str(record["id"]), None)
+            entries += 1
+        return list(by_key.values()), entries
+
+    def refresh_due(self) -> bool:
+        """Whether the next :meth:`refresh` would check the files on disk."""
+        return not self._loaded or time.monotonic() - self._last_check >= self.check_interval
+
+    def refresh(self, force: bool = False) -> None:
+        """Reload stock files that changed on disk since the last check.
+
+        Files are stat'ed and parsed without holding the index lock; only the
+        swap of the parsed symbols into the indexes is done under it.
+        """
+        now = time.monotonic()
+        if not force and self._loaded and now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+
+        current = self._scan()
+        with self._lock:
+            known = dict(self._file_state)
+        changed = [symbol for symbol, state in current.items() if known.get(symbol) != state]
+        parsed = {symbol: self._read_symbol(symbol) for symbol in changed}
+
+        with self._lock:
+            if not current:
+                # No per-stock files yet: serve the legacy single events file
+                if not self._loaded and self.fallback_loader is not None:
+                    self._load_fallback()
+                self._loaded = True
+                return
+
+            if self._from_fallback:
+                self._clear()
+                self._from_fallback = False
+
+            for stock_symbol in [s for s in self._file_state if s not in current]:
+                if self._file_state[stock_symbol] != known.get(stock_symbol):
+                    continue  # written by this process after the scan
+                self._drop_symbol(stock_symbol)
+                del self._file_state[stock_symbol]
+                if self.directory is not None:
+                    self.directory.reindex_symbol(stock_symbol, [], None)
+
+            for stock_symbol in changed:
+                # Skip symbols this process wrote while we were parsing: the
+                # indexes already hold something newer than what we read
+                if self._file_state.get(stock_symbol) != known.get(stock_symbol):
+                    continue
+                self._apply_symbol(stock_symbol, current[stock_symbol], parsed[stock_symbol])
+
+            self._loaded = True
+
+    def _load_symbol(self, stock_symbol: str, state: FileState) -> bool:
+        """Parse one stock file into the indexes and keep the directory in sync."""
+        return self._apply_symbol(stock_symbol, state, self._read_symbol(stock_symbol))
+
+    def _apply_symbol(
+        self,
+        stock_symbol: str,
+        state: FileState,
+        loaded: Optional[Tuple[List[Dict[str, Any]], int]],
+    ) -> bool:
+        """Publish a parsed symbol (caller holds the lock)."""
+        if loaded is None:
+            # Half-written file; keep what we have and retry later
+            return False
+        events, self._journal_entries[stock_symbol] = loaded
+        self._replace_symbol(stock_symbol, events)
+        self._file_state[stock_symbol] = state
+        self._symbol_checked[stock_symbol] = time.monotonic()
+        if self.directory is not None and self.directory.file_state(stock_symbol) != state:
+            self.directory.reindex_symbol(
+                stock_symbol, [event_key(event) for event in events], state
+            )
+        return True
+
+    def _ensure_symbol(self, stock_symbol: str) -> None:
+        """Load (or revalidate) a single symbol without scanning the directory."""
+        now = time.monotonic()
+        if (
+            stock_symbol in self._file_state
+            and now - self._symbol_checked.get(stock_symbol, 0.0) < self.check_interval
+        ):
+            return
+        state = self._stat_symbol(stock_symbol)
+        self._symbol_checked[stock_symbol] = now
+        if state is not None and self._file_state.get(stock_symbol) != state:
+            self._load_symbol(stock_symbol, state)
+
+    def _load_fallback(self) -> None:
+        events = self.fallback_loader() if self.fallback_loader else []
+        self._clear()
+        by_symbol: Dict[str, List[Dict[str, Any]]] = {}
+        for event in events:
+            by_symbol.setdefault(event["stock_symbol"], []).append(event)
+        for stock_symbol, symbol_events in by_symbol.items():
+            self._replace_symbol(stock_symbol, symbol_events)
+        self._from_fallback = True
+
+    def mark_written(self, stock_symbols: Optional[Iterable[str]] = None) -> None:
+        """Record the on-disk state of files this process just wrote.
+
+        Prevents the next refresh from re-parsing our own writes.
+        """
+        with self._lock:
+            if stock_symbols is None:
+                current = self._scan()
+            else:
+                current = {symbol: self._stat_symbol(symbol) for symbol in stock_symbols}
+            for stock_symbol, state in current.items():
+                if state is not None:
+                    self._file_state[stock_symbol] = state
+                else:
+                    self._file_state.pop(stock_symbol, None)
+                if self.directory is not None:
+                    self.directory.record_file_state(stock_symbol, state)
+
+    # ------------------------------------------------------------------
+    # Index maintenance
+    # ------------------------------------------------------------------
+    def _commit(
+        self,
+        changed: Dict[str, SymbolIndex],
+        gone: Iterable[Dict[str, Any]] = (),
+        added: Iterable[Dict[str, Any]] = (),
+    ) -> None:
+        """Publish new indexes of the changed symbols (caller holds the lock).
+
+        ``gone`` and ``added`` are the events that left and entered the
+        indexes; the id hint map is updated and listeners are notified after
+        the swap.
+        """
+        symbols = dict(self._symbols)
+        for stock_symbol, index in changed.items():
+            if index.by_id:
+                symbols[stock_symbol] = index
+            else:
+                symbols.pop(stock_symbol, None)
+        self._symbols = symbols
+        for event in gone:
+            self._symbol_of.pop(event_key(event), None)
+            self._notify(event, True)
+        for event in added:
+            self._symbol_of[event_key(event)] = event["stock_symbol"]
+            self._notify(event, False)
+
+    def _clear(self) -> None:
+        self._commit(
+            {symbol: _EMPTY_INDEX for symbol in self._symbols},
+            [event for index in self._symbols.values() for event in index.by_id.values()],
+        )
+
+    def _apply(self, puts: Iterable[Dict[str, Any]] = (), removed: Iterable[str] = ()) -> None:
+        """Store ``puts``, drop the ``removed`` keys and publish the touched symbols."""
+        # The last put of an id wins, as if they were applied one by one
+        puts = list({event_key(event): event for event in puts}.values())
+        changes: Dict[str, Tuple[List[Dict[str, Any]], List[str]]] = {}
+        for key in removed:
+            stock_symbol = self._symbol_of.get(key)
+            if stock_symbol is not None:
+                changes.setdefault(stock_symbol, ([], []))[1].append(key)
+        for event in puts:
+            previous = self._symbol_of.get(event_key(event))
+            if previous is not None and previous != event["stock_symbol"]:
+                # Moved to another symbol
+                changes.setdefault(previous, ([], []))[1].append(event_key(event))
+            changes.setdefault(event["stock_symbol"], ([], []))[0].append(event)
+
+        changed: Dict[str, SymbolIndex] = {}
+        gone: List[Dict[str, Any]] = []
+        for stock_symbol, (symbol_puts, symbol_removed) in changes.items():
+            index = self._symbols.get(stock_symbol, _EMPTY_INDEX)
+            changed[stock_symbol], symbol_gone = index.with_changes(symbol_puts, symbol_removed)
+            gone += symbol_gone
+        self._commit(changed, gone, puts)
+
+    def _drop_symbol(self, stock_symbol: str) -> None:
+        index = self._symbols.get(stock_symbol)
+        if index is not None:
+            self._commit({stock_symbol: _EMPTY_INDEX}, list(index.by_id.values()))
+
+    def _replace_symbol(self, stock_symbol: str, events: List[Dict[str, Any]]) -> None:
+        index = SymbolIndex.build(events)
+        changed = {stock_symbol: index}
+        gone = list(self._symbols.get(stock_symbol, _EMPTY_INDEX).by_id.values())
+        # Events another process moved here from a symbol this process still holds
+        moved: Dict[str, List[str]] = {}
+        for key in index.by_id:
+            previous = self._symbol_of.get(key)
+            if previous is not None and previous != stock_symbol:
+                moved.setdefault(previous, []).append(key)
+        for previous, keys in moved.items():
+            changed[previous], previous_gone = self._symbols.get(previous, _EMPTY_INDEX).with_changes(removed=keys)
+            gone += previous_gone
+        self._commit(changed, gone, list(index.by_id.values()))
+
+    # ------------------------------------------------------------------
+    # Mutations (in memory first, then persist() the touched symbols)
+    # ------------------------------------------------------------------
+    def put(self, event: Dict[str, Any]) -> None:
+        """Insert or replace an event in every index."""
+        self.put_many([event])
+
+    def put_many(self, events: Iterable[Dict[str, Any]]) -> None:
+        """Insert or replace several events, publishing each touched symbol once."""
+        events = list(events)
+        with self._lock:
+            self._apply(puts=events)
+            if self.directory is not None:
+                for event in events:
+                    self.directory.set(event_key(event), event["stock_symbol"])
+
+    def discard(self, event_id: Any) -> Optional[Dict[str, Any]]:
+        """Remove an event from every index, returning it if it existed."""
+        key = str(event_id)
+        with self._lock:
+            event = self._lookup(key)
+            if event is None:
+                return None
+            self._apply(removed=[key])
+            if self.directory is not None:
+                self.directory.remove(key)
+            return event
+
+    def persist(
+        self,
+        stock_symbol: str,
+        changed: Iterable[Dict[str, Any]] = (),
+        deleted: Iterable[Any] = (),
+    ) -> None:
+        """Write the changes of one symbol to disk, touching only its files.
+
+        ``changed`` events are journaled as puts and ``deleted`` ids as
+        deletes; a symbol left without events has its files removed.
+        The caller must hold :meth:`locked` for the symbol. What to write is
+        decided under the index lock; the file I/O itself runs outside it.
+        """
+        snapshots: Dict[str, List[Dict[str, Any]]] = {}
+        journal: List[Dict[str, Any]] = []
+        with self._lock:
+            written = [stock_symbol]
+            if self._from_fallback:
+                # First write after serving the legacy events file: split it
+                # into per-stock snapshots so no other symbol is lost
+                for symbol in self.symbols():
+                    snapshots[symbol] = self.events_for_symbol(symbol)
+                    self._journal_entries[symbol] = 0
+                    written.append(symbol)
+                self._from_fallback = False
+
+            records = [{"op": "put", "event": event} for event in changed]
+            records += [{"op": "del", "id": str(event_id)} for event_id in deleted]
+
+            remove_files = stock_symbol not in self._symbols
+            if remove_files:
+                self._journal_entries.pop(stock_symbol, None)
+            elif self._journal_entries.get(stock_symbol, 0) + len(records) >= self.compact_threshold:
+                snapshots[stock_symbol] = self.events_for_symbol(stock_symbol)
+                self._journal_entries[stock_symbol] = 0
+            elif records and stock_symbol not in snapshots:
+                journal = records
+                self._journal_entries[stock_symbol] = self._journal_entries.get(stock_symbol, 0) + len(records)
+
+        for symbol, events in snapshots.items():
+            self._write_snapshot(symbol, events)
+        if remove_files:
+            self._delete_files(stock_symbol)
+        elif journal:
+            self._append_journal(stock_symbol, journal)
+        self.mark_written(written)
+
+    def compact(self, stock_symbol: Optional[str] = None) -> None:
+        """Fold journals into snapshots (all symbols when none is given)."""
+        symbols = [stock_symbol] if stock_symbol else list(self._journal_entries)
+        for symbol in symbols:
+            with self.locked(symbol):
+                with self._lock:
+                    events = self.events_for_symbol(symbol) if symbol in self._symbols else None
+                    if events is None:
+                        self._journal_entries.pop(symbol, None)
+                    else:
+                        self._journal_entries[symbol] = 0
+                if events is None:
+                    self._delete_files(symbol)
+                else:
+                    self._write_snapshot(symbol, events)
+                self.mark_written([symbol])
+
+    def _append_journal(self, stock_symbol: str, records: List[Dict[str, Any]]) -> None:
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        with open(self.journal_path(stock_symbol), "a", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _write_snapshot(self, stock_symbol: str, events: List[Dict[str, Any]]) -> None:
+        atomic_write_json(self.file_path(stock_symbol), events)
+        # Replaying a journal over the new snapshot is idempotent, so a crash
+        # between the rename and this unlink loses nothing
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.journal_path(stock_symbol))
+
+    def _delete_files(self, stock_symbol: str) -> None:
+        for path in (self.journal_path(stock_symbol), self.file_path(stock_symbol)):
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(path)
+        _fsync_dir(self.stocks_dir)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        symbols = self._symbols
+        index = symbols.get(self._symbol_of.get(key))
+        event = index.by_id.get(key) if index is not None else None
+        if event is None:
+            # The id hint map is updated just after each swap; search the symbols
+            for index in symbols.values():
+                event = index.by_id.get(key)
+                if event is not None:
+                    break
+        return event
+
+    def get(self, event_id: Any, refresh: bool = True) -> Optional[Dict[str, Any]]:
+        """Look up one event, loading as little as possible on a cold store.
+
+        With ``refresh=False`` a loaded store answers from memory without the
+        rate-limited check of the files on disk (the caller has just done it).
+        """
+        key = str(event_id)
+        if self._loaded or self.directory is None:
+            if refresh:
+                self.refresh()
+            return self._lookup(key)
+
+        with self._lock:
+            stock_symbol = self.directory.lookup(key)
+            if stock_symbol is not None:
+                self._ensure_symbol(stock_symbol)
+                event = self._lookup(key)
+                if event is not None and event["stock_symbol"] == stock_symbol:
+                    return event
+            # Unknown or stale directory entry: fall back to a full load
+            self.refresh(force=True)
+            return self._lookup(key)
+
+    def symbols(self) -> List[str]:
+        return list(self._symbols)
+
+    def events_for_symbol(self, stock_symbol: str) -> List[Dict[str, Any]]:
+        """All events of a symbol in ascending ``start_time`` order."""
+        index = self._symbols.get(stock_symbol, _EMPTY_INDEX)
+        return [index.by_id[key] for _, key in index.keys]
+
+    def all_events(self) -> List[Dict[str, Any]]:
+        return [event for index in self._symbols.values() for event in index.by_id.values()]
+
+    def _indexes_for(self, stock_symbol: Optional[str]) -> List[SymbolIndex]:
+        symbols = self._symbols
+        if stock_symbol:
+            return [symbols.get(stock_symbol, _EMPTY_INDEX)]
+        return list(symbols.values())
+
+    def count(
+        self,
+        *,
+        stock_symbol: Optional[str] = None,
+        min_level: Optional[int] = None,
+        max_level: Optional[int] = None,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        duration_type: Optional[str] = None,
+        category: Optional[str] = None,
+        impact: Optional[str] = None,
+    ) -> int:
+        """Count matching events from the indexes without building a result list."""
+        total = 0
+        for index in self._indexes_for(stock_symbol):
+            lo, hi = index.time_range(start_time, end_time)
+            candidates = index.candidates(min_level, max_level, duration_type, category, impact)
+            if candidates is None:
+                total += max(hi - lo, 0)
+            elif len(candidates) < hi - lo:
+                for key in candidates:
+                    event = index.by_id[key]
+                    if start_time is not None and event["start_time"] < start_time:
+                        continue
+                    if end_time is not None and event["start_time"] > end_time:
+                        continue
+                    total += 1
+            else:
+                total += sum(1 for i in range(lo, hi) if index.keys[i][1] in candidates)
+        return total
+
+    @staticmethod
+    def _descending(
+        index: SymbolIndex,
+        candidates: Optional[Set[str]],
+        start_time: Optional[int],
+        end_time: Optional[int],
+        cursor: Optional[SortKey],
+        limit: int,
+    ) -> Iterable[Dict[str, Any]]:
+        """Matching events of one symbol, newest first (lazily where possible)."""
+        keys = index.keys
+        lo, hi = index.time_range(start_time, end_time)
+        if cursor is not None:
+            hi = min(hi, bisect.bisect_left(keys, tuple(cursor)))
+        if candidates is None:
+            return (index.by_id[keys[i][1]] for i in range(hi - 1, max(lo, hi - limit) - 1, -1))
+
+        if len(candidates) * 4 < hi - lo:
+            # The indexed filters are selective: walk the candidates instead of the range
+            matched = []
+            for key in candidates:
+                event = index.by_id[key]
+                if start_time is not None and event["start_time"] < start_time:
+                    continue
+                if end_time is not None and event["start_time"] > end_time:
+                    continue
+                if cursor is not None and sort_key(event) >= tuple(cursor):
+                    continue
+                matched.append(event)
+            matched.sort(key=sort_key, reverse=True)
+            return matched[:limit]
+
+        return (index.by_id[keys[i][1]] for i in range(hi - 1, lo - 1, -1) if keys[i][1] in candidates)
+
+    def query(
+        self,
+        *,
+        stock_symbol: Optional[str] = None,
+        min_level: Optional[int] = None,
+        max_level: Optional[int] = None,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        duration_type: Optional[str] = None,
+        category: Optional[str] = None,
+        impact: Optional[str] = None,
+        cursor: Optional[SortKey] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return matching events ordered by ``start_time`` (then id) descending.
+
+        ``cursor`` is the (start_time, id) key of the last event of the previous
+        page; only events strictly after it in that order are returned. With a
+        ``limit`` the walk stops as soon as the page is full, so the cost of a
+        page does not depend on how deep it is. Without a ``stock_symbol`` the
+        per-symbol results are merged in order.
+        """
+        indexes = self._indexes_for(stock_symbol)
+        if limit is None:
+            limit = sum(len(index.keys) for index in indexes)
+        pages = [
+            self._descending(
+                index,
+                index.candidates(min_level, max_level, duration_type, category, impact),
+                start_time,
+                end_time,
+                cursor,
+                limit,
+            )
+            for index in indexes
+        ]
+        merged = pages[0] if len(pages) == 1 else heapq.merge(*pages, key=sort_key, reverse=True)
+        return list(itertools.islice(merged, limit))
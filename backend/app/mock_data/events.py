@@ -1,17 +1,24 @@
 import json
 import uuid
 import os
-import glob
-from typing import List, Dict, Any, Optional
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 from datetime import datetime
 
-from app.schemas.event import EventCreate, EventUpdate, Event
+from app.core.config import settings
+from app.core.versions import event_versions
+from app.mock_data.event_store import EventDirectory, EventStore, VersionConflict, atomic_write_json
+from app.schemas.event import EventCreate, EventUpdate, Event, EventListItem
 from app.utils.time import get_current_unix_timestamp
 
-# File path for storing mock event data
-MOCK_DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+# File path for storing mock event data (all uvicorn workers must share it)
+MOCK_DATA_DIR = settings.MOCK_DATA_DIR or os.path.join(os.path.dirname(__file__), "data")
 EVENTS_FILE = os.path.join(MOCK_DATA_DIR, "events.json")
 STOCKS_DIR = os.path.join(MOCK_DATA_DIR, "stocks")
+# Fields returned by list endpoints, projected straight from the stored dicts
+LIST_ITEM_FIELDS = tuple(EventListItem.model_fields)
+
+# Persistent event id -> stock symbol directory (derived data, rebuilt if missing)
+EVENT_INDEX_FILE = os.path.join(MOCK_DATA_DIR, "event_index.sqlite3")
 
 # Ensure the mock data directory exists
 os.makedirs(MOCK_DATA_DIR, exist_ok=True)
@@ -105,79 +112,71 @@ SAMPLE_EVENTS = [
 def _ensure_events_file():
     """Ensure the events JSON file exists, create with sample data if not."""
     if not os.path.exists(EVENTS_FILE):
-        with open(EVENTS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(SAMPLE_EVENTS, f, ensure_ascii=False, indent=2)
+        # Atomic so a concurrently starting worker never reads a partial file
+        atomic_write_json(EVENTS_FILE, SAMPLE_EVENTS)
 
 
-def _get_stock_file_path(stock_symbol: str) -> str:
-    """Get the file path for a specific stock's events."""
-    return os.path.join(STOCKS_DIR, f"{stock_symbol}.json")
+def _load_events() -> List[Dict[str, Any]]:
+    """Load events from the main events file (used until per-stock files exist)."""
+    _ensure_events_file()
+    try:
+        with open(EVENTS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, FileNotFoundError):
+        # Return empty list if file has errors
+        return []
 
 
-def _load_events() -> List[Dict[str, Any]]:
-    """Load events from all files including the main events file and individual stock files."""
-    events = []
-    
-    # First try to load from individual stock files
-    stock_files = glob.glob(os.path.join(STOCKS_DIR, "*.json"))
-    if stock_files:
-        for stock_file in stock_files:
-            try:
-                with open(stock_file, 'r', encoding='utf-8') as f:
-                    stock_events = json.load(f)
-                    events.extend(stock_events)
-            except (json.JSONDecodeError, FileNotFoundError):
-                # Skip files with errors
-                continue
-    else:
-        # Fallback to the main events file for backward compatibility
-        _ensure_events_file()
-        try:
-            with open(EVENTS_FILE, 'r', encoding='utf-8') as f:
-                events = json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            # Return empty list if file has errors
-            return []
-    
-    return events
+# Resident event store: files are parsed once and re-read only when they change
+_store = EventStore(
+    STOCKS_DIR,
+    fallback_loader=_load_events,
+    check_interval=settings.MOCK_EVENTS_CHECK_INTERVAL,
+    directory=EventDirectory(EVENT_INDEX_FILE),
+    compact_threshold=settings.MOCK_EVENTS_JOURNAL_COMPACT_THRESHOLD,
+)
 
 
-def _load_events_by_stock(stock_symbol: str) -> List[Dict[str, Any]]:
-    """Load events for a specific stock."""
-    stock_file = _get_stock_file_path(stock_symbol)
-    
-    if os.path.exists(stock_file):
-        # Load from the specific stock file
-        try:
-            with open(stock_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            pass
-    
-    # If no stock-specific file exists or there was an error, 
-    # fall back to filtering from all events
-    return [event for event in _load_events() if event["stock_symbol"] == stock_symbol]
-
-
-def _save_events(events: List[Dict[str, Any]]):
-    """Save events to files organized by stock symbol."""
-    # Group events by stock symbol
-    events_by_stock = {}
-    for event in events:
-        stock_symbol = event["stock_symbol"]
-        if stock_symbol not in events_by_stock:
-            events_by_stock[stock_symbol] = []
-        events_by_stock[stock_symbol].append(event)
-    
-    # Save each stock's events to its own file
-    for stock_symbol, stock_events in events_by_stock.items():
-        stock_file = _get_stock_file_path(stock_symbol)
-        with open(stock_file, 'w', encoding='utf-8') as f:
-            json.dump(stock_events, f, ensure_ascii=False, indent=2)
+# Symbols whose events changed (local write or file reloaded from another
+# process) since their version counters were last bumped
+_dirty_symbols: Set[str] = set()
+_store.add_listener(lambda event, removed: _dirty_symbols.add(event["stock_symbol"]))
+
+
+def _flush_versions() -> None:
+    """Bump the version counter once per changed symbol, invalidating cached responses."""
+    while _dirty_symbols:
+        event_versions.bump(_dirty_symbols.pop())
+
+
+def add_listener(callback: Callable[[Dict[str, Any], bool], None]) -> None:
+    """Call ``callback(event, removed)`` whenever an event is stored, replaced or removed."""
+    _store.add_listener(callback)
+
+
+def warm_up() -> None:
+    """Load all stock files into the in-memory store (called at startup)."""
+    _store.refresh(force=True)
+    _flush_versions()
+
+
+def refresh() -> None:
+    """Pick up stock files changed on disk (rate limited by MOCK_EVENTS_CHECK_INTERVAL)."""
+    _store.refresh()
+    _flush_versions()
+
+
+def refresh_due() -> bool:
+    """Whether the next read would stat (and possibly re-read) the stock files."""
+    return _store.refresh_due()
 
 
 def _convert_to_schema(event_data: Dict[str, Any]) -> Event:
     """Convert raw event data to Pydantic model."""
+    # Work on a copy: the dict may be shared with the in-memory store
+    event_data = dict(event_data)
+    # Events written before versioning count as version 1
+    event_data.setdefault("version", 1)
     # Convert ISO format strings to datetime objects for created_at and updated_at
     if isinstance(event_data.get("created_at"), str):
         event_data["created_at"] = datetime.fromisoformat(event_data["created_at"])
@@ -188,13 +187,36 @@ def _convert_to_schema(event_data: Dict[str, Any]) -> Event:
 
 
 # CRUD operations for mock data
-def get(event_id: str) -> Optional[Event]:
-    """Get a single event by ID."""
-    events = _load_events()
-    for event in events:
-        if event["id"] == event_id:
-            return _convert_to_schema(event)
-    return None
+def get(event_id: str, refresh: bool = True) -> Optional[Event]:
+    """Get a single event by ID.
+
+    Reads check the stock files first (rate limited); ``refresh=False`` skips
+    that check for callers that have just run :func:`refresh` themselves.
+    """
+    # Opens at most the one stock file holding the event when the store is cold
+    event = _store.get(event_id, refresh=refresh)
+    if event is None:
+        return None
+    return _convert_to_schema(event)
+
+
+def _select(
+    *,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[Tuple[int, str]] = None,
+    refresh: bool = True,
+    **filters: Any
+) -> List[Dict[str, Any]]:
+    """Return one page of raw event dicts, sorted by start_time descending."""
+    if refresh:
+        _store.refresh()
+    
+    # The store stops walking once skip + limit matches are found
+    filtered_events = _store.query(cursor=cursor, limit=skip + limit, **filters)
+    
+    # Apply pagination
+    return filtered_events[skip:skip + limit]
 
 
 def get_multi(
@@ -208,62 +230,116 @@ def get_multi(
     end_time: Optional[int] = None,
     duration_type: Optional[str] = None,
     category: Optional[str] = None,
-    impact: Optional[str] = None
+    impact: Optional[str] = None,
+    cursor: Optional[Tuple[int, str]] = None,
+    refresh: bool = True
 ) -> List[Event]:
-    """Get multiple events with filters."""
-    # If stock symbol is provided, load only that stock's events for better performance
-    if stock_symbol:
-        events = _load_events_by_stock(stock_symbol)
-    else:
-        events = _load_events()
-    
-    filtered_events = []
-    
-    for event in events:
-        # Skip filtering by stock_symbol if we've already loaded only that stock's events
-        if stock_symbol and stock_symbol != event["stock_symbol"]:
-            continue
-        if min_level is not None and event["level"] < min_level:
-            continue
-        if max_level is not None and event["level"] > max_level:
-            continue
-        if start_time is not None and event["start_time"] < start_time:
-            continue
-        if end_time is not None and event["start_time"] > end_time:
-            continue
-        if duration_type is not None and event["duration_type"] != duration_type:
-            continue
-        if category is not None and event["category"] != category:
-            continue
-        if impact is not None and event.get("impact") != impact:
-            continue
-        
-        filtered_events.append(event)
-    
-    # Sort by start_time descending
-    filtered_events.sort(key=lambda x: x["start_time"], reverse=True)
-    
-    # Apply pagination
-    paginated_events = filtered_events[skip:skip + limit]
+    """Get multiple events with filters.
+
+    ``cursor`` is a decoded (start_time, id) keyset position; results start
+    strictly after it in (start_time, id) descending order. ``refresh`` is as
+    for :func:`get`.
+    """
+    paginated_events = _select(
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        refresh=refresh,
+        stock_symbol=stock_symbol,
+        min_level=min_level,
+        max_level=max_level,
+        start_time=start_time,
+        end_time=end_time,
+        duration_type=duration_type,
+        category=category,
+        impact=impact,
+    )
     
     # Convert to Pydantic models
     return [_convert_to_schema(event) for event in paginated_events]
 
 
-def get_by_stock_symbol(stock_symbol: str) -> List[Event]:
-    """获取特定股票的所有事件"""
-    return get_multi(stock_symbol=stock_symbol)
+def get_multi_items(
+    *,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[Tuple[int, str]] = None,
+    refresh: bool = True,
+    **filters: Any
+) -> List[Dict[str, Any]]:
+    """Same query as get_multi, projected to plain EventListItem-shaped dicts.
 
+    Skips building (and date-parsing) full Event models; stored events were
+    validated when they were written, so list responses can be serialized
+    straight from these dicts.
+    """
+    return [
+        {field: event.get(field) for field in LIST_ITEM_FIELDS}
+        for event in _select(skip=skip, limit=limit, cursor=cursor, refresh=refresh, **filters)
+    ]
 
-def get_by_time_range(start_time: int, end_time: int) -> List[Event]:
-    """获取指定时间范围内的所有事件"""
-    return get_multi(start_time=start_time, end_time=end_time)
+
+def count(
+    *,
+    stock_symbol: Optional[str] = None,
+    min_level: Optional[int] = None,
+    max_level: Optional[int] = None,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+    duration_type: Optional[str] = None,
+    category: Optional[str] = None,
+    impact: Optional[str] = None,
+    refresh: bool = True
+) -> int:
+    """Count events matching the filters using the in-memory indexes."""
+    if refresh:
+        _store.refresh()
+    return _store.count(
+        stock_symbol=stock_symbol,
+        min_level=min_level,
+        max_level=max_level,
+        start_time=start_time,
+        end_time=end_time,
+        duration_type=duration_type,
+        category=category,
+        impact=impact,
+    )
+
+
+def get_by_stock_symbol(
+    stock_symbol: str,
+    *,
+    skip: int = 0,
+    limit: int = 100,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+    cursor: Optional[Tuple[int, str]] = None
+) -> List[Event]:
+    """获取特定股票的事件(分页和时间范围由存储层处理)"""
+    return get_multi(
+        skip=skip,
+        limit=limit,
+        stock_symbol=stock_symbol,
+        start_time=start_time,
+        end_time=end_time,
+        cursor=cursor,
+    )
+
+
+def get_by_time_range(
+    start_time: int,
+    end_time: int,
+    *,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[Tuple[int, str]] = None
+) -> List[Event]:
+    """获取指定时间范围内的事件(分页由存储层处理)"""
+    return get_multi(skip=skip, limit=limit, start_time=start_time, end_time=end_time, cursor=cursor)
 
 
 def create(*, obj_in: EventCreate) -> Event:
     """Create a new event."""
-    events = _load_events()
-    
     # Convert Pydantic model to dict
     event_data = obj_in.model_dump()
     
@@ -275,51 +351,108 @@ def create(*, obj_in: EventCreate) -> Event:
         "id": event_id,
         "created_at": now.isoformat(),
         "updated_at": now.isoformat(),
-        **event_data
+        **event_data,
+        "version": 1,
     }
     
-    events.append(new_event)
-    _save_events(events)
+    with _store.locked(new_event["stock_symbol"]):
+        _store.put(new_event)
+        _store.persist(new_event["stock_symbol"], changed=[new_event])
+    _flush_versions()
     
     return _convert_to_schema(new_event)
 
 
+def create_multi(*, objs_in: List[EventCreate]) -> List[str]:
+    """Create many events with one write per affected stock symbol."""
+    now = datetime.now().isoformat()
+    
+    ids = []
+    events_by_stock: Dict[str, List[Dict[str, Any]]] = {}
+    for obj_in in objs_in:
+        new_event = {
+            "id": str(uuid.uuid4()),
+            "created_at": now,
+            "updated_at": now,
+            **obj_in.model_dump(),
+            "version": 1,
+        }
+        events_by_stock.setdefault(new_event["stock_symbol"], []).append(new_event)
+        ids.append(new_event["id"])
+    
+    with _store.locked(*events_by_stock):
+        for stock_symbol, stock_events in events_by_stock.items():
+            _store.put_many(stock_events)
+            _store.persist(stock_symbol, changed=stock_events)
+    _flush_versions()
+    
+    return ids
+
+
 def update(*, event_id: str, obj_in: EventUpdate) -> Optional[Event]:
-    """Update an existing event."""
-    events = _load_events()
-    updated_event = None
+    """Update an existing event.
+
+    When ``obj_in.version`` is set it must match the stored version, otherwise
+    :class:`VersionConflict` is raised and nothing is written.
+    """
+    _store.refresh()
+    # Convert Pydantic model to dict, filtering out None values
+    update_data = {
+        k: v for k, v in obj_in.model_dump(exclude_unset=True, exclude={"version"}).items()
+        if v is not None
+    }
     
-    for i, event in enumerate(events):
-        if event["id"] == event_id:
-            # Convert Pydantic model to dict, filtering out None values
-            update_data = {k: v for k, v in obj_in.model_dump(exclude_unset=True).items() if v is not None}
-            
-            # Update the event
-            events[i].update(update_data)
-            events[i]["updated_at"] = datetime.now().isoformat()
+    while True:
+        event = _store.get(event_id)
+        if event is None:
+            return None
+        symbols = {event["stock_symbol"], update_data.get("stock_symbol", event["stock_symbol"])}
+        with _store.locked(*symbols):
+            # Re-read under the lock: another worker may have changed the event
+            current = _store.get(event_id)
+            if current is None or current["stock_symbol"] != event["stock_symbol"]:
+                # Removed or moved to another stock meanwhile; look it up again
+                _store.refresh(force=True)
+                if _store.get(event_id) is None:
+                    return None
+                continue
+            version = current.get("version", 1)
+            if obj_in.version is not None and obj_in.version != version:
+                raise VersionConflict(event_id, version)
             
-            updated_event = events[i]
-            break
-    
-    if updated_event:
-        _save_events(events)
-        return _convert_to_schema(updated_event)
+            # Build a new dict so readers holding the old one never see a half-updated event
+            updated_event = {
+                **current,
+                **update_data,
+                "updated_at": datetime.now().isoformat(),
+                "version": version + 1,
+            }
+            _store.put(updated_event)
+            if updated_event["stock_symbol"] != current["stock_symbol"]:
+                # Moved to another stock: drop it from the old symbol's files
+                _store.persist(current["stock_symbol"], deleted=[current["id"]])
+            _store.persist(updated_event["stock_symbol"], changed=[updated_event])
+        break
+    _flush_versions()
     
-    return None
+    return _convert_to_schema(updated_event)
 
 
 def remove(*, event_id: str) -> Optional[Event]:
     """Remove an event."""
-    events = _load_events()
-    removed_event = None
-    
-    for i, event in enumerate(events):
-        if event["id"] == event_id:
-            removed_event = events.pop(i)
-            break
-    
-    if removed_event:
-        _save_events(events)
-        return _convert_to_schema(removed_event)
+    _store.refresh()
+    while True:
+        event = _store.get(event_id)
+        if event is None:
+            return None
+        with _store.locked(event["stock_symbol"]):
+            current = _store.get(event_id)
+            if current is not None and current["stock_symbol"] == event["stock_symbol"]:
+                removed_event = _store.discard(event_id)
+                _store.persist(removed_event["stock_symbol"], deleted=[event_id])
+                break
+        # Removed or moved to another stock by another worker meanwhile
+        _store.refresh(force=True)
+    _flush_versions()
     
-    return None 
\ No newline at end of file
+    return _convert_to_schema(removed_event)
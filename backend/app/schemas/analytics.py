@@ -0,0 +1,41 @@
+from typing import List, Literal, Optional, Union
+from pydantic import BaseModel
+
+
+# 单个事件的影响
+class EventImpact(BaseModel):
+    """事件前后的收益率和异常收益率"""
+    event_id: Union[int, str]
+    stock_symbol: str
+    start_time: int
+    bar_index: Optional[int] = None  # 事件对齐到的交易日在价格序列中的下标
+    bar_date: Optional[int] = None  # 该交易日的Unix时间戳
+    close: Optional[float] = None
+    pre_return: Optional[float] = None  # 事件前pre个交易日的收益率
+    post_return: Optional[float] = None  # 事件前一日收盘到事件后第post个交易日的收益率
+    alpha: Optional[float] = None  # 市场模型参数，其他模型为空
+    beta: Optional[float] = None
+    abnormal_returns: List[Optional[float]]  # 偏移-pre到post每日的异常收益率
+    car: Optional[float] = None  # 事件窗口累计异常收益率
+
+
+class EventImpactResult(EventImpact):
+    """单个事件影响的响应模型"""
+    model: Literal["market", "market_adjusted", "mean"]
+    benchmark: Optional[str] = None
+    offsets: List[int]
+
+
+# 多事件汇总
+class EventStudyResult(BaseModel):
+    """事件研究结果: 每个偏移日的平均异常收益(AAR)和累计平均异常收益(CAAR)"""
+    symbols: List[str]
+    models: List[Literal["market", "market_adjusted", "mean"]]  # 各股票实际使用的模型
+    benchmark: Optional[str] = None
+    offsets: List[int]
+    events: int  # 有异常收益数据的事件数
+    aar: List[Optional[float]]
+    caar: List[Optional[float]]
+    mean_car: Optional[float] = None
+    car_t_stat: Optional[float] = None
+    items: Optional[List[EventImpact]] = None
@@ -0,0 +1,43 @@
+from datetime import date, datetime
+from typing import List, Optional, Union
+from pydantic import BaseModel, Field, field_validator
+
+from app.utils.downsample import DownsampleMethod, Interval
+
+
+# 批量请求中的事件查询参数
+class BatchEventQuery(BaseModel):
+    """每只股票的事件查询参数"""
+    limit: int = Field(100, ge=0, le=1000)
+    min_level: Optional[int] = Field(None, ge=1, le=5)
+    start_time: Optional[int] = None
+    end_time: Optional[int] = None
+    bars: bool = False  # 是否附带bar_index、bar_date和close
+
+
+# 批量请求中的价格查询参数
+class BatchPriceQuery(BaseModel):
+    """每只股票的价格查询参数，含义与GET /stocks/{symbol}/prices相同，按列返回"""
+    start: Union[datetime, date, None] = None
+    end: Union[datetime, date, None] = None
+    interval: Interval = "1d"
+    points: Optional[int] = Field(None, ge=3, le=10000)
+    method: DownsampleMethod = "lttb"
+
+
+# 批量请求
+class BatchRequest(BaseModel):
+    """多只股票的事件和价格，events或prices为null时不返回对应部分"""
+    symbols: List[str] = Field(..., min_length=1, max_length=200)
+    events: Optional[BatchEventQuery] = BatchEventQuery()
+    prices: Optional[BatchPriceQuery] = None
+
+    @field_validator("symbols")
+    @classmethod
+    def _unique_symbols(cls, symbols: List[str]) -> List[str]:
+        # 去重并保持顺序，去掉空白代码后不能为空
+        unique = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+        if not unique:
+            raise ValueError("symbols must contain at least one non-blank symbol")
+        return unique
+
@@ -1,5 +1,6 @@
-from typing import Optional, List, Any, Union, Literal
-from pydantic import BaseModel, Field, HttpUrl
+import enum
+from typing import Optional, List, Any, Dict, Union, Literal
+from pydantic import BaseModel, Field, HttpUrl, field_validator
 from datetime import datetime
 
 
@@ -12,6 +13,11 @@ EventDurationType = Literal["continuous", "temporary", "sudden"]
 # 事件分类
 EventCategory = Literal["company", "industry", "macroeconomic", "market_sentiment"]
 
+def _enum_value(v: Any) -> Any:
+    """数据库模型中的枚举字段取其字符串值"""
+    return v.value if isinstance(v, enum.Enum) else v
+
+
 # 事件基础模型
 class EventBase(BaseModel):
     """事件基础模型"""
@@ -27,6 +33,8 @@ class EventBase(BaseModel):
     category: EventCategory  # 事件分类，对应前端的category
     impact: Optional[Literal["positive", "negative", "neutral"]] = None  # 影响类型，对应前端的impact
 
+    _unwrap_enums = field_validator("duration_type", "category", "impact", mode="before")(_enum_value)
+
 
 # 创建事件请求模型
 class EventCreate(EventBase):
@@ -48,14 +56,32 @@ class EventUpdate(BaseModel):
     duration_type: Optional[EventDurationType] = None
     category: Optional[EventCategory] = None
     impact: Optional[Literal["positive", "negative", "neutral"]] = None
+    # 客户端读取到的事件版本号，提供时与当前版本不一致则返回409(乐观并发控制)
+    version: Optional[int] = None
+
+
+# 批量创建事件的单条错误
+class EventBulkError(BaseModel):
+    """批量创建中未通过校验的条目"""
+    index: int  # 条目在请求中的位置(从0开始)
+    errors: List[Dict[str, Any]]
+
+
+# 批量创建事件的结果
+class EventBulkResult(BaseModel):
+    """批量创建事件的响应模型"""
+    created: int
+    ids: List[str]
+    errors: List[EventBulkError] = []
 
 
 # 数据库中的事件模型
 class EventInDBBase(EventBase):
     """数据库中的事件基础模型"""
-    id: int
+    id: Union[int, str]  # 模拟数据中为整数，数据库及新建事件为UUID字符串
     created_at: datetime
     updated_at: datetime
+    version: Optional[int] = None  # 模拟数据中每次更新加1
     
     model_config = {
         "from_attributes": True
@@ -70,7 +96,7 @@ class Event(EventInDBBase):
 
 # 简化的事件列表项模型
 class EventListItem(BaseModel):
-    id: str
+    id: Union[int, str]
     title: str
     start_time: int  # 更改为start_time以与其他模型一致
     level: EventLevel
@@ -79,11 +105,21 @@ class EventListItem(BaseModel):
     category: EventCategory
     impact: Optional[Literal["positive", "negative", "neutral"]] = None
 
+    _unwrap_enums = field_validator("duration_type", "category", "impact", mode="before")(_enum_value)
+
     model_config = {
         "from_attributes": True
     }
 
 
+# 带K线位置的事件列表项
+class EventBarItem(EventListItem):
+    """事件列表项加上对齐到的交易日下标和收盘价，供图表直接定位"""
+    bar_index: Optional[int] = None
+    bar_date: Optional[int] = None  # 交易日的Unix时间戳
+    close: Optional[float] = None
+
+
 class EventWithAnalysis(Event):
     """带有AI分析的事件模型"""
     analysis: Optional[Any] = None
@@ -0,0 +1,71 @@
+from typing import List, Optional
+from pydantic import BaseModel
+from datetime import datetime
+
+
+# 股票基础模型
+class StockBase(BaseModel):
+    """股票基础模型"""
+    symbol: str
+    name: str
+    market: str
+    sector: Optional[str] = None
+    industry: Optional[str] = None
+    description: Optional[str] = None
+
+
+# 创建股票请求模型
+class StockCreate(StockBase):
+    """创建股票的请求模型"""
+    pass
+
+
+# API响应中的股票模型
+class Stock(StockBase):
+    """标准股票响应模型"""
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = {
+        "from_attributes": True
+    }
+
+
+# 股票价格基础模型
+class StockPriceBase(BaseModel):
+    """股票价格基础模型"""
+    stock_symbol: str
+    date: datetime
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: int
+
+
+# 按列返回的股票价格
+class PriceColumns(BaseModel):
+    """按列的价格数组，各列长度相同，date为Unix时间戳(秒)"""
+    stock_symbol: str
+    date: List[int]
+    open: List[float]
+    high: List[float]
+    low: List[float]
+    close: List[float]
+    volume: List[int]
+
+
+# 创建股票价格请求模型
+class StockPriceCreate(StockPriceBase):
+    """创建股票价格的请求模型"""
+    pass
+
+
+# API响应中的股票价格模型
+class StockPrice(StockPriceBase):
+    """标准股票价格响应模型"""
+    id: int
+
+    model_config = {
+        "from_attributes": True
+    }
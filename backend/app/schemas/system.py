@@ -0,0 +1,33 @@
+from typing import Optional
+from pydantic import BaseModel
+
+
+# 连接池状态
+class PoolStatus(BaseModel):
+    """一个数据库引擎连接池的当前状态和启动以来的累计统计"""
+    pool_class: str
+    size: Optional[int] = None  # 常驻连接数上限(pool_size)
+    checked_in: Optional[int] = None  # 空闲连接数
+    checked_out: Optional[int] = None  # 当前借出的连接数
+    overflow: Optional[int] = None  # 当前超出pool_size的连接数
+    max_overflow: Optional[int] = None
+    checkouts: int  # 取连接次数
+    timeouts: int  # 等待超过DB_POOL_TIMEOUT的次数
+    connects: int  # 新建数据库连接次数
+    invalidations: int  # 连接失效次数
+    wait_avg_ms: float  # 取连接平均等待时间
+    wait_p95_ms: float  # 最近1024次取连接等待时间的95分位
+    wait_max_ms: float
+
+
+# 数据库连接池统计
+class PoolMetricsResult(BaseModel):
+    """同步引擎和异步引擎的连接池，未使用数据库或未创建对应引擎时为null"""
+    database: bool
+    sync: Optional[PoolStatus] = None
+    async_: Optional[PoolStatus] = None
+
+    model_config = {
+        "populate_by_name": True,
+        "alias_generator": lambda name: name.rstrip("_"),
+    }
@@ -0,0 +1,174 @@
+"""
+事件到K线(交易日)下标的对齐索引
+
+每只股票维护 事件ID -> 交易日下标 的映射，图表和分析查询按ID直接取下标和收盘价，
+不再逐个事件在价格日期上搜索。
+
+对齐规则与事件研究相同: 事件时间按UTC日期对齐到当天或之后的第一个交易日，
+周末和节假日的事件落到下一个交易日，晚于最后一个交易日的事件暂时没有下标。
+
+索引按股票在第一次查询时整体构建，之后增量维护:
+    - 事件创建、更新、删除通过存储层的回调逐个更新
+    - 价格数据变化时，如果只是在末尾追加了新交易日，只重新对齐原来没有下标的事件，
+      否则整体重新对齐
+"""
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app import crud
+from app.mock_data import events as mock_events
+from app.services.event_study import load_symbol_events
+from app.utils import csv_utils
+from app.utils.price_store import PriceSeries
+
+_SECONDS_PER_DAY = 86400
+
+
+def align_to_bars(dates: np.ndarray, start_times: np.ndarray) -> np.ndarray:
+    """事件时间对齐到交易日下标，没有对应交易日时为len(dates)"""
+    start_times = np.asarray(start_times, dtype=np.int64)
+    return np.searchsorted(dates, start_times - start_times % _SECONDS_PER_DAY, side="left")
+
+
+@dataclass
+class SymbolBars:
+    """一只股票的事件对齐结果"""
+    symbol: str
+    dates: np.ndarray
+    close: np.ndarray
+    file_state: Any
+    start_times: Dict[str, int] = field(default_factory=dict)
+    bars: Dict[str, int] = field(default_factory=dict)
+
+    def _set(self, event_id: str, start_time: int) -> None:
+        self.start_times[event_id] = start_time
+        self.bars[event_id] = int(align_to_bars(self.dates, np.array([start_time]))[0])
+
+    def _realign(self, event_ids: List[str]) -> None:
+        if not event_ids:
+            return
+        bars = align_to_bars(self.dates, np.array([self.start_times[i] for i in event_ids]))
+        self.bars.update(zip(event_ids, bars.tolist()))
+
+    def lookup(self, event_id: Any) -> Tuple[Optional[int], Optional[int], Optional[float]]:
+        """
+        返回:
+            (交易日下标, 交易日时间戳, 收盘价)，事件未知或没有对应交易日时为None
+        """
+        bar = self.bars.get(str(event_id))
+        if bar is None or bar >= len(self.dates):
+            return None, None, None
+        return bar, int(self.dates[bar]), float(self.close[bar])
+
+
+class EventBarIndex:
+    """按股票维护的事件对齐索引，线程安全"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._symbols: Dict[str, SymbolBars] = {}
+        # 每只股票的事件变更次数，构建期间有变更时不缓存构建结果
+        self._generation: Dict[str, int] = {}
+
+    def on_event_change(self, event: Dict[str, Any], removed: bool) -> None:
+        """存储层回调: 只更新已经构建过的股票"""
+        symbol = event["stock_symbol"]
+        event_id = str(event["id"])
+        with self._lock:
+            self._generation[symbol] = self._generation.get(symbol, 0) + 1
+            entry = self._symbols.get(symbol)
+            if entry is None:
+                return
+            if removed:
+                entry.start_times.pop(event_id, None)
+                entry.bars.pop(event_id, None)
+            else:
+                entry._set(event_id, int(event["start_time"]))
+
+    def invalidate(self, symbol: Optional[str] = None) -> None:
+        """丢弃某只股票(或全部)的索引，下次查询时重新构建"""
+        with self._lock:
+            if symbol is None:
+                self._symbols.clear()
+            else:
+                self._symbols.pop(symbol, None)
+
+    def _build(self, db: Any, symbol: str, series: PriceSeries) -> SymbolBars:
+        with self._lock:
+            generation = self._generation.get(symbol, 0)
+        events = load_symbol_events(db, symbol)
+        entry = SymbolBars(
+            symbol=symbol,
+            dates=np.asarray(series.date, dtype=np.int64),
+            close=np.asarray(series.close, dtype=np.float64),
+            file_state=series.file_state,
+            start_times={str(event["id"]): int(event["start_time"]) for event in events},
+        )
+        entry._realign(list(entry.start_times))
+        with self._lock:
+            if self._generation.get(symbol, 0) == generation:
+                self._symbols[symbol] = entry
+        return entry
+
+    @staticmethod
+    def _apply_prices(entry: SymbolBars, series: PriceSeries) -> None:
+        """价格数据变化: 末尾追加时只对齐原来没有下标的事件"""
+        old_len = len(entry.dates)
+        dates = np.asarray(series.date, dtype=np.int64)
+        appended = len(dates) >= old_len and np.array_equal(dates[:old_len], entry.dates)
+        entry.dates = dates
+        entry.close = np.asarray(series.close, dtype=np.float64)
+        entry.file_state = series.file_state
+        if appended:
+            entry._realign([i for i, bar in entry.bars.items() if bar >= old_len])
+        else:
+            entry._realign(list(entry.start_times))
+
+    def get(self, db: Any, symbol: str) -> Optional[SymbolBars]:
+        """
+        获取一只股票的事件对齐结果
+
+        参数:
+            db: 数据库会话，为None时使用模拟数据
+            symbol: 股票代码
+
+        返回:
+            SymbolBars，没有价格数据时返回None
+        """
+        series = csv_utils.get_price_series(symbol)
+        if series is None:
+            return None
+        with self._lock:
+            entry = self._symbols.get(symbol)
+            if entry is not None:
+                if entry.file_state != series.file_state:
+                    self._apply_prices(entry, series)
+                return entry
+        return self._build(db, symbol, series)
+
+    def attach(self, db: Any, symbol: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        给事件字典加上bar_index、bar_date和close字段(原地修改并返回)
+
+        事件字典需要包含id和start_time，与索引中记录的时间不一致时(例如其他进程写入的事件)
+        就地重新对齐这一个事件
+        """
+        entry = self.get(db, symbol)
+        with self._lock:
+            for item in items:
+                if entry is None:
+                    item.update(bar_index=None, bar_date=None, close=None)
+                    continue
+                event_id = str(item["id"])
+                if entry.start_times.get(event_id) != item["start_time"]:
+                    entry._set(event_id, int(item["start_time"]))
+                item["bar_index"], item["bar_date"], item["close"] = entry.lookup(event_id)
+        return items
+
+
+event_bar_index = EventBarIndex()
+mock_events.add_listener(event_bar_index.on_event_change)
+crud.event.add_listener(event_bar_index.on_event_change)
@@ -4,6 +4,7 @@ from datetime import datetime
 
 from app.schemas.event import EventCreate
 from app.db.models.event import Event
+from app.llm.dedup import cluster_news, merge_values
 
 logger = logging.getLogger(__name__)
 
@@ -70,19 +71,32 @@ class EventService:
             url=url
         )
 
-    def create_events_from_news(self, news_data: List[Dict[str, Any]], stock_symbol: str) -> List[EventCreate]:
-        """从新闻数据创建事件（示例方法，实际应使用LLM服务）"""
+    def create_events_from_news(
+        self,
+        news_data: List[Dict[str, Any]],
+        stock_symbol: str
+    ) -> List[EventCreate]:
+        """
+        从新闻数据创建事件（示例方法，实际应使用LLM服务）
+
+        近似重复的新闻(转载、改写)合并为一个事件，各篇的来源和链接
+        合并到sources/urls中。只在本次列表内去重
+        """
         events = []
-        for news in news_data:
+        for cluster in cluster_news(news_data, text_field="summary"):
+            positions = cluster.positions
+            news = news_data[positions[0]]
             # 这里只是示例，实际应该用LLM分析新闻内容并提取事件
             event = EventCreate(
                 title=news.get("title", ""),
                 description=news.get("summary", ""),
-                time=int(datetime.fromisoformat(news.get("publish_time")).timestamp()),
+                start_time=int(datetime.fromisoformat(news.get("publish_time")).timestamp()),
                 level=3,  # 默认重要程度，实际应由LLM判断
                 stock_symbol=stock_symbol,
-                source=news.get("source", ""),
-                url=news.get("url", "")
+                sources=merge_values(news_data, positions, "source"),
+                urls=merge_values(news_data, positions, "url"),
+                duration_type="sudden",
+                category="company"
             )
             events.append(event)
         return events
@@ -0,0 +1,179 @@
+"""
+事件接口的异步存储
+
+接口处理函数都是async def，通过这里的存储读写事件，不在事件循环中做阻塞I/O:
+    - MockEventStorage: 模拟数据。查询直接读内存索引，需要检查或重新读取事件文件时
+      (以及所有写入)放到线程池执行
+    - SqlEventStorage: 数据库，使用异步引擎(aiosqlite/asyncpg)的AsyncSession
+    - ThreadpoolEventStorage: 数据库但未安装异步驱动，在线程池中调用同步crud
+"""
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.crud import event_async
+from app.mock_data import events as mock_events
+from app.schemas.event import EventCreate, EventUpdate
+
+Cursor = Optional[Tuple[int, str]]
+
+
+class EventStorage(Protocol):
+    """事件存储的异步接口，方法参数同app/crud/event.py"""
+
+    async def get(self, event_id: str) -> Optional[Any]: ...
+
+    async def get_multi(self, *, skip: int = 0, limit: int = 100, cursor: Cursor = None, **filters: Any) -> List[Any]: ...
+
+    async def get_multi_items(
+        self, *, skip: int = 0, limit: int = 100, cursor: Cursor = None, **filters: Any
+    ) -> List[Dict[str, Any]]: ...
+
+    async def count(self, **filters: Any) -> int: ...
+
+    async def create(self, obj_in: EventCreate) -> Any: ...
+
+    async def create_multi(self, objs_in: List[EventCreate]) -> List[str]: ...
+
+    async def update(self, event_id: str, obj_in: EventUpdate) -> Optional[Any]: ...
+
+    async def remove(self, event_id: str) -> Optional[Any]: ...
+
+
+class MockEventStorage:
+    """模拟数据的异步存储"""
+
+    async def _refresh(self) -> None:
+        # 事件文件按MOCK_EVENTS_CHECK_INTERVAL限频检查，到期时才需要访问磁盘。
+        # 之后的读取传refresh=False，检查间隔恰好在两步之间到期时也不会在事件循环中访问磁盘
+        if mock_events.refresh_due():
+            await run_in_threadpool(mock_events.refresh)
+
+    async def get(self, event_id: str) -> Optional[Any]:
+        await self._refresh()
+        return mock_events.get(event_id, refresh=False)
+
+    async def get_multi(self, *, skip: int = 0, limit: int = 100, cursor: Cursor = None, **filters: Any) -> List[Any]:
+        await self._refresh()
+        return mock_events.get_multi(skip=skip, limit=limit, cursor=cursor, refresh=False, **filters)
+
+    async def get_multi_items(
+        self, *, skip: int = 0, limit: int = 100, cursor: Cursor = None, **filters: Any
+    ) -> List[Dict[str, Any]]:
+        await self._refresh()
+        return mock_events.get_multi_items(skip=skip, limit=limit, cursor=cursor, refresh=False, **filters)
+
+    async def count(self, **filters: Any) -> int:
+        await self._refresh()
+        return mock_events.count(refresh=False, **filters)
+
+    # 写入需要加文件锁并写文件，全部在线程池中执行
+    async def create(self, obj_in: EventCreate) -> Any:
+        return await run_in_threadpool(mock_events.create, obj_in=obj_in)
+
+    async def create_multi(self, objs_in: List[EventCreate]) -> List[str]:
+        return await run_in_threadpool(mock_events.create_multi, objs_in=objs_in)
+
+    async def update(self, event_id: str, obj_in: EventUpdate) -> Optional[Any]:
+        return await run_in_threadpool(mock_events.update, event_id=event_id, obj_in=obj_in)
+
+    async def remove(self, event_id: str) -> Optional[Any]:
+        return await run_in_threadpool(mock_events.remove, event_id=event_id)
+
+
+class SqlEventStorage:
+    """异步数据库会话上的存储"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get(self, event_id: str) -> Optional[Any]:
+        return await event_async.get(self.db, event_id)
+
+    async def get_multi(self, *, skip: int = 0, limit: int = 100, cursor: Cursor = None, **filters: Any) -> List[Any]:
+        return await event_async.get_multi(self.db, skip=skip, limit=limit, cursor=cursor, **filters)
+
+    async def get_multi_items(
+        self, *, skip: int = 0, limit: int = 100, cursor: Cursor = None, **filters: Any
+    ) -> List[Dict[str, Any]]:
+        return await event_async.get_multi_items(self.db, skip=skip, limit=limit, cursor=cursor, **filters)
+
+    async def count(self, **filters: Any) -> int:
+        return await event_async.count(self.db, **filters)
+
+    async def create(self, obj_in: EventCreate) -> Any:
+        return await event_async.create(self.db, obj_in=obj_in)
+
+    async def create_multi(self, objs_in: List[EventCreate]) -> List[str]:
+        return await event_async.create_multi(self.db, objs_in=objs_in)
+
+    async def update(self, event_id: str, obj_in: EventUpdate) -> Optional[Any]:
+        db_obj = await event_async.get(self.db, event_id)
+        if db_obj is None:
+            return None
+        return await event_async.update(self.db, db_obj=db_obj, obj_in=obj_in)
+
+    async def remove(self, event_id: str) -> Optional[Any]:
+        return await event_async.remove(self.db, event_id=event_id)
+
+
+class ThreadpoolEventStorage:
+    """同步数据库会话上的存储，每个操作整体放到线程池执行"""
+
+    def __init__(self, db: Any):
+        self.db = db
+
+    async def get(self, event_id: str) -> Optional[Any]:
+        return await run_in_threadpool(crud.event.get, self.db, event_id)
+
+    async def get_multi(self, *, skip: int = 0, limit: int = 100, cursor: Cursor = None, **filters: Any) -> List[Any]:
+        return await run_in_threadpool(
+            crud.event.get_multi, self.db, skip=skip, limit=limit, cursor=cursor, **filters
+        )
+
+    async def get_multi_items(
+        self, *, skip: int = 0, limit: int = 100, cursor: Cursor = None, **filters: Any
+    ) -> List[Dict[str, Any]]:
+        return await run_in_threadpool(
+            crud.event.get_multi_items, self.db, skip=skip, limit=limit, cursor=cursor, **filters
+        )
+
+    async def count(self, **filters: Any) -> int:
+        return await run_in_threadpool(crud.event.count, self.db, **filters)
+
+    async def create(self, obj_in: EventCreate) -> Any:
+        return await run_in_threadpool(crud.event.create, self.db, obj_in=obj_in)
+
+    async def create_multi(self, objs_in: List[EventCreate]) -> List[str]:
+        return await run_in_threadpool(crud.event.create_multi, self.db, objs_in=objs_in)
+
+    def _update(self, event_id: str, obj_in: EventUpdate) -> Optional[Any]:
+        db_obj = crud.event.get(self.db, event_id)
+        if db_obj is None:
+            return None
+        return crud.event.update(self.db, db_obj=db_obj, obj_in=obj_in)
+
+    async def update(self, event_id: str, obj_in: EventUpdate) -> Optional[Any]:
+        return await run_in_threadpool(self._update, event_id, obj_in)
+
+    def _remove(self, event_id: str) -> Optional[Any]:
+        if crud.event.get(self.db, event_id) is None:
+            return None
+        return crud.event.remove(self.db, event_id=event_id)
+
+    async def remove(self, event_id: str) -> Optional[Any]:
+        return await run_in_threadpool(self._remove, event_id)
+
+
+mock_event_storage = MockEventStorage()
+
+
+def storage_for(db: Any) -> EventStorage:
+    """按依赖提供的会话选择存储，None表示使用模拟数据"""
+    if db is None:
+        return mock_event_storage
+    if isinstance(db, AsyncSession):
+        return SqlEventStorage(db)
+    return ThreadpoolEventStorage(db)
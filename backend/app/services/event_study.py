@@ -0,0 +1,317 @@
+"""
+事件研究: 事件前后的收益率、异常收益率(AR)和累计异常收益率(CAR)
+
+一只股票的所有事件一次性向量化计算:
+    1. 事件时间按UTC日期用searchsorted对齐到当天或之后的第一个交易日(第0天)
+    2. 用 第0天下标 + 偏移量 构造(事件数 x 窗口长度)的下标矩阵，一次取出所有事件的收益率
+    3. 估计窗口[-pre-estimation, -pre-1]上按行估计正常收益模型，事件窗口[-pre, post]上计算AR和CAR
+
+正常收益模型:
+    market:          市场模型 R = alpha + beta * Rm，用估计窗口回归
+    market_adjusted: R - Rm
+    mean:            R - 估计窗口平均收益(不需要基准)
+需要基准的模型在没有基准价格数据时退回mean，结果中的model字段为实际使用的模型。
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Literal, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app import crud
+from app.core.config import settings
+from app.mock_data import events as mock_events
+from app.utils import csv_utils
+from app.utils.price_store import PriceSeries
+
+ReturnModel = Literal["market", "market_adjusted", "mean"]
+
+_SECONDS_PER_DAY = 86400
+# 按股票和窗口缓存的计算结果数量上限
+_CACHE_SIZE = 256
+
+
+@dataclass(frozen=True)
+class StudyWindow:
+    """事件窗口为[-pre, post]个交易日，估计窗口为其之前的estimation个交易日"""
+    pre: int = 5
+    post: int = 5
+    estimation: int = 120
+    model: ReturnModel = "market"
+    benchmark: str = settings.EVENT_STUDY_BENCHMARK
+
+    @property
+    def offsets(self) -> np.ndarray:
+        return np.arange(-self.pre, self.post + 1)
+
+    @property
+    def estimation_offsets(self) -> np.ndarray:
+        return np.arange(-self.pre - self.estimation, -self.pre)
+
+
+@dataclass
+class StudyFrame:
+    """一只股票所有事件在某个窗口下的计算结果，每个数组按事件行排列"""
+    symbol: str
+    window: StudyWindow
+    model: str
+    event_ids: List[str]
+    rows: Dict[str, int]
+    start_time: np.ndarray
+    bar_index: np.ndarray  # 对齐不到交易日时为-1
+    bar_date: np.ndarray
+    close: np.ndarray
+    pre_return: np.ndarray
+    post_return: np.ndarray
+    alpha: np.ndarray
+    beta: np.ndarray
+    abnormal: np.ndarray  # (事件数, 窗口长度)
+    car: np.ndarray
+
+    def records(self, rows: Optional[Sequence[int]] = None) -> List[Dict[str, Any]]:
+        """按行输出为字典列表，NaN转换为None"""
+        rows = np.arange(len(self.event_ids)) if rows is None else np.asarray(rows, dtype=np.int64)
+        bar_index = self.bar_index[rows]
+        valid = bar_index >= 0
+        columns = {
+            "start_time": self.start_time[rows].tolist(),
+            "bar_index": _none_where(bar_index, ~valid),
+            "bar_date": _none_where(self.bar_date[rows], ~valid),
+            "close": _nan_to_none(self.close[rows]),
+            "pre_return": _nan_to_none(self.pre_return[rows]),
+            "post_return": _nan_to_none(self.post_return[rows]),
+            "alpha": _nan_to_none(self.alpha[rows]),
+            "beta": _nan_to_none(self.beta[rows]),
+            "car": _nan_to_none(self.car[rows]),
+        }
+        abnormal = [_nan_to_none(values) for values in self.abnormal[rows]]
+        return [
+            {
+                "event_id": self.event_ids[row],
+                "stock_symbol": self.symbol,
+                **{name: values[i] for name, values in columns.items()},
+                "abnormal_returns": abnormal[i],
+            }
+            for i, row in enumerate(rows.tolist())
+        ]
+
+
+def _nan_to_none(values: np.ndarray) -> List[Optional[float]]:
+    return [None if v != v else v for v in values.tolist()]
+
+
+def _none_where(values: np.ndarray, mask: np.ndarray) -> List[Optional[int]]:
+    return [None if m else v for v, m in zip(values.tolist(), mask.tolist())]
+
+
+def _returns(close: np.ndarray) -> np.ndarray:
+    """简单日收益率，第一天为NaN"""
+    returns = np.full(len(close), np.nan)
+    if len(close) > 1:
+        returns[1:] = close[1:] / close[:-1] - 1.0
+    return returns
+
+
+def _take(values: np.ndarray, index: np.ndarray) -> np.ndarray:
+    """按下标矩阵取值，越界处为NaN"""
+    valid = (index >= 0) & (index < len(values))
+    out = np.full(index.shape, np.nan)
+    out[valid] = values[index[valid]]
+    return out
+
+
+def _align_benchmark(series: PriceSeries, benchmark: Optional[PriceSeries]) -> Optional[np.ndarray]:
+    """基准收益率按日期对齐到股票的交易日，缺失的日期为NaN"""
+    if benchmark is None or len(benchmark) < 2:
+        return None
+    bench_returns = _returns(np.asarray(benchmark.close, dtype=np.float64))
+    positions = np.searchsorted(benchmark.date, series.date)
+    positions = np.minimum(positions, len(benchmark.date) - 1)
+    matched = np.asarray(benchmark.date)[positions] == np.asarray(series.date)
+    return np.where(matched, bench_returns[positions], np.nan)
+
+
+def _fit_market_model(returns: np.ndarray, market: np.ndarray, min_obs: int) -> Tuple[np.ndarray, np.ndarray]:
+    """按行(每个事件)对估计窗口做最小二乘回归，有效观测不足min_obs时为NaN"""
+    valid = ~np.isnan(returns) & ~np.isnan(market)
+    n = valid.sum(axis=1)
+    r = np.where(valid, returns, 0.0)
+    m = np.where(valid, market, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_r = r.sum(axis=1) / n
+        mean_m = m.sum(axis=1) / n
+        dm = np.where(valid, m - mean_m[:, None], 0.0)
+        dr = np.where(valid, r - mean_r[:, None], 0.0)
+        beta = (dm * dr).sum(axis=1) / (dm * dm).sum(axis=1)
+        alpha = mean_r - beta * mean_m
+    insufficient = n < min_obs
+    alpha[insufficient] = np.nan
+    beta[insufficient] = np.nan
+    return alpha, beta
+
+
+def compute_study(
+    series: PriceSeries,
+    events: Sequence[Dict[str, Any]],
+    window: StudyWindow,
+    benchmark: Optional[PriceSeries] = None,
+) -> StudyFrame:
+    """
+    对一只股票的所有事件做事件研究
+
+    参数:
+        series: 股票日线价格序列
+        events: 事件字典列表，至少包含id和start_time
+        window: 窗口和模型参数
+        benchmark: 基准价格序列，market和market_adjusted模型使用
+
+    返回:
+        StudyFrame
+    """
+    dates = np.asarray(series.date, dtype=np.int64)
+    close = np.asarray(series.close, dtype=np.float64)
+    returns = _returns(close)
+
+    start_time = np.array([int(event["start_time"]) for event in events], dtype=np.int64)
+    # 按UTC日期对齐，周末和节假日的事件落到之后的第一个交易日
+    day = start_time - start_time % _SECONDS_PER_DAY
+    bar = np.searchsorted(dates, day, side="left")
+    aligned = bar < len(dates)
+    bar = np.where(aligned, bar, -1)
+
+    offsets = window.offsets
+    # 越界的事件用一个超出范围的下标，取值为NaN
+    anchor = np.where(aligned, bar, len(dates) + window.estimation + window.pre + window.post + 1)
+    event_index = anchor[:, None] + offsets[None, :]
+    estimation_index = anchor[:, None] + window.estimation_offsets[None, :]
+
+    event_returns = _take(returns, event_index)
+    estimation_returns = _take(returns, estimation_index)
+
+    market = _align_benchmark(series, benchmark) if window.model != "mean" else None
+    model = window.model if market is not None else "mean"
+    n_events = len(events)
+    alpha = np.full(n_events, np.nan)
+    beta = np.full(n_events, np.nan)
+    with np.errstate(invalid="ignore"):
+        if model == "market":
+            alpha, beta = _fit_market_model(
+                estimation_returns, _take(market, estimation_index), max(window.estimation // 2, 2)
+            )
+            abnormal = event_returns - (alpha[:, None] + beta[:, None] * _take(market, event_index))
+        elif model == "market_adjusted":
+            abnormal = event_returns - _take(market, event_index)
+        else:
+            counts = (~np.isnan(estimation_returns)).sum(axis=1)
+            expected = np.where(counts > 0, np.nansum(estimation_returns, axis=1) / np.maximum(counts, 1), np.nan)
+            abnormal = event_returns - expected[:, None]
+
+    has_abnormal = ~np.isnan(abnormal).all(axis=1) if n_events else np.zeros(0, dtype=bool)
+    car = np.where(has_abnormal, np.nansum(abnormal, axis=1), np.nan)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        before = _take(close, anchor - 1)
+        pre_return = before / _take(close, anchor - 1 - window.pre) - 1.0
+        post_return = _take(close, anchor + window.post) / before - 1.0
+
+    event_ids = [str(event["id"]) for event in events]
+    return StudyFrame(
+        symbol=series.symbol,
+        window=window,
+        model=model,
+        event_ids=event_ids,
+        rows={event_id: row for row, event_id in enumerate(event_ids)},
+        start_time=start_time,
+        bar_index=bar,
+        bar_date=np.where(aligned, dates[np.maximum(bar, 0)] if len(dates) else 0, 0),
+        close=_take(close, np.where(aligned, bar, -1)),
+        pre_return=pre_return,
+        post_return=post_return,
+        alpha=alpha,
+        beta=beta,
+        abnormal=abnormal,
+        car=car,
+    )
+
+
+def load_symbol_events(db: Any, symbol: str) -> List[Dict[str, Any]]:
+    """获取一只股票的全部事件(列表字典)，db为None时使用模拟数据"""
+    if db is not None:
+        total = crud.event.count(db, stock_symbol=symbol)
+        return crud.event.get_multi_items(db, limit=total, stock_symbol=symbol)
+    total = mock_events.count(stock_symbol=symbol)
+    return mock_events.get_multi_items(limit=total, stock_symbol=symbol)
+
+
+# (股票, 窗口) -> (数据指纹, 计算结果)
+_study_cache: "OrderedDict[Tuple[str, StudyWindow], Tuple[Any, StudyFrame]]" = OrderedDict()
+_study_cache_lock = threading.Lock()
+
+
+def get_study(symbol: str, events: Sequence[Dict[str, Any]], window: StudyWindow) -> Optional[StudyFrame]:
+    """
+    获取一只股票所有事件的事件研究结果，按(股票, 窗口)缓存
+
+    价格文件、基准价格文件或事件集合(id和start_time)变化时重新计算
+
+    返回:
+        StudyFrame，没有价格数据时返回None
+    """
+    series = csv_utils.get_price_series(symbol)
+    if series is None:
+        return None
+    benchmark = None
+    if window.model != "mean" and window.benchmark and window.benchmark != symbol:
+        benchmark = csv_utils.get_price_series(window.benchmark)
+
+    fingerprint = (
+        series.file_state,
+        benchmark.file_state if benchmark is not None else None,
+        hash(tuple((str(event["id"]), int(event["start_time"])) for event in events)),
+    )
+    key = (symbol, window)
+    with _study_cache_lock:
+        cached = _study_cache.get(key)
+        if cached is not None and cached[0] == fingerprint:
+            _study_cache.move_to_end(key)
+            return cached[1]
+
+    frame = compute_study(series, events, window, benchmark)
+    with _study_cache_lock:
+        _study_cache[key] = (fingerprint, frame)
+        _study_cache.move_to_end(key)
+        while len(_study_cache) > _CACHE_SIZE:
+            _study_cache.popitem(last=False)
+    return frame
+
+
+def aggregate(frames: Sequence[Tuple[StudyFrame, Sequence[int]]], window: StudyWindow) -> Dict[str, Any]:
+    """
+    跨事件汇总: 每个偏移日的平均异常收益(AAR)、累计平均异常收益(CAAR)和CAR的t统计量
+
+    参数:
+        frames: (StudyFrame, 选中的行)列表
+    """
+    abnormal = [frame.abnormal[np.asarray(rows, dtype=np.int64)] for frame, rows in frames]
+    car = [frame.car[np.asarray(rows, dtype=np.int64)] for frame, rows in frames]
+    width = len(window.offsets)
+    abnormal = np.vstack(abnormal) if abnormal else np.zeros((0, width))
+    car = np.concatenate(car) if car else np.zeros(0)
+    car = car[~np.isnan(car)]
+
+    with np.errstate(invalid="ignore"):
+        counts = (~np.isnan(abnormal)).sum(axis=0)
+        aar = np.where(counts > 0, np.nansum(abnormal, axis=0) / np.maximum(counts, 1), np.nan)
+        mean_car = float(car.mean()) if len(car) else float("nan")
+        std_car = float(car.std(ddof=1)) if len(car) > 1 else float("nan")
+        t_stat = mean_car / (std_car / np.sqrt(len(car))) if len(car) > 1 and std_car > 0 else float("nan")
+
+    return {
+        "offsets": window.offsets.tolist(),
+        "events": int(len(car)),
+        "aar": _nan_to_none(aar),
+        "caar": _nan_to_none(np.nancumsum(aar) if len(car) else aar),
+        "mean_car": None if mean_car != mean_car else mean_car,
+        "car_t_stat": None if t_stat != t_stat else float(t_stat),
+    }
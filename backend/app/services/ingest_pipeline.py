@@ -0,0 +1,531 @@
+"""
+新闻到事件的流式导入管道
+
+    读取(NDJSON文件/目录监视/标准输入) -> 规范化 -> 去重 -> LLM分析 -> 写入存储
+
+各阶段之间用有界队列连接，下游变慢时上游在put处等待(背压)，每个阶段的
+并发数可以单独配置。每条新闻处理完后确认其在源文件中的字节偏移，
+检查点文件记录每个源"之前所有行都已处理完"的偏移，进程崩溃后从该位置继续。
+中断前已写入但未记入检查点的少量新闻会重新处理(至少一次语义)，
+LLM分析结果缓存使重新处理不会再次调用模型。
+
+每行一个JSON对象，支持的字段:
+    stock_symbol/symbol   股票代码(必填)
+    content/summary/title 新闻文本(至少一个)
+    title, source, url
+    timestamp(Unix时间戳) 或 publish_time(ISO时间)
+"""
+import asyncio
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.llm.dedup import NearDuplicateIndex
+from app.llm.news_analyzer import NewsAnalyzer
+from app.mock_data.event_store import atomic_write_json
+from app.schemas.event import EventCreate, EventUpdate
+
+logger = logging.getLogger(__name__)
+
+STDIN_SOURCE = "-"
+# 目录监视模式下读取的文件
+WATCH_PATTERNS = ("*.ndjson", "*.jsonl")
+
+
+@dataclass
+class PipelineConfig:
+    """管道配置"""
+    queue_size: int = 256  # 每个阶段间队列的容量
+    normalize_concurrency: int = 1
+    analyze_concurrency: int = 4  # 同时进行的分析批次数
+    persist_concurrency: int = 1
+    batch_size: int = 20  # 分析和写入阶段每批最多处理的新闻数
+    packed: bool = False  # 分析时使用多篇打包提示词
+    checkpoint_file: Optional[str] = None
+    watch_interval: float = 2.0  # 目录监视的轮询间隔(秒)
+    read_chunk_lines: int = 500  # 每次从文件读取的行数
+    max_tracked_events: int = 100000  # 记住的簇代表->事件ID映射数量(用于合并重复新闻的来源)
+
+
+@dataclass
+class PipelineStats:
+    """管道运行统计"""
+    read: int = 0
+    invalid: int = 0
+    duplicates: int = 0
+    analyzed: int = 0
+    events: int = 0
+    merged: int = 0
+    failed: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        elapsed = time.perf_counter() - data.pop("started")
+        data["elapsed"] = elapsed
+        data["articles_per_second"] = self.read / elapsed if elapsed > 0 else 0.0
+        return data
+
+
+@dataclass
+class IngestItem:
+    """管道中流转的一条新闻"""
+    source: str
+    start: int  # 行在源文件中的起始偏移
+    line: bytes
+    record: Optional[Dict[str, Any]] = None
+    key: str = ""  # 去重用的文章键
+    representative: str = ""  # 所属簇的代表键
+    duplicate: bool = False  # 是否为已有簇的重复新闻(包括链接相同的新闻再次出现)
+    event: Optional[Dict[str, Any]] = None
+
+
+class Checkpoint:
+    """
+    每个源文件已处理完的字节偏移
+
+    条目可能乱序完成，只有某偏移之前的所有行都确认后才推进该源的检查点
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._offsets: Dict[str, int] = {}
+        # 源 -> {行起始偏移: 行结束偏移}，尚未处理完的行
+        self._inflight: Dict[str, Dict[int, int]] = {}
+        # 源 -> 已读取到的位置
+        self._read_to: Dict[str, int] = {}
+        self._dirty = False
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._offsets = json.load(f).get("sources", {})
+
+    def offset(self, source: str) -> int:
+        """检查点记录的偏移，之前的行都已处理完"""
+        return self._offsets.get(source, 0)
+
+    def position(self, source: str) -> int:
+        """本进程已读取到的位置，尚未读取时为检查点偏移"""
+        return self._read_to.get(source, self.offset(source))
+
+    def track(self, source: str, start: int, end: int) -> None:
+        self._inflight.setdefault(source, {})[start] = end
+        self._read_to[source] = end
+
+    def done(self, source: str, start: int) -> None:
+        inflight = self._inflight.get(source)
+        if inflight is None or inflight.pop(start, None) is None:
+            return
+        committed = min(inflight) if inflight else self._read_to[source]
+        if committed != self._offsets.get(source):
+            self._offsets[source] = committed
+            self._dirty = True
+
+    def save(self) -> None:
+        if not self.path or not self._dirty:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        atomic_write_json(os.path.abspath(self.path), {"sources": self._offsets})
+        self._dirty = False
+
+
+class MockEventSink:
+    """写入模拟数据存储"""
+
+    def create_multi(self, objs_in: List[EventCreate]) -> List[str]:
+        from app.mock_data import events as mock_events
+        return mock_events.create_multi(objs_in=objs_in)
+
+    def merge_sources(self, event_id: str, sources: List[str], urls: List[str]) -> None:
+        from app.mock_data import events as mock_events
+        event = mock_events.get(event_id=event_id)
+        if event is None:
+            return
+        mock_events.update(event_id=event_id, obj_in=EventUpdate(
+            sources=_merge(event.sources, sources),
+            urls=_merge(event.urls, urls),
+        ))
+
+
+class DatabaseEventSink:
+    """写入数据库"""
+
+    def __init__(self):
+        from app.db.session import SessionLocal
+        self._session_factory = SessionLocal
+
+    def create_multi(self, objs_in: List[EventCreate]) -> List[str]:
+        from app import crud
+        db = self._session_factory()
+        try:
+            return crud.event.create_multi(db, objs_in=objs_in)
+        finally:
+            db.close()
+
+    def merge_sources(self, event_id: str, sources: List[str], urls: List[str]) -> None:
+        from app import crud
+        db = self._session_factory()
+        try:
+            db_obj = crud.event.get(db, event_id)
+            if db_obj is None:
+                return
+            crud.event.update(db, db_obj=db_obj, obj_in={
+                "sources": _merge(db_obj.sources, sources),
+                "urls": _merge(db_obj.urls, urls),
+            })
+        finally:
+            db.close()
+
+
+def _merge(existing: Optional[List[str]], extra: List[str]) -> List[str]:
+    merged = list(existing or [])
+    for value in extra:
+        if value and value not in merged:
+            merged.append(value)
+    return merged
+
+
+def _parse_timestamp(record: Dict[str, Any]) -> int:
+    if isinstance(record.get("timestamp"), (int, float)):
+        return int(record["timestamp"])
+    if record.get("publish_time"):
+        return int(datetime.fromisoformat(str(record["publish_time"]).replace("Z", "+00:00")).timestamp())
+    return int(time.time())
+
+
+class IngestPipeline:
+    """
+    新闻导入管道
+
+    参数:
+        analyzer: 新闻分析服务
+        sink: 事件存储，MockEventSink或DatabaseEventSink
+        config: 管道配置
+    """
+
+    def __init__(self, analyzer: NewsAnalyzer, sink: Any, config: Optional[PipelineConfig] = None):
+        self.analyzer = analyzer
+        self.sink = sink
+        self.config = config or PipelineConfig()
+        self.stats = PipelineStats()
+        self.checkpoint = Checkpoint(self.config.checkpoint_file)
+        size = self.config.queue_size
+        self._raw: asyncio.Queue = asyncio.Queue(size)
+        self._normalized: asyncio.Queue = asyncio.Queue(size)
+        self._representatives: asyncio.Queue = asyncio.Queue(size)
+        self._analyzed: asyncio.Queue = asyncio.Queue(size)
+        # 每个股票一个近似重复索引，同一新闻对不同股票分别分析
+        self._indexes: Dict[str, NearDuplicateIndex] = {}
+        # 簇代表键 -> 事件ID，None表示正在写入
+        self._event_ids: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        # 簇代表尚未写入时到达的重复新闻的(来源, 链接)
+        self._pending_merges: Dict[str, List[IngestItem]] = {}
+
+    # ---- 读取 ----
+
+    async def _emit(self, source: str, start: int, line: bytes) -> None:
+        self.checkpoint.track(source, start, start + len(line))
+        self.stats.read += 1
+        await self._raw.put(IngestItem(source=source, start=start, line=line))
+
+    @staticmethod
+    def _read_lines(f, max_lines: int, follow: bool) -> List[bytes]:
+        lines = []
+        for _ in range(max_lines):
+            position = f.tell()
+            line = f.readline()
+            if not line:
+                break
+            if not line.endswith(b"\n") and follow:
+                # 写入方还没写完这一行，下次再读
+                f.seek(position)
+                break
+            lines.append(line)
+        return lines
+
+    async def read_file(self, path: str, follow: bool = False) -> int:
+        """
+        从检查点位置读取NDJSON文件
+
+        follow为True时读到文件末尾后返回，调用方稍后再次调用以读取新追加的行
+
+        返回:
+            本次读取的行数
+        """
+        source = os.path.abspath(path)
+        position = self.checkpoint.position(source)
+        count = 0
+        with open(source, "rb") as f:
+            f.seek(position)
+            while True:
+                lines = await asyncio.to_thread(self._read_lines, f, self.config.read_chunk_lines, follow)
+                if not lines:
+                    break
+                for line in lines:
+                    await self._emit(source, position, line)
+                    position += len(line)
+                    count += 1
+        return count
+
+    async def read_stdin(self) -> None:
+        """从标准输入读取(不支持断点续传)"""
+        position = 0
+        while True:
+            line = await asyncio.to_thread(sys.stdin.buffer.readline)
+            if not line:
+                break
+            await self._emit(STDIN_SOURCE, position, line)
+            position += len(line)
+
+    async def watch_directory(self, directory: str) -> None:
+        """持续轮询目录中的NDJSON文件并读取新增内容，直到被取消"""
+        while True:
+            paths = sorted({
+                path for pattern in WATCH_PATTERNS
+                for path in glob.glob(os.path.join(directory, pattern))
+            })
+            for path in paths:
+                await self.read_file(path, follow=True)
+            await asyncio.sleep(self.config.watch_interval)
+
+    # ---- 各处理阶段 ----
+
+    def _ack(self, item: IngestItem) -> None:
+        self.checkpoint.done(item.source, item.start)
+
+    async def _normalize_worker(self) -> None:
+        while True:
+            item = await self._raw.get()
+            try:
+                record = json.loads(item.line) if item.line.strip() else None
+                if record is None:
+                    self._ack(item)
+                    continue
+                symbol = (record.get("stock_symbol") or record.get("symbol") or "").strip().upper()
+                text = record.get("content") or record.get("summary") or record.get("title") or ""
+                if not symbol or not text.strip():
+                    raise ValueError("missing stock_symbol or text")
+                item.record = {
+                    "stock_symbol": symbol,
+                    "title": record.get("title") or "",
+                    "content": text,
+                    "source": record.get("source"),
+                    "url": record.get("url"),
+                    "timestamp": _parse_timestamp(record),
+                }
+                await self._normalized.put(item)
+            except Exception as e:
+                self.stats.invalid += 1
+                logger.warning(f"跳过无效新闻({item.source}@{item.start}): {e}")
+                self._ack(item)
+            finally:
+                self._raw.task_done()
+
+    async def _dedupe_worker(self) -> None:
+        # 单个协程顺序执行，保证索引的一致性
+        while True:
+            item = await self._normalized.get()
+            try:
+                record = item.record
+                symbol = record["stock_symbol"]
+                index = self._indexes.setdefault(symbol, NearDuplicateIndex())
+                item.key = f"{symbol}:{record['url'] or f'{item.source}@{item.start}'}"
+                item.representative = index.add(item.key, record["content"])
+                if item.representative == item.key and not self._is_tracked(item.key):
+                    # 标记代表正在处理，之后到达的重复新闻等它写入后合并
+                    self._pending_merges[item.key] = []
+                    await self._representatives.put(item)
+                    continue
+
+                # 链接相同的新闻再次出现时索引返回它自己的键，同样按重复处理
+                item.duplicate = True
+                self.stats.duplicates += 1
+                if self._event_ids.get(item.representative) is not None:
+                    # 代表已写入，把来源合并到已有事件
+                    await self._analyzed.put(item)
+                elif self._is_tracked(item.representative):
+                    # 代表还在分析或写入中，写入时一并合并
+                    self._pending_merges.setdefault(item.representative, []).append(item)
+                else:
+                    # 代表没有产生事件或已超出记录范围
+                    self._ack(item)
+            except Exception as e:
+                self.stats.failed += 1
+                logger.error(f"去重失败({item.source}@{item.start}): {e}")
+                self._ack(item)
+            finally:
+                self._normalized.task_done()
+
+    def _is_tracked(self, key: str) -> bool:
+        """簇代表是否正在处理或已写入"""
+        return key in self._pending_merges or key in self._event_ids
+
+    async def _take_batch(self, queue: asyncio.Queue) -> List[IngestItem]:
+        """阻塞取一条，再不等待地取队列中已有的条目，凑成一批"""
+        batch = [await queue.get()]
+        while len(batch) < self.config.batch_size:
+            try:
+                batch.append(queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _analyze_worker(self) -> None:
+        while True:
+            batch = await self._take_batch(self._representatives)
+            try:
+                by_symbol: Dict[str, List[IngestItem]] = {}
+                for item in batch:
+                    by_symbol.setdefault(item.record["stock_symbol"], []).append(item)
+                for symbol, items in by_symbol.items():
+                    try:
+                        events = await self.analyzer.analyze_news_list(
+                            [item.record for item in items], symbol, packed=self.config.packed
+                        )
+                    except Exception as e:
+                        self.stats.failed += len(items)
+                        logger.error(f"{symbol}的{len(items)}篇新闻分析失败: {e}")
+                        events = [None] * len(items)
+                    for item, event in zip(items, events):
+                        item.event = event
+                        self.stats.analyzed += 1
+                        await self._analyzed.put(item)
+            finally:
+                for _ in batch:
+                    self._representatives.task_done()
+
+    def _remember(self, key: str, event_id: Optional[str]) -> None:
+        self._event_ids[key] = event_id
+        self._event_ids.move_to_end(key)
+        while len(self._event_ids) > self.config.max_tracked_events:
+            self._event_ids.popitem(last=False)
+
+    def _to_event_create(self, item: IngestItem, group: List[IngestItem]) -> EventCreate:
+        return EventCreate(
+            title=item.event["title"] or item.record["title"],
+            description=item.event["description"],
+            start_time=item.record["timestamp"],
+            level=item.event["level"],
+            stock_symbol=item.record["stock_symbol"],
+            sources=_merge([], [member.record["source"] for member in group]),
+            urls=_merge([], [member.record["url"] for member in group]),
+            duration_type="sudden",
+            category="company",
+        )
+
+    async def _persist_batch(self, batch: List[IngestItem]) -> None:
+        """写入一批新事件并合并重复新闻的来源，批次中的条目由调用方确认"""
+        creates: List[IngestItem] = []
+        merges: List[IngestItem] = []
+        # 不在本批次中、处理完后需要一并确认的重复新闻
+        extra: List[IngestItem] = []
+        for item in batch:
+            if item.duplicate:
+                merges.append(item)
+            elif item.event:
+                creates.append(item)
+            else:
+                # 代表没有产生事件，等待合并的重复新闻直接确认
+                extra.extend(self._pending_merges.pop(item.key, []))
+
+        try:
+            objs_in = []
+            for item in creates:
+                waiting = self._pending_merges.pop(item.key, [])
+                extra.extend(waiting)
+                objs_in.append(self._to_event_create(item, [item] + waiting))
+                self.stats.merged += len(waiting)
+                # 写入期间到达的重复新闻会进入_pending_merges，写入后再合并
+                self._remember(item.key, None)
+
+            if objs_in:
+                ids = await asyncio.to_thread(self.sink.create_multi, objs_in)
+                self.stats.events += len(ids)
+                for item, event_id in zip(creates, ids):
+                    self._remember(item.key, event_id)
+                    late = self._pending_merges.pop(item.key, [])
+                    merges.extend(late)
+                    extra.extend(late)
+
+            for item in merges:
+                event_id = self._event_ids.get(item.representative)
+                if event_id is not None:
+                    await asyncio.to_thread(
+                        self.sink.merge_sources, event_id,
+                        [item.record["source"]], [item.record["url"]],
+                    )
+                    self.stats.merged += 1
+        finally:
+            for item in creates:
+                if self._event_ids.get(item.key, "") is None:
+                    # 写入失败，后续重复新闻不再等待
+                    self._event_ids.pop(item.key)
+                extra.extend(self._pending_merges.pop(item.key, []))
+            for item in extra:
+                self._ack(item)
+
+    async def _persist_worker(self) -> None:
+        while True:
+            batch = await self._take_batch(self._analyzed)
+            try:
+                await self._persist_batch(batch)
+            except Exception as e:
+                self.stats.failed += len(batch)
+                logger.error(f"{len(batch)}条新闻写入失败: {e}")
+            finally:
+                for item in batch:
+                    self._ack(item)
+                    self._analyzed.task_done()
+                self.checkpoint.save()
+
+    # ---- 运行 ----
+
+    async def run(
+        self,
+        paths: Optional[List[str]] = None,
+        watch_dir: Optional[str] = None,
+        stdin: bool = False,
+    ) -> PipelineStats:
+        """
+        运行管道直到输入读完(目录监视模式下直到被取消)，然后排空各阶段队列
+
+        返回:
+            运行统计
+        """
+        cfg = self.config
+        stages = [
+            (self._raw, [self._normalize_worker] * cfg.normalize_concurrency),
+            (self._normalized, [self._dedupe_worker]),
+            (self._representatives, [self._analyze_worker] * cfg.analyze_concurrency),
+            (self._analyzed, [self._persist_worker] * cfg.persist_concurrency),
+        ]
+        workers = [[asyncio.create_task(worker()) for worker in stage_workers] for _, stage_workers in stages]
+
+        try:
+            for path in paths or []:
+                await self.read_file(path)
+            if stdin:
+                await self.read_stdin()
+            if watch_dir:
+                await self.watch_directory(watch_dir)
+        except asyncio.CancelledError:
+            logger.info("读取已停止，正在处理队列中剩余的新闻")
+        finally:
+            # 按阶段顺序排空队列，上游排空后下游不会再收到新条目
+            for (queue, _), tasks in zip(stages, workers):
+                await queue.join()
+                for task in tasks:
+                    task.cancel()
+            # 代表未写入就被截止的重复新闻
+            self._pending_merges.clear()
+            self.checkpoint.save()
+
+        logger.info(f"导入完成: {self.stats.to_dict()}")
+        return self.stats
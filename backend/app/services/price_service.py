@@ -0,0 +1,83 @@
+"""
+价格查询结果的共享缓存
+
+重采样、降采样和序列化后的JSON按(股票, 查询参数, 价格文件状态)缓存在共享缓存中，
+价格文件变化时文件状态随之变化，旧条目不再被读到。多个worker共享同一份结果。
+"""
+import hashlib
+from dataclasses import astuple, dataclass
+from datetime import date, datetime
+from typing import Dict, List, Literal, Optional, Sequence, Union
+
+import orjson
+
+from app.core.cache import SharedCache, shared_cache
+from app.utils import csv_utils
+from app.utils.downsample import DownsampleMethod, Interval, downsample, resample_ohlcv
+from app.utils.time import date_to_datetime
+
+
+@dataclass(frozen=True)
+class PriceQuery:
+    """价格查询参数，含义与GET /stocks/{symbol}/prices相同"""
+    start: Union[datetime, date, None] = None
+    end: Union[datetime, date, None] = None
+    interval: Interval = "1d"
+    points: Optional[int] = None
+    method: DownsampleMethod = "lttb"
+    format: Literal["records", "columns"] = "records"
+
+
+def price_cache_key(symbol: str, query: PriceQuery) -> Optional[str]:
+    """缓存键，包含价格文件的当前状态; 没有价格数据时返回None"""
+    state = csv_utils.price_state(symbol)
+    if state is None:
+        return None
+    digest = hashlib.blake2b(repr((state, astuple(query))).encode(), digest_size=16).hexdigest()
+    return f"prices:{symbol}:{digest}"
+
+
+def render_prices(symbol: str, query: PriceQuery) -> Optional[bytes]:
+    """计算价格查询结果并序列化为JSON，没有价格数据时返回None"""
+    series = csv_utils.get_price_series(symbol, date_to_datetime(query.start), date_to_datetime(query.end))
+    if series is None:
+        return None
+    series = resample_ohlcv(series, query.interval)
+    if query.points is not None:
+        series = downsample(series, query.points, query.method)
+    if query.format == "columns":
+        return orjson.dumps({"stock_symbol": symbol, **series.to_columns()})
+    return orjson.dumps(series.to_records())
+
+
+def get_prices_json(symbol: str, query: PriceQuery, cache: SharedCache = shared_cache) -> Optional[bytes]:
+    """获取价格查询结果的JSON，未命中时只有一个调用方计算"""
+    key = price_cache_key(symbol, query)
+    if key is None:
+        return None
+    return cache.get_or_load(key, lambda: render_prices(symbol, query))
+
+
+def get_many_prices_json(
+    symbols: Sequence[str],
+    query: PriceQuery,
+    cache: SharedCache = shared_cache,
+) -> Dict[str, Optional[bytes]]:
+    """
+    批量获取多只股票的价格查询结果
+
+    一次批量读取所有股票的缓存，只计算未命中的股票并一次写回
+    """
+    keys = {symbol: price_cache_key(symbol, query) for symbol in symbols}
+    present: List[str] = [symbol for symbol, key in keys.items() if key is not None]
+    results: Dict[str, Optional[bytes]] = dict.fromkeys(symbols)
+    cached = cache.get_many([keys[symbol] for symbol in present])
+    missing: Dict[str, bytes] = {}
+    for symbol, value in zip(present, cached):
+        if value is None:
+            value = render_prices(symbol, query)
+            if value is not None:
+                missing[keys[symbol]] = value
+        results[symbol] = value
+    cache.set_many(missing)
+    return results
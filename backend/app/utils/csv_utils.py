@@ -1,31 +1,32 @@
 import os
-import csv
-import pandas as pd
+import threading
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, Union
 
 from app.schemas.stock import Stock, StockPrice
+from app.utils import price_store
+from app.utils.price_store import PriceSeries, ShardedPriceSeries
 
 # CSV文件目录
-CSV_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
+CSV_DIR = price_store.DATA_DIR
+# 列式NPY目录，由 python -m app.utils.price_store 从CSV转换生成
+NPY_DIR = price_store.NPY_DIR
 
 def get_available_stocks() -> List[Stock]:
     """
-    获取所有可用的股票列表（基于CSV文件命名）
+    获取所有可用的股票列表（基于CSV文件命名及已转换的NPY目录）
     """
     stocks = []
     try:
-        for filename in os.listdir(CSV_DIR):
-            if filename.endswith('_stock_data.csv'):
-                symbol = filename.split('_')[0]
-                # 创建基本的股票对象，只有symbol和name
-                stocks.append(Stock(
-                    symbol=symbol,
-                    name=symbol,  # 使用symbol作为name
-                    market="US",  # 默认市场
-                    created_at=datetime.now(),
-                    updated_at=datetime.now()
-                ))
+        for symbol in price_store.available_symbols(CSV_DIR, NPY_DIR):
+            # 创建基本的股票对象，只有symbol和name
+            stocks.append(Stock(
+                symbol=symbol,
+                name=symbol,  # 使用symbol作为name
+                market="US",  # 默认市场
+                created_at=datetime.now(),
+                updated_at=datetime.now()
+            ))
     except Exception as e:
         print(f"Error reading stock directory: {e}")
     
@@ -35,8 +36,8 @@ def get_stock_by_symbol(symbol: str) -> Optional[Stock]:
     """
     通过代码获取特定股票
     """
-    filepath = os.path.join(CSV_DIR, f"{symbol}_stock_data.csv")
-    if not os.path.exists(filepath):
+    if (not os.path.exists(price_store.csv_path(symbol, CSV_DIR))
+            and price_store.read_meta(price_store.npy_path(symbol, NPY_DIR)) is None):
         return None
     
     return Stock(
@@ -47,49 +48,154 @@ def get_stock_by_symbol(symbol: str) -> Optional[Stock]:
         updated_at=datetime.now()
     )
 
-def get_stock_prices(
+# 进程内价格缓存: symbol -> PriceSeries(分片存储时为ShardedPriceSeries)，数据文件变化时失效
+_price_cache: Dict[str, Union[PriceSeries, ShardedPriceSeries]] = {}
+_price_cache_lock = threading.Lock()
+
+
+def _stat(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _source_state(symbol: str) -> Optional[Tuple[Any, ...]]:
+    """
+    确定价格数据的来源及其状态
+
+    NPY目录存在且由当前CSV转换而来(或CSV已不存在)时优先使用NPY，
+    否则回退到CSV。返回以"npy"或"csv"开头、包含文件mtime_ns/大小的元组，
+    没有数据时返回None
+    """
+    csv_state = _stat(price_store.csv_path(symbol, CSV_DIR))
+    meta_state = _stat(os.path.join(price_store.npy_path(symbol, NPY_DIR), price_store.META_FILE))
+    if meta_state is not None:
+        npy_state = ("npy",) + meta_state + (csv_state,)
+        cached = _price_cache.get(symbol)
+        if cached is not None and cached.file_state == npy_state:
+            return npy_state
+        meta = price_store.read_meta(price_store.npy_path(symbol, NPY_DIR))
+        if meta is not None and (csv_state is None or meta.get("source") == list(csv_state)):
+            return npy_state
+    if csv_state is not None:
+        return ("csv",) + csv_state
+    return None
+
+
+def price_state(symbol: str) -> Optional[Tuple[Any, ...]]:
+    """价格数据文件的当前状态，数据变化时该值随之变化，没有数据时返回None"""
+    return _source_state(symbol)
+
+
+def _load_price_series(symbol: str) -> Optional[Union[PriceSeries, ShardedPriceSeries]]:
+    """
+    从缓存获取价格序列，数据文件变化或未缓存时重新加载(优先mmap NPY，CSV兜底)
+
+    分片存储的NPY只读取meta.json，各分片在按日期范围取数据时才加载
+    """
+    file_state = _source_state(symbol)
+    if file_state is None:
+        _price_cache.pop(symbol, None)
+        return None
+
+    cached = _price_cache.get(symbol)
+    if cached is not None and cached.file_state == file_state:
+        return cached
+
+    with _price_cache_lock:
+        cached = _price_cache.get(symbol)
+        if cached is not None and cached.file_state == file_state:
+            return cached
+
+        series = None
+        if file_state[0] == "npy":
+            directory = price_store.npy_path(symbol, NPY_DIR)
+            meta = price_store.read_meta(directory)
+            try:
+                if meta is not None and meta.get("shards") is not None:
+                    series = ShardedPriceSeries(symbol, directory, meta, file_state)
+                elif meta is not None:
+                    series = price_store.load_npy_series(symbol, directory, meta, file_state)
+            except (OSError, ValueError) as e:
+                print(f"Error reading NPY prices for {symbol}, falling back to CSV: {e}")
+            if series is None:
+                return _load_csv_fallback(symbol)
+        else:
+            series = price_store.read_csv_series(symbol, price_store.csv_path(symbol, CSV_DIR), file_state)
+        _price_cache[symbol] = series
+        return series
+
+
+def _load_csv_fallback(symbol: str) -> Optional[PriceSeries]:
+    """NPY数据无法读取时改用CSV并放入缓存，没有CSV时返回None(调用方持有_price_cache_lock)"""
+    csv_state = _stat(price_store.csv_path(symbol, CSV_DIR))
+    if csv_state is None:
+        _price_cache.pop(symbol, None)
+        return None
+    series = price_store.read_csv_series(symbol, price_store.csv_path(symbol, CSV_DIR), ("csv",) + csv_state)
+    _price_cache[symbol] = series
+    return series
+
+
+def get_price_series(
     symbol: str,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None
-) -> List[StockPrice]:
+) -> Optional[PriceSeries]:
     """
-    获取股票历史价格数据
+    获取股票价格的列式序列(NumPy数组视图)，没有数据时返回None
+
+    分片存储时只加载与日期范围有交集的分片，跨分片的范围返回拼接后的数组;
+    分片无法读取时与单文件NPY一样改用CSV，没有CSV时返回None
     """
-    filepath = os.path.join(CSV_DIR, f"{symbol}_stock_data.csv")
-    if not os.path.exists(filepath):
-        return []
-    
     try:
-        # 使用pandas读取CSV
-        df = pd.read_csv(filepath, skiprows=2)  # 跳过前两行（Ticker行等）
-        
-        # 将第一列（Date列）转换为日期类型
-        df['Date'] = pd.to_datetime(df['Date'])
-        
-        # 应用日期过滤
-        if start_date:
-            df = df[df['Date'] >= start_date]
-        if end_date:
-            df = df[df['Date'] <= end_date]
-        
-        # 转换为StockPrice列表
-        prices = []
-        for _, row in df.iterrows():
-            prices.append(StockPrice(
-                id=0,  # 占位ID
-                stock_symbol=symbol,
-                date=row['Date'],
-                open=float(row['Open']),
-                high=float(row['High']),
-                low=float(row['Low']),
-                close=float(row['Close']),
-                volume=int(row['Volume'])
-            ))
-        
-        return prices
+        series = _load_price_series(symbol)
+        if series is None:
+            return None
+        try:
+            return series.slice(start_date, end_date)
+        except (OSError, ValueError) as e:
+            if not isinstance(series, ShardedPriceSeries):
+                raise
+            print(f"Error reading NPY price shards for {symbol}, falling back to CSV: {e}")
+        with _price_cache_lock:
+            series = _load_csv_fallback(symbol)
+        return series.slice(start_date, end_date) if series is not None else None
     except Exception as e:
-        print(f"Error reading stock prices from CSV: {e}")
+        print(f"Error reading stock prices: {e}")
+        return None
+
+
+def get_stock_price_records(
+    symbol: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    """
+    获取股票历史价格数据(字典列表)，适合直接序列化为JSON
+    """
+    series = get_price_series(symbol, start_date, end_date)
+    if series is None:
         return []
+    return series.to_records()
+
+
+def get_stock_prices(
+    symbol: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> List[StockPrice]:
+    """
+    获取股票历史价格数据
+    """
+    # 数据来自已解析的数值数组，无需再次校验
+    return [
+        StockPrice.model_construct(id=0, **record)  # 占位ID
+        for record in get_stock_price_records(symbol, start_date, end_date)
+    ]
+
 
 def get_filtered_stocks(
     skip: int = 0,
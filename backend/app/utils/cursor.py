@@ -0,0 +1,41 @@
+import base64
+import json
+from typing import Any, Tuple
+
+
+def encode_cursor(start_time: int, event_id: Any) -> str:
+    """
+    将分页位置(start_time, id)编码为不透明的游标字符串
+
+    Args:
+        start_time (int): 当前页最后一个事件的开始时间
+        event_id (Any): 当前页最后一个事件的ID
+
+    Returns:
+        str: URL安全的base64游标
+    """
+    raw = json.dumps([start_time, str(event_id)], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, str]:
+    """
+    解码游标字符串
+
+    Args:
+        cursor (str): encode_cursor生成的游标
+
+    Returns:
+        Tuple[int, str]: (start_time, id)
+
+    Raises:
+        ValueError: 游标格式无效
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        start_time, event_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(start_time, int) or not isinstance(event_id, str):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return start_time, event_id
@@ -0,0 +1,165 @@
+"""
+价格序列的重采样与降采样
+
+- resample_ohlcv: 日线按周/月聚合为OHLCV K线
+- lttb_indices / minmax_indices: 按目标点数挑选代表性的行，保留原始K线数据
+"""
+from typing import Literal
+
+import numpy as np
+
+from app.utils.price_store import PriceSeries
+
+Interval = Literal["1d", "1w", "1mo"]
+DownsampleMethod = Literal["lttb", "minmax"]
+
+_SECONDS_PER_DAY = 86400
+
+
+def _period_keys(dates: np.ndarray, interval: str) -> np.ndarray:
+    """每个日期所属周期的编号(单调不减)"""
+    if interval == "1w":
+        # 1970-01-01是周四，+3后按周一起始划分
+        return (dates // _SECONDS_PER_DAY + 3) // 7
+    if interval == "1mo":
+        return dates.astype("datetime64[s]").astype("datetime64[M]").astype(np.int64)
+    raise ValueError(f"Unsupported interval: {interval}")
+
+
+def resample_ohlcv(series: PriceSeries, interval: Interval) -> PriceSeries:
+    """
+    把日线序列聚合为周线或月线
+
+    开盘取周期内第一根，收盘取最后一根，最高/最低取极值，成交量求和，
+    日期取周期内第一个交易日
+
+    Args:
+        series (PriceSeries): 按日期升序的日线序列
+        interval (str): 1d/1w/1mo，1d时原样返回
+
+    Returns:
+        PriceSeries: 聚合后的序列
+    """
+    if interval == "1d" or len(series) == 0:
+        return series
+
+    keys = _period_keys(np.asarray(series.date), interval)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+    ends = np.concatenate((starts[1:], [len(keys)])) - 1
+    return PriceSeries(
+        series.symbol,
+        date=series.date[starts],
+        open=series.open[starts],
+        high=np.maximum.reduceat(series.high, starts),
+        low=np.minimum.reduceat(series.low, starts),
+        close=series.close[ends],
+        volume=np.add.reduceat(series.volume, starts),
+        file_state=series.file_state,
+    )
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets降采样，返回保留的行号
+
+    首尾两点固定保留，中间分为threshold-2个桶，每个桶选出与前一个选中点、
+    下一个桶均值构成的三角形面积最大的点
+
+    Args:
+        x (np.ndarray): 横坐标(升序)
+        y (np.ndarray): 纵坐标
+        threshold (int): 目标点数
+
+    Returns:
+        np.ndarray: 升序的行号数组
+    """
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        raise ValueError("LTTB threshold must be at least 3")
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # 中间点的桶边界
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # 下一个桶的均值点(最后一个桶用终点)
+        if i + 2 < len(edges):
+            next_lo, next_hi = edges[i + 1], edges[i + 2]
+            avg_x = x[next_lo:next_hi].mean()
+            avg_y = y[next_lo:next_hi].mean()
+        else:
+            avg_x, avg_y = x[n - 1], y[n - 1]
+        areas = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a])
+        )
+        a = lo + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    最小/最大值降采样，返回保留的行号
+
+    序列分为threshold//2个等长桶，每个桶保留最低点和最高点，
+    不会丢失尖峰，适合K线和成交量
+
+    Args:
+        y (np.ndarray): 纵坐标
+        threshold (int): 目标点数
+
+    Returns:
+        np.ndarray: 升序去重的行号数组
+    """
+    n = len(y)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 2:
+        raise ValueError("Min/max threshold must be at least 2")
+    buckets = threshold // 2
+
+    y = np.asarray(y)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    indices = []
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if hi <= lo:
+            continue
+        chunk = y[lo:hi]
+        indices.append(lo + int(np.argmin(chunk)))
+        indices.append(lo + int(np.argmax(chunk)))
+    return np.unique(np.asarray(indices, dtype=np.int64))
+
+
+def downsample(series: PriceSeries, points: int, method: DownsampleMethod = "lttb") -> PriceSeries:
+    """
+    按收盘价把序列降到不超过points个点
+
+    Args:
+        series (PriceSeries): 价格序列
+        points (int): 目标点数
+        method (str): lttb(折线图)或minmax(保留极值)
+
+    Returns:
+        PriceSeries: 降采样后的序列，点数不多于points时原样返回
+    """
+    if points >= len(series):
+        return series
+    if method == "lttb":
+        indices = lttb_indices(series.date, series.close, points)
+    elif method == "minmax":
+        indices = minmax_indices(series.close, points)
+    else:
+        raise ValueError(f"Unsupported downsample method: {method}")
+    return PriceSeries(
+        series.symbol,
+        *(getattr(series, column)[indices] for column in series.COLUMNS),
+        file_state=series.file_state,
+    )
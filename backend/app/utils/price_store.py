@@ -0,0 +1,461 @@
+"""
+列式二进制价格存储
+
+每只股票一个目录，每列一个NPY文件，读取时用mmap映射，按日期范围切片不拷贝数据:
+
+    data/npy/{SYMBOL}/date.npy    int64   Unix时间戳(秒，升序)
+    data/npy/{SYMBOL}/open.npy    float64
+    data/npy/{SYMBOL}/high.npy    float64
+    data/npy/{SYMBOL}/low.npy     float64
+    data/npy/{SYMBOL}/close.npy   float64
+    data/npy/{SYMBOL}/volume.npy  int64
+    data/npy/{SYMBOL}/meta.json   行数及来源CSV的mtime/大小
+
+meta.json最后写入，存在即表示各列文件完整。
+
+数据量大(几十年日线或分钟线)时可按年或按月分片，每个分片一个子目录，
+meta.json记录各分片的行数和首尾日期:
+
+    data/npy/{SYMBOL}/2023/date.npy ...        --shard year
+    data/npy/{SYMBOL}/2023-03/date.npy ...     --shard month
+
+按日期范围读取时只打开范围内的分片(分片裁剪)，重新转换时只重写内容有变化的分片。
+
+CSV转换命令(在backend目录下执行):
+
+    python -m app.utils.price_store                    # 转换data目录下所有CSV
+    python -m app.utils.price_store AAPL MSFT          # 只转换指定股票
+    python -m app.utils.price_store --shard year       # 按年分片
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 数据目录
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
+NPY_DIR = os.path.join(DATA_DIR, "npy")
+
+CSV_SUFFIX = "_stock_data.csv"
+META_FILE = "meta.json"
+FORMAT_VERSION = 1
+
+COLUMN_DTYPES = {
+    "date": np.int64,
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "volume": np.int64,
+}
+
+# 分片粒度 -> 分片键使用的datetime64单位
+SHARD_UNITS = {"year": "Y", "month": "M"}
+
+
+def _to_epoch(dt: datetime) -> int:
+    """datetime转换为Unix时间戳(秒)，无时区的datetime按UTC处理，与CSV日期一致"""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return int(np.datetime64(dt, "s").astype(np.int64))
+
+
+class PriceSeries:
+    """
+    单只股票的列式价格序列
+
+    日期为int64 Unix时间戳(秒，升序)，OHLC为float64，成交量为int64，
+    按日期范围取数据时用searchsorted定位后直接切片(视图，无拷贝)。
+    从NPY加载时各列是只读的内存映射数组
+    """
+
+    __slots__ = ("symbol", "date", "open", "high", "low", "close", "volume", "file_state")
+
+    COLUMNS = tuple(COLUMN_DTYPES)
+
+    def __init__(
+        self,
+        symbol: str,
+        date: np.ndarray,
+        open: np.ndarray,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        volume: np.ndarray,
+        file_state: Optional[Tuple[Any, ...]] = None,
+    ):
+        self.symbol = symbol
+        self.date = date
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.file_state = file_state
+
+    def __len__(self) -> int:
+        return len(self.date)
+
+    def slice(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> "PriceSeries":
+        """按日期范围(闭区间)截取序列"""
+        lo = 0 if start_date is None else int(np.searchsorted(self.date, _to_epoch(start_date), "left"))
+        hi = len(self.date) if end_date is None else int(np.searchsorted(self.date, _to_epoch(end_date), "right"))
+        return self.slice_rows(lo, hi)
+
+    def slice_rows(self, lo: int, hi: int) -> "PriceSeries":
+        """按行号截取序列"""
+        return PriceSeries(
+            self.symbol,
+            *(getattr(self, column)[lo:hi] for column in self.COLUMNS),
+            file_state=self.file_state,
+        )
+
+    def to_columns(self) -> Dict[str, List[Any]]:
+        """按列输出(日期为Unix时间戳)，每列一次tolist，是最快的序列化方式"""
+        return {column: getattr(self, column).tolist() for column in self.COLUMNS}
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """整列转换为Python对象后组装成字典列表，避免逐行访问数组"""
+        dates = self.date.astype("datetime64[s]").tolist()
+        return [
+            {
+                "stock_symbol": self.symbol,
+                "date": d,
+                "open": o,
+                "high": h,
+                "low": l,
+                "close": c,
+                "volume": v,
+            }
+            for d, o, h, l, c, v in zip(
+                dates,
+                self.open.tolist(),
+                self.high.tolist(),
+                self.low.tolist(),
+                self.close.tolist(),
+                self.volume.tolist(),
+            )
+        ]
+
+
+class ShardedPriceSeries:
+    """
+    按年或按月分片存储的价格序列
+
+    按日期范围取数据时根据meta.json中各分片的首尾日期只加载范围内的分片，
+    范围落在一个分片内时返回该分片的视图，跨分片时拼接各分片的切片
+    """
+
+    __slots__ = ("symbol", "directory", "shards", "file_state", "_loaded")
+
+    def __init__(
+        self,
+        symbol: str,
+        directory: str,
+        meta: Dict[str, Any],
+        file_state: Optional[Tuple[Any, ...]] = None,
+    ):
+        self.symbol = symbol
+        self.directory = directory
+        self.shards: List[Dict[str, Any]] = meta["shards"]
+        self.file_state = file_state
+        self._loaded: Dict[str, PriceSeries] = {}
+
+    def __len__(self) -> int:
+        return sum(shard["rows"] for shard in self.shards)
+
+    @property
+    def loaded_shards(self) -> List[str]:
+        """已加载的分片键"""
+        return sorted(self._loaded)
+
+    def shards_for(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """与日期范围(闭区间)有交集的分片"""
+        lo = None if start_date is None else _to_epoch(start_date)
+        hi = None if end_date is None else _to_epoch(end_date)
+        return [
+            shard for shard in self.shards
+            if (lo is None or shard["last"] >= lo) and (hi is None or shard["first"] <= hi)
+        ]
+
+    def _shard(self, shard: Dict[str, Any]) -> PriceSeries:
+        series = self._loaded.get(shard["key"])
+        if series is None:
+            directory = os.path.join(self.directory, shard["key"])
+            series = load_npy_series(self.symbol, directory, shard, self.file_state)
+            self._loaded[shard["key"]] = series
+        return series
+
+    def slice(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> PriceSeries:
+        """按日期范围(闭区间)截取序列"""
+        parts = [self._shard(shard).slice(start_date, end_date) for shard in self.shards_for(start_date, end_date)]
+        if len(parts) == 1:
+            return parts[0]
+        return PriceSeries(
+            self.symbol,
+            *(
+                np.concatenate([getattr(part, column) for part in parts])
+                if parts else np.empty(0, dtype=dtype)
+                for column, dtype in COLUMN_DTYPES.items()
+            ),
+            file_state=self.file_state,
+        )
+
+
+def csv_path(symbol: str, csv_dir: str = DATA_DIR) -> str:
+    """股票CSV文件路径"""
+    return os.path.join(csv_dir, f"{symbol}{CSV_SUFFIX}")
+
+
+def npy_path(symbol: str, npy_dir: str = NPY_DIR) -> str:
+    """股票NPY目录路径"""
+    return os.path.join(npy_dir, symbol)
+
+
+def _read_price_csv(filepath: str) -> pd.DataFrame:
+    """读取yfinance导出的CSV，返回包含Date/Open/High/Low/Close/Volume列的DataFrame"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        head = [f.readline() for _ in range(2)]
+
+    if head[1].startswith("Ticker"):
+        # 新版yfinance: Price/Ticker/Date三行表头，列名取第一行
+        names = ["Date"] + [name.strip() for name in head[0].split(",")[1:]]
+        return pd.read_csv(filepath, skiprows=3, names=names)
+    return pd.read_csv(filepath, skiprows=2)  # 跳过前两行（Ticker行等）
+
+
+def read_csv_series(symbol: str, filepath: str, file_state: Optional[Tuple[Any, ...]] = None) -> PriceSeries:
+    """解析CSV为列式价格序列"""
+    df = _read_price_csv(filepath)
+    dates = pd.to_datetime(df["Date"], utc=True).dt.tz_localize(None)
+    df = df.assign(Date=dates).dropna(subset=["Date", "Close"]).sort_values("Date")
+    return PriceSeries(
+        symbol,
+        date=df["Date"].to_numpy(dtype="datetime64[s]").astype(np.int64),
+        open=df["Open"].to_numpy(dtype=np.float64),
+        high=df["High"].to_numpy(dtype=np.float64),
+        low=df["Low"].to_numpy(dtype=np.float64),
+        close=df["Close"].to_numpy(dtype=np.float64),
+        volume=df["Volume"].fillna(0).to_numpy(dtype=np.int64),
+        file_state=file_state,
+    )
+
+
+def read_meta(directory: str) -> Optional[Dict[str, Any]]:
+    """读取NPY目录的meta.json，不存在或格式不符时返回None"""
+    try:
+        with open(os.path.join(directory, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if meta.get("version") != FORMAT_VERSION:
+        return None
+    return meta
+
+
+def load_npy_series(
+    symbol: str,
+    directory: str,
+    meta: Dict[str, Any],
+    file_state: Optional[Tuple[Any, ...]] = None,
+) -> PriceSeries:
+    """以只读mmap方式加载NPY列，列长度与meta记录的行数不一致时抛出ValueError"""
+    columns = {}
+    for column, dtype in COLUMN_DTYPES.items():
+        array = np.load(os.path.join(directory, f"{column}.npy"), mmap_mode="r")
+        if array.dtype != dtype or array.shape != (meta["rows"],):
+            raise ValueError(f"Corrupt column {column} for {symbol}")
+        columns[column] = array
+    return PriceSeries(symbol, file_state=file_state, **columns)
+
+
+def _write_atomic(path: str, write) -> None:
+    """写入临时文件后重命名，读者不会看到写了一半的文件"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _write_columns(series: PriceSeries, directory: str) -> None:
+    os.makedirs(directory, exist_ok=True)
+    for column, dtype in COLUMN_DTYPES.items():
+        array = np.ascontiguousarray(getattr(series, column), dtype=dtype)
+        _write_atomic(os.path.join(directory, f"{column}.npy"), lambda f: np.save(f, array))
+
+
+def _write_meta(directory: str, meta: Dict[str, Any]) -> None:
+    payload = json.dumps(meta).encode("utf-8")
+    _write_atomic(os.path.join(directory, META_FILE), lambda f: f.write(payload))
+
+
+def _remove_stale(directory: str, keep: List[str]) -> None:
+    """删除换布局或分片变化后不再使用的列文件和分片目录(meta.json写入后调用)"""
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name == META_FILE or name in keep or name.startswith(".tmp-"):
+            continue
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif name.endswith(".npy"):
+            os.unlink(path)
+
+
+def _digest(series: PriceSeries) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for column, dtype in COLUMN_DTYPES.items():
+        digest.update(np.ascontiguousarray(getattr(series, column), dtype=dtype).tobytes())
+    return digest.hexdigest()
+
+
+def write_npy_series(
+    series: PriceSeries,
+    directory: str,
+    source: Optional[Tuple[int, int]] = None,
+    shard: Optional[str] = None,
+) -> None:
+    """
+    把价格序列写成NPY列文件
+
+    Args:
+        series (PriceSeries): 价格序列
+        directory (str): 目标目录
+        source (Tuple[int, int], optional): 来源CSV的(mtime_ns, 大小)，用于判断转换结果是否过期
+        shard (str, optional): 分片粒度，year或month，None表示不分片
+    """
+    meta = {
+        "version": FORMAT_VERSION,
+        "symbol": series.symbol,
+        "rows": len(series),
+        "source": list(source) if source is not None else None,
+    }
+    if shard is None:
+        _write_columns(series, directory)
+        _write_meta(directory, meta)
+        _remove_stale(directory, keep=[f"{column}.npy" for column in COLUMN_DTYPES])
+        return
+
+    old_meta = read_meta(directory) or {}
+    old_shards = {entry["key"]: entry for entry in old_meta.get("shards") or []}
+    # 日期升序，同一分片的行是连续的
+    periods = series.date.astype("datetime64[s]").astype(f"datetime64[{SHARD_UNITS[shard]}]")
+    keys, starts = np.unique(periods, return_index=True)
+    bounds = starts.tolist() + [len(series)]
+
+    shards = []
+    for key, lo, hi in zip(keys, bounds[:-1], bounds[1:]):
+        part = series.slice_rows(lo, hi)
+        entry = {
+            "key": str(key),
+            "rows": hi - lo,
+            "first": int(series.date[lo]),
+            "last": int(series.date[hi - 1]),
+            "digest": _digest(part),
+        }
+        if old_shards.get(entry["key"]) != entry:
+            _write_columns(part, os.path.join(directory, entry["key"]))
+        shards.append(entry)
+
+    meta.update(shard=shard, shards=shards)
+    os.makedirs(directory, exist_ok=True)
+    _write_meta(directory, meta)
+    _remove_stale(directory, keep=[entry["key"] for entry in shards])
+
+
+def available_symbols(csv_dir: str = DATA_DIR, npy_dir: str = NPY_DIR) -> List[str]:
+    """CSV和NPY中所有股票代码(排序去重)"""
+    symbols = set()
+    if os.path.isdir(csv_dir):
+        symbols.update(
+            filename[:-len(CSV_SUFFIX)]
+            for filename in os.listdir(csv_dir)
+            if filename.endswith(CSV_SUFFIX)
+        )
+    if os.path.isdir(npy_dir):
+        symbols.update(
+            name for name in os.listdir(npy_dir)
+            if os.path.exists(os.path.join(npy_dir, name, META_FILE))
+        )
+    return sorted(symbols)
+
+
+def convert_symbol(
+    symbol: str,
+    csv_dir: str = DATA_DIR,
+    npy_dir: str = NPY_DIR,
+    force: bool = False,
+    shard: Optional[str] = None,
+) -> bool:
+    """
+    把一只股票的CSV转换为NPY
+
+    Args:
+        shard (str, optional): 分片粒度，year或month，None表示不分片
+
+    Returns:
+        bool: 是否进行了转换(NPY已是最新时返回False)
+    """
+    filepath = csv_path(symbol, csv_dir)
+    st = os.stat(filepath)
+    source = (st.st_mtime_ns, st.st_size)
+    directory = npy_path(symbol, npy_dir)
+
+    meta = read_meta(directory)
+    if not force and meta is not None and meta.get("source") == list(source) and meta.get("shard") == shard:
+        return False
+
+    write_npy_series(read_csv_series(symbol, filepath), directory, source, shard=shard)
+    return True
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="把股票价格CSV转换为列式NPY文件")
+    parser.add_argument("symbols", nargs="*", help="股票代码，默认转换所有CSV")
+    parser.add_argument("--csv-dir", default=DATA_DIR, help="CSV文件目录")
+    parser.add_argument("--npy-dir", default=NPY_DIR, help="NPY输出目录")
+    parser.add_argument("--force", action="store_true", help="即使NPY已是最新也重新转换")
+    parser.add_argument("--shard", choices=sorted(SHARD_UNITS), help="按年或按月分片存储，默认不分片")
+    args = parser.parse_args(argv)
+
+    symbols = args.symbols or [
+        filename[:-len(CSV_SUFFIX)]
+        for filename in sorted(os.listdir(args.csv_dir))
+        if filename.endswith(CSV_SUFFIX)
+    ]
+    for symbol in symbols:
+        try:
+            converted = convert_symbol(symbol, args.csv_dir, args.npy_dir, force=args.force, shard=args.shard)
+        except Exception as e:
+            print(f"{symbol}: 转换失败 ({e})")
+            continue
+        print(f"{symbol}: {'已转换' if converted else '已是最新，跳过'}")
+
+
+if __name__ == "__main__":
+    main()
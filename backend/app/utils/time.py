@@ -1,5 +1,6 @@
 import time
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
+from typing import Optional, Union
 
 
 def get_current_unix_timestamp() -> int:
@@ -50,4 +51,19 @@ def format_timestamp(timestamp: int, format_str: str = "%Y-%m-%d %H:%M:%S") -> s
         str: 格式化后的日期字符串
     """
     dt = unix_timestamp_to_datetime(timestamp)
-    return dt.strftime(format_str) 
\ No newline at end of file
+    return dt.strftime(format_str) 
+
+
+def date_to_datetime(value: Union[datetime, date, None]) -> Optional[datetime]:
+    """
+    查询参数允许只传日期，按当天零点(UTC)处理
+    
+    Args:
+        value: datetime、date或None
+        
+    Returns:
+        Optional[datetime]: datetime原样返回，date转换为当天零点
+    """
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime(value.year, value.month, value.day)
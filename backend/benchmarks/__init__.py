@@ -0,0 +1 @@
+# Standalone benchmark scripts, run from the backend directory with `python -m benchmarks.<name>`
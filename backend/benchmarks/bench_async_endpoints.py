@@ -0,0 +1,173 @@
+"""Requests/s of the event endpoints: old sync handlers vs the async handlers.
+
+Starts one uvicorn worker on a temporary mock data directory seeded with
+``--events`` events, with the response cache disabled so every request reaches
+the handler. The server also mounts the handlers as they were before they
+became ``async def`` (sync ``def``, run by FastAPI in the threadpool) under
+``/legacy``, so both paths are measured against the same process and data.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_async_endpoints --events 20000 --concurrency 64 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, List, Optional
+
+SYMBOLS = [f"S{i:03d}" for i in range(50)]
+
+
+def _seed(count: int) -> List[str]:
+    from app.mock_data import events as mock_events
+    from app.schemas.event import EventCreate
+
+    rng = random.Random(7)
+    objs = [
+        EventCreate(
+            title=f"event {i}",
+            description="benchmark event",
+            start_time=1_600_000_000 + rng.randrange(86400 * 1000),
+            level=rng.randint(1, 5),
+            stock_symbol=rng.choice(SYMBOLS),
+            duration_type="sudden",
+            category=rng.choice(["company", "industry"]),
+        )
+        for i in range(count)
+    ]
+    return mock_events.create_multi(objs_in=objs)
+
+
+def _serve(port: int) -> None:
+    import uvicorn
+    from fastapi import APIRouter, HTTPException
+    from fastapi.responses import ORJSONResponse
+
+    from app.main import app
+    from app.mock_data import events as mock_events
+    from app.schemas.event import Event
+
+    legacy = APIRouter()
+
+    @legacy.get("/events/")
+    def legacy_read_events(stock_symbol: Optional[str] = None, min_level: Optional[int] = None, limit: int = 100) -> Any:
+        items = mock_events.get_multi_items(limit=limit, stock_symbol=stock_symbol, min_level=min_level)
+        result = ORJSONResponse(items)
+        result.headers["X-Total-Count"] = str(mock_events.count(stock_symbol=stock_symbol, min_level=min_level))
+        return result
+
+    @legacy.get("/events/{event_id}", response_model=Event)
+    def legacy_read_event(event_id: str) -> Any:
+        event = mock_events.get(event_id=event_id)
+        if not event:
+            raise HTTPException(status_code=404, detail="Event not found")
+        return event
+
+    app.include_router(legacy, prefix="/legacy")
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+async def _load(base: str, paths: List[str], concurrency: int, duration: float) -> dict:
+    import httpx
+
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client_loop(client: "httpx.AsyncClient", seed: int) -> None:
+        nonlocal errors
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.get(rng.choice(paths))
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client, i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "req_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+    }
+
+
+def _paths(prefix: str, ids: List[str]) -> List[str]:
+    rng = random.Random(11)
+    paths = [f"{prefix}/events/?stock_symbol={s}&limit=50" for s in SYMBOLS]
+    paths += [f"{prefix}/events/?stock_symbol={s}&min_level=4&limit=50" for s in SYMBOLS]
+    paths += [f"{prefix}/events/{event_id}" for event_id in rng.sample(ids, min(200, len(ids)))]
+    return paths
+
+
+def _wait_ready(base: str, timeout: float = 30.0) -> None:
+    import httpx
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(f"{base}/api/events/?limit=1", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise SystemExit("server did not start")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per run")
+    parser.add_argument("--threadpool", type=int, default=40, help="THREADPOOL_SIZE of the server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        _serve(args.port)
+        return
+
+    os.environ["MOCK_DATA_DIR"] = tempfile.mkdtemp(prefix="bench_async_")
+    os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+    os.environ["THREADPOOL_SIZE"] = str(args.threadpool)
+    with open(os.path.join(os.environ["MOCK_DATA_DIR"], "events.json"), "w") as f:
+        f.write("[]")
+    ids = _seed(args.events)
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_async_endpoints", "--serve", "--port", str(args.port)]
+    )
+    base = f"http://127.0.0.1:{args.port}"
+    try:
+        _wait_ready(base)
+        results = {}
+        for name, prefix in (("sync (before)", "/legacy"), ("async (after)", "/api")):
+            paths = _paths(prefix, ids)
+            # Warm up connections and the store before measuring
+            asyncio.run(_load(base, paths, args.concurrency, 1.0))
+            results[name] = asyncio.run(_load(base, paths, args.concurrency, args.duration))
+            print(f"{name}: {json.dumps(results[name])}")
+        before, after = results["sync (before)"], results["async (after)"]
+        print(f"speedup: {after['req_per_s'] / before['req_per_s']:.2f}x req/s, "
+              f"p99 {before['p99_ms']}ms -> {after['p99_ms']}ms")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
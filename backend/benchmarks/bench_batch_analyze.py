@@ -0,0 +1,63 @@
+"""Sequential vs concurrent NewsAnalyzer.batch_analyze_news against the local mock LLM.
+
+Sequential is max_concurrency=1, which is what the old for-loop did.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_batch_analyze --articles 100 --latency 0.2 --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+
+from app.llm.mock_llm import MockLLMClient
+from app.llm.news_analyzer import NewsAnalyzer
+
+
+def _make_news(n: int) -> list:
+    return [
+        {
+            "content": f"Company reports quarterly results, article {i}. " * 20,
+            "source": "bench",
+            "url": f"https://example.com/news/{i}",
+            "timestamp": 1_700_000_000 + i,
+        }
+        for i in range(n)
+    ]
+
+
+async def _run(args: argparse.Namespace, concurrency: int) -> dict:
+    client = MockLLMClient(latency=args.latency, jitter=args.latency / 2,
+                           failure_rate=args.failure_rate, seed=42)
+    analyzer = NewsAnalyzer(
+        client=client,
+        max_concurrency=concurrency,
+        requests_per_minute=args.rpm or None,
+        tokens_per_minute=args.tpm or None,
+    )
+    # the synthetic articles are near-duplicates of each other; measure concurrency only
+    events = await analyzer.batch_analyze_news(_make_news(args.articles), "AAPL", dedupe=False)
+    assert [e["url"] for e in events] == sorted((e["url"] for e in events),
+                                                key=lambda u: int(u.rsplit("/", 1)[1]))
+    return analyzer.last_batch_stats.to_dict()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--articles", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.2, help="mock LLM latency (s)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    parser.add_argument("--rpm", type=int, default=0, help="requests/min limit, 0 = off")
+    parser.add_argument("--tpm", type=int, default=0, help="tokens/min limit, 0 = off")
+    args = parser.parse_args()
+
+    sequential = asyncio.run(_run(args, 1))
+    concurrent = asyncio.run(_run(args, args.concurrency))
+    print("sequential:", json.dumps(sequential, indent=2))
+    print("concurrent:", json.dumps(concurrent, indent=2))
+    print(f"speedup: {sequential['elapsed'] / concurrent['elapsed']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
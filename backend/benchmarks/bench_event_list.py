@@ -0,0 +1,98 @@
+"""Per-item cost of the GET /api/events/ list response, before and after the fast path.
+
+before: Event model per row -> model_dump -> List[EventListItem] validation ->
+        JSON-mode dump -> json.dumps (what FastAPI does for response_model)
+after:  EventListItem fields projected from the stored dicts -> orjson.dumps
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_event_list --events 10000 --repeat 5
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from datetime import datetime
+from typing import List
+
+import orjson
+from pydantic import TypeAdapter
+
+from app.mock_data import events as mock_events
+from app.mock_data.event_store import EventStore
+from app.schemas.event import EventListItem
+
+SYMBOLS = ["AAPL", "MSFT", "AMZN", "BABA", "TSLA", "GOOGL", "NVDA", "META"]
+
+
+def _make_events(n: int) -> List[dict]:
+    now = datetime.now().isoformat()
+    rng = random.Random(42)
+    return [
+        {
+            "id": f"evt-{i:07d}",
+            "title": f"Event {i}",
+            "description": "Benchmark event " * 8,
+            "start_time": 1_600_000_000 + rng.randrange(0, 150_000_000),
+            "end_time": None,
+            "level": rng.randint(1, 5),
+            "stock_symbol": rng.choice(SYMBOLS),
+            "sources": ["source-a", "source-b"],
+            "urls": ["https://example.com/a"],
+            "duration_type": rng.choice(["continuous", "temporary", "sudden"]),
+            "category": rng.choice(["company", "industry", "macroeconomic", "market_sentiment"]),
+            "impact": rng.choice(["positive", "negative", "neutral", None]),
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(n)
+    ]
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as stocks_dir:
+        store = EventStore(stocks_dir)
+        store.refresh(force=True)
+        for event in _make_events(args.events):
+            store.put(event)
+        # Point the mock event module at the synthetic store for this process
+        mock_events._store = store
+
+        adapter = TypeAdapter(List[EventListItem])
+
+        def before() -> bytes:
+            events = mock_events.get_multi(limit=args.events)
+            validated = adapter.validate_python([e.model_dump() for e in events])
+            return json.dumps(adapter.dump_python(validated, mode="json")).encode("utf-8")
+
+        def after() -> bytes:
+            return orjson.dumps(mock_events.get_multi_items(limit=args.events))
+
+        assert json.loads(before()) == json.loads(after())
+
+        t_before = _best(before, args.repeat)
+        t_after = _best(after, args.repeat)
+        n = args.events
+        print(f"{n} events, best of {args.repeat}")
+        print(f"  before: {t_before * 1e3:8.2f} ms total  {t_before / n * 1e6:6.2f} us/item")
+        print(f"  after:  {t_after * 1e3:8.2f} ms total  {t_after / n * 1e6:6.2f} us/item")
+        print(f"  speedup: {t_before / t_after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
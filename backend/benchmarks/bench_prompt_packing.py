@@ -0,0 +1,75 @@
+"""Single-article vs packed prompts in NewsAnalyzer.batch_analyze_news.
+
+Reports prompt tokens per article and articles/sec for both modes against the
+local mock LLM, whose latency grows with prompt size (--latency-per-1k).
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_prompt_packing --articles 200 --budget 6000
+"""
+import argparse
+import asyncio
+import random
+
+from app.llm.mock_llm import MockLLMClient
+from app.llm.news_analyzer import NewsAnalyzer
+
+WORDS = ("revenue guidance margin shares analyst upgrade downgrade supply chain demand "
+         "quarter outlook buyback dividend lawsuit regulator chip launch").split()
+
+
+def _make_news(n: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    return [
+        {
+            "content": " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 160))),
+            "source": "bench",
+            "url": f"https://example.com/news/{i}",
+            "timestamp": 1_700_000_000 + i,
+        }
+        for i in range(n)
+    ]
+
+
+async def _run(args: argparse.Namespace, packed: bool) -> dict:
+    client = MockLLMClient(
+        latency=args.latency,
+        latency_per_1k_tokens=args.latency_per_1k,
+        malformed_rate=args.malformed_rate,
+        seed=42,
+    )
+    analyzer = NewsAnalyzer(
+        client=client,
+        max_concurrency=args.concurrency,
+        requests_per_minute=None,
+        tokens_per_minute=None,
+        pack_token_budget=args.budget,
+    )
+    events = await analyzer.batch_analyze_news(
+        _make_news(args.articles), "AAPL", dedupe=False, packed=packed
+    )
+    assert len(events) == args.articles
+    return analyzer.last_batch_stats.to_dict()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--articles", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--budget", type=int, default=6000, help="packed prompt token budget")
+    parser.add_argument("--latency", type=float, default=0.3, help="fixed mock latency per call (s)")
+    parser.add_argument("--latency-per-1k", type=float, default=0.05,
+                        help="extra mock latency per 1000 prompt tokens (s)")
+    parser.add_argument("--malformed-rate", type=float, default=0.05,
+                        help="probability that a packed response is truncated")
+    args = parser.parse_args()
+
+    print(f"{'mode':<8} {'calls':>6} {'splits':>6} {'tokens/article':>15} {'articles/s':>11}")
+    for name, packed in (("single", False), ("packed", True)):
+        stats = asyncio.run(_run(args, packed))
+        print(f"{name:<8} {stats['llm_calls']:>6} {stats['pack_splits']:>6} "
+              f"{stats['tokens_per_article']:>15.1f} {stats['articles_per_second']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
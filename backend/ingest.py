@@ -0,0 +1,67 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+
+from dotenv import load_dotenv
+
+# Load .env file
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="News to event ingestion pipeline")
+    parser.add_argument("paths", nargs="*", help="NDJSON files to ingest")
+    parser.add_argument("--watch", metavar="DIR", help="Keep polling a directory for *.ndjson / *.jsonl files")
+    parser.add_argument("--stdin", action="store_true", help="Read NDJSON from stdin (not resumable)")
+    parser.add_argument("--checkpoint", default="data/ingest_checkpoint.json",
+                        help="Checkpoint file used to resume after a crash")
+    parser.add_argument("--queue-size", type=int, default=256, help="Capacity of each inter-stage queue")
+    parser.add_argument("--batch-size", type=int, default=20, help="Articles per analyze/persist batch")
+    parser.add_argument("--analyze-concurrency", type=int, default=4, help="Concurrent analyze batches")
+    parser.add_argument("--persist-concurrency", type=int, default=1, help="Concurrent persist batches")
+    parser.add_argument("--normalize-concurrency", type=int, default=1, help="Concurrent normalize workers")
+    parser.add_argument("--packed", action="store_true", help="Pack several articles into one LLM request")
+    args = parser.parse_args()
+
+    if not (args.paths or args.watch or args.stdin):
+        parser.error("nothing to read: give NDJSON paths, --watch DIR or --stdin")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    from app.llm.news_analyzer import news_analyzer
+    from app.services.ingest_pipeline import (
+        DatabaseEventSink,
+        IngestPipeline,
+        MockEventSink,
+        PipelineConfig,
+    )
+
+    # Same storage switch as the API (app/api/deps.py)
+    use_database = os.getenv("USE_DATABASE", "false").lower() == "true"
+    pipeline = IngestPipeline(
+        news_analyzer,
+        DatabaseEventSink() if use_database else MockEventSink(),
+        PipelineConfig(
+            queue_size=args.queue_size,
+            normalize_concurrency=args.normalize_concurrency,
+            analyze_concurrency=args.analyze_concurrency,
+            persist_concurrency=args.persist_concurrency,
+            batch_size=args.batch_size,
+            packed=args.packed,
+            checkpoint_file=args.checkpoint,
+        ),
+    )
+
+    try:
+        stats = asyncio.run(pipeline.run(paths=args.paths, watch_dir=args.watch, stdin=args.stdin))
+    except KeyboardInterrupt:
+        # Progress up to the last persisted batch is already in the checkpoint
+        print("Interrupted; rerun the same command to resume from the checkpoint")
+        return
+    print(json.dumps(stats.to_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.batch import BatchRequest
+
+
+def test_symbols_are_normalized_and_deduplicated():
+    assert BatchRequest(symbols=[" aapl", "AAPL", "msft "]).symbols == ["AAPL", "MSFT"]
+
+
+@pytest.mark.parametrize("symbols", [[" "], ["", "  "]])
+def test_blank_symbols_are_rejected(symbols):
+    with pytest.raises(ValidationError):
+        BatchRequest(symbols=symbols)
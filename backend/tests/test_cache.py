@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+
+from app.core.cache import CacheBackend, FakeRedis, MemoryCache, RedisCache
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    return MemoryCache() if request.param == "memory" else RedisCache(FakeRedis(), prefix="test:")
+
+
+def test_local_flag():
+    assert MemoryCache().local
+    assert not RedisCache(FakeRedis()).local
+
+
+def test_set_get_and_delete(backend):
+    assert backend.get("a") is None
+    backend.set("a", b"1")
+    backend.mset({"b": b"2", "c": b"3"})
+    assert backend.get("a") == b"1"
+    assert backend.mget(["a", "missing", "c"]) == [b"1", None, b"3"]
+    assert backend.mget([]) == []
+
+    backend.set("a", b"updated")
+    backend.delete("a", "b", "missing")
+    assert backend.mget(["a", "b", "c"]) == [None, None, b"3"]
+
+    backend.clear()
+    assert backend.get("c") is None
+
+
+def test_incr(backend):
+    assert [backend.incr("n") for _ in range(3)] == [1, 2, 3]
+    assert backend.get("n") == b"3"
+    backend.delete("n")
+    assert backend.incr("n") == 1
+
+
+def test_ttl_expiry(backend):
+    backend.set("short", b"x", ttl=0.05)
+    backend.mset({"short2": b"y"}, ttl=0.05)
+    backend.set("forever", b"z")
+    assert backend.mget(["short", "short2"]) == [b"x", b"y"]
+    time.sleep(0.1)
+    assert backend.mget(["short", "short2", "forever"]) == [None, None, b"z"]
+
+
+def test_lock_is_mutually_exclusive(backend):
+    holding = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with backend.lock("job", timeout=5) as acquired:
+            assert acquired
+            holding.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    assert holding.wait(5)
+    with backend.lock("job", timeout=0.05) as acquired:
+        assert not acquired
+    # 其他键不受影响
+    with backend.lock("other-job", timeout=0.05) as acquired:
+        assert acquired
+    release.set()
+    holder.join()
+    with backend.lock("job", timeout=1) as acquired:
+        assert acquired
+
+
+def test_incomplete_backend_fails_at_construction():
+    class GetOnly(CacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnly()
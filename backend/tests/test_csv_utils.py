@@ -0,0 +1,49 @@
+import os
+from datetime import datetime
+
+import pytest
+
+from app.utils import csv_utils, price_store
+
+SYMBOL = "SHARD"
+CSV = """Price,Close,High,Low,Open,Volume
+Ticker,SHARD,SHARD,SHARD,SHARD,SHARD
+Date,,,,,
+2022-06-01,10.5,11.0,10.0,10.2,1000
+2023-06-01,11.5,12.0,11.0,11.2,2000
+2024-06-03,12.5,13.0,12.0,12.2,3000
+"""
+
+
+@pytest.fixture
+def csv_file(tmp_path, monkeypatch):
+    csv_dir, npy_dir = tmp_path / "csv", tmp_path / "npy"
+    csv_dir.mkdir()
+    csv_file = price_store.csv_path(SYMBOL, str(csv_dir))
+    with open(csv_file, "w", encoding="utf-8") as f:
+        f.write(CSV)
+    price_store.convert_symbol(SYMBOL, str(csv_dir), str(npy_dir), shard="year")
+    monkeypatch.setattr(csv_utils, "CSV_DIR", str(csv_dir))
+    monkeypatch.setattr(csv_utils, "NPY_DIR", str(npy_dir))
+    monkeypatch.setattr(csv_utils, "_price_cache", {})
+    # 损坏2023年分片
+    with open(os.path.join(price_store.npy_path(SYMBOL, str(npy_dir)), "2023", "close.npy"), "wb") as f:
+        f.write(b"not an npy file")
+    return csv_file
+
+
+def test_sharded_slice_reads_only_overlapping_shards(csv_file):
+    series = csv_utils.get_price_series(SYMBOL, datetime(2024, 1, 1), datetime(2024, 12, 31))
+    assert list(series.close) == [12.5]
+    assert csv_utils._price_cache[SYMBOL].loaded_shards == ["2024"]
+
+
+def test_unreadable_shard_falls_back_to_csv(csv_file):
+    series = csv_utils.get_price_series(SYMBOL, datetime(2023, 1, 1), datetime(2024, 12, 31))
+    assert list(series.close) == [11.5, 12.5]
+
+
+def test_unreadable_shard_without_csv_returns_none(csv_file):
+    os.unlink(csv_file)
+    assert csv_utils.get_price_series(SYMBOL, datetime(2023, 1, 1), datetime(2024, 12, 31)) is None
+    assert csv_utils.get_stock_prices(SYMBOL, datetime(2023, 1, 1), datetime(2024, 12, 31)) == []
@@ -0,0 +1,52 @@
+from app.llm.dedup import NearDuplicateIndex, cluster_news, merge_values, shingle_hashes
+
+TEXT = "Acme Corp reported quarterly revenue of 12 billion dollars, beating analyst expectations by a wide margin."
+REPRINT = "Acme Corp reported quarterly revenue of 12 billion dollars, beating analyst expectations by a wide margin!"
+OTHER = "Globex announced the resignation of its chief executive after a board review of recent acquisitions."
+
+
+def test_shingles_are_deterministic():
+    assert list(shingle_hashes(TEXT)) == list(shingle_hashes(TEXT))
+    assert len(shingle_hashes("")) == 0
+    assert len(shingle_hashes("abc")) == 1
+
+
+def test_index_groups_near_duplicates_under_first_article():
+    index = NearDuplicateIndex()
+    assert index.add("u1", TEXT) == "u1"
+    assert index.add("u2", REPRINT) == "u1"
+    assert index.add("u3", OTHER) == "u3"
+    # 已加入的键返回原来的簇
+    assert index.add("u2", OTHER) == "u1"
+    assert len(index) == 3
+    assert index.cluster_count == 2
+    assert index.query(REPRINT)[0] == "u1"
+    assert index.query("completely unrelated words about weather and sport") is None
+
+
+def test_cluster_news_within_one_list():
+    news = [
+        {"url": "u1", "content": TEXT, "source": "wire"},
+        {"url": "u2", "content": OTHER, "source": "wire"},
+        {"url": "u3", "content": REPRINT, "source": "blog"},
+        {"content": REPRINT, "source": "blog"},
+    ]
+    clusters = cluster_news(news)
+    assert [cluster.positions for cluster in clusters] == [[0, 2, 3], [1]]
+    assert [cluster.representative for cluster in clusters] == ["u1", "u2"]
+    assert not any(cluster.earlier for cluster in clusters)
+    assert merge_values(news, clusters[0].positions, "source") == ["wire", "blog"]
+    assert merge_values(news, clusters[0].positions, "url") == ["u1", "u3"]
+
+
+def test_cluster_news_marks_clusters_from_earlier_calls():
+    index = NearDuplicateIndex()
+    first = cluster_news([{"url": "u1", "content": TEXT}], index)
+    assert [(c.representative, c.earlier) for c in first] == [("u1", False)]
+
+    second = cluster_news([{"url": "u2", "content": REPRINT}, {"url": "u3", "content": OTHER}], index)
+    assert [(c.representative, c.positions, c.earlier) for c in second] == [("u1", [0], True), ("u3", [1], False)]
+
+    # 同一URL再次出现也属于之前的簇
+    again = cluster_news([{"url": "u3", "content": OTHER}], index)
+    assert [(c.representative, c.earlier) for c in again] == [("u3", True)]
@@ -0,0 +1,99 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from app.utils.downsample import downsample, lttb_indices, minmax_indices, resample_ohlcv
+from app.utils.price_store import PriceSeries
+
+# 2024-01-29(周一)到2024-02-09(周五)的10个交易日
+DAYS = [datetime(2024, 1, d) for d in (29, 30, 31)] + [datetime(2024, 2, d) for d in (1, 2, 5, 6, 7, 8, 9)]
+
+
+def _epoch(day: datetime) -> int:
+    return int(day.replace(tzinfo=timezone.utc).timestamp())
+
+
+def _daily() -> PriceSeries:
+    n = len(DAYS)
+    base = np.arange(n, dtype=np.float64)
+    return PriceSeries(
+        "TEST",
+        date=np.array([_epoch(d) for d in DAYS], dtype=np.int64),
+        open=10 + base,
+        high=np.array([12, 15, 13, 11, 14, 20, 16, 18, 17, 19], dtype=np.float64),
+        low=np.array([9, 8, 7, 10, 9, 11, 12, 5, 13, 14], dtype=np.float64),
+        close=10.5 + base,
+        volume=np.arange(1, n + 1, dtype=np.int64) * 100,
+    )
+
+
+def test_weekly_bars():
+    weekly = resample_ohlcv(_daily(), "1w")
+    assert list(weekly.date) == [_epoch(DAYS[0]), _epoch(DAYS[5])]
+    assert list(weekly.open) == [10, 15]
+    assert list(weekly.high) == [15, 20]
+    assert list(weekly.low) == [7, 5]
+    assert list(weekly.close) == [14.5, 19.5]
+    assert list(weekly.volume) == [1500, 4000]
+
+
+def test_monthly_bars():
+    monthly = resample_ohlcv(_daily(), "1mo")
+    assert list(monthly.date) == [_epoch(DAYS[0]), _epoch(DAYS[3])]
+    assert list(monthly.open) == [10, 13]
+    assert list(monthly.high) == [15, 20]
+    assert list(monthly.low) == [7, 5]
+    assert list(monthly.close) == [12.5, 19.5]
+    assert list(monthly.volume) == [600, 4900]
+
+
+def test_daily_interval_is_unchanged():
+    series = _daily()
+    assert resample_ohlcv(series, "1d") is series
+
+
+def test_lttb_keeps_endpoints_and_respects_budget():
+    rng = np.random.default_rng(0)
+    x = np.arange(1000, dtype=np.float64)
+    y = np.cumsum(rng.normal(size=1000))
+    for points in (3, 10, 137):
+        indices = lttb_indices(x, y, points)
+        assert len(indices) <= points
+        assert indices[0] == 0 and indices[-1] == 999
+        assert np.all(np.diff(indices) > 0)
+
+
+def test_lttb_picks_a_spike():
+    y = np.zeros(100)
+    y[42] = 50.0
+    assert 42 in lttb_indices(np.arange(100), y, 10)
+
+
+def test_minmax_keeps_global_extremes():
+    rng = np.random.default_rng(1)
+    y = rng.normal(size=1001)
+    indices = minmax_indices(y, 20)
+    assert len(indices) <= 20
+    assert int(np.argmin(y)) in indices
+    assert int(np.argmax(y)) in indices
+    assert np.all(np.diff(indices) > 0)
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+def test_enough_points_returns_series_unchanged(method):
+    series = _daily()
+    assert downsample(series, len(series), method) is series
+    assert downsample(series, 1000, method) is series
+    assert list(lttb_indices(series.date, series.close, len(series))) == list(range(len(series)))
+    assert list(minmax_indices(series.close, len(series) + 5)) == list(range(len(series)))
+
+
+def test_downsample_keeps_whole_rows():
+    series = _daily()
+    reduced = downsample(series, 4, "minmax")
+    assert len(reduced) <= 4
+    for i, date in enumerate(reduced.date):
+        row = list(series.date).index(date)
+        assert reduced.close[i] == series.close[row]
+        assert reduced.volume[i] == series.volume[row]
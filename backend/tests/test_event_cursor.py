@@ -0,0 +1,105 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import crud
+from app.api.deps import get_event_storage
+from app.api.endpoints import events
+from app.db.base import Base
+from app.db.models.event import Event, EventCategory, EventDurationType
+from app.mock_data.event_store import EventStore
+from app.utils.cursor import decode_cursor, encode_cursor
+
+# 25个事件，每5个共用一个start_time，翻页边界落在相同时间的事件之间
+EVENTS = [{"id": f"e{i:02d}", "start_time": 1_700_000_000 + (i // 5) * 60, "stock_symbol": "AAA"} for i in range(25)]
+EXPECTED = [e["id"] for e in sorted(EVENTS, key=lambda e: (e["start_time"], e["id"]), reverse=True)]
+
+
+def test_cursor_round_trip():
+    for start_time, event_id in [(0, "a"), (1_700_000_000, "3f1c-uuid"), (-5, 42)]:
+        cursor = encode_cursor(start_time, event_id)
+        assert "=" not in cursor
+        assert decode_cursor(cursor) == (start_time, str(event_id))
+
+
+@pytest.mark.parametrize("cursor", [
+    "", "not-a-cursor", "!!!!", encode_cursor(1, "x")[:-3],
+    # 合法base64但内容不是[int, str]
+    "WyJhIiwiYiJd", "eyJhIjoxfQ", "WzEsMl0",
+])
+def test_invalid_cursor_raises(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+class MockStorage:
+    """基于临时目录中EventStore的存储"""
+
+    def __init__(self, path):
+        self.store = EventStore(str(path), check_interval=60)
+        self.store.refresh(force=True)
+        self.store.put_many(
+            dict(e, title=e["id"], level=3, duration_type="sudden", category="company", impact=None)
+            for e in EVENTS
+        )
+
+    async def get_multi_items(self, *, skip=0, limit=100, cursor=None, **filters):
+        return self.store.query(cursor=cursor, limit=skip + limit, **filters)[skip:]
+
+    async def count(self, **filters):
+        return self.store.count(**filters)
+
+
+class SqlStorage:
+    """SQLite内存数据库，走crud中的tuple_比较"""
+
+    def __init__(self):
+        engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(engine)
+        self.db = sessionmaker(bind=engine)()
+        self.db.add_all(
+            Event(**e, title=e["id"], description="", level=3,
+                  duration_type=EventDurationType.sudden, category=EventCategory.company)
+            for e in EVENTS
+        )
+        self.db.commit()
+
+    async def get_multi_items(self, *, skip=0, limit=100, cursor=None, **filters):
+        return crud.event.get_multi_items(self.db, skip=skip, limit=limit, cursor=cursor, **filters)
+
+    async def count(self, **filters):
+        return crud.event.count(self.db, **filters)
+
+
+@pytest.fixture(params=["mock", "sql"])
+def client(request, tmp_path):
+    storage = MockStorage(tmp_path) if request.param == "mock" else SqlStorage()
+    app = FastAPI()
+    app.include_router(events.router, prefix="/events")
+    app.dependency_overrides[get_event_storage] = lambda: storage
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("limit", [1, 4, 5, 7, 25])
+def test_page_walk_has_no_gaps_or_duplicates(client, limit):
+    seen = []
+    params = {"limit": limit}
+    for _ in range(len(EVENTS) + 2):
+        response = client.get("/events/", params=params)
+        assert response.status_code == 200
+        assert response.headers["X-Total-Count"] == str(len(EVENTS))
+        seen.extend(item["id"] for item in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        params = {"limit": limit, "cursor": cursor}
+    assert seen == EXPECTED
+
+
+def test_invalid_cursor_is_rejected(client):
+    response = client.get("/events/", params={"cursor": "garbage"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,48 @@
+import asyncio
+
+from app.mock_data import events as mock_events
+from app.mock_data.event_store import EventStore
+from app.services.event_storage import MockEventStorage
+
+
+class LoopCheckingStore(EventStore):
+    """记录在事件循环线程中执行的文件检查"""
+
+    def __init__(self, path):
+        # 检查间隔为0: 每次读取前都到期，相当于间隔恰好在检查和读取之间到期
+        super().__init__(path, check_interval=0)
+        self.refreshes_on_loop = 0
+
+    def refresh(self, force=False):
+        try:
+            asyncio.get_running_loop()
+            self.refreshes_on_loop += 1
+        except RuntimeError:
+            pass
+        super().refresh(force)
+
+
+def test_mock_reads_never_check_files_on_the_event_loop(tmp_path, monkeypatch):
+    store = LoopCheckingStore(str(tmp_path))
+    store.put_many([{
+        "id": "e1", "title": "t", "description": "d", "start_time": 1_700_000_000, "level": 3,
+        "stock_symbol": "AAA", "duration_type": "sudden", "category": "company", "impact": None,
+        "created_at": "2023-11-14T22:13:20", "updated_at": "2023-11-14T22:13:20",
+    }])
+    monkeypatch.setattr(mock_events, "_store", store)
+    storage = MockEventStorage()
+
+    async def read():
+        return (
+            await storage.get("e1"),
+            await storage.get_multi(stock_symbol="AAA"),
+            await storage.get_multi_items(),
+            await storage.count(stock_symbol="AAA"),
+        )
+
+    event, events, items, count = asyncio.run(read())
+    assert event.id == "e1"
+    assert [e.id for e in events] == ["e1"]
+    assert [item["id"] for item in items] == ["e1"]
+    assert count == 1
+    assert store.refreshes_on_loop == 0
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from app.services.event_study import StudyWindow, aggregate, compute_study
+from app.utils.price_store import PriceSeries
+
+DAY = 86400
+START = 1_600_000_000 - 1_600_000_000 % DAY
+DAYS = 300
+ALPHA, BETA = 0.001, 1.5
+WINDOW = StudyWindow(pre=2, post=2, estimation=60, model="market", benchmark="BENCH")
+
+
+def _series(symbol, returns):
+    close = 100 * np.cumprod(1 + returns)
+    return PriceSeries(
+        symbol,
+        date=START + np.arange(DAYS, dtype=np.int64) * DAY,
+        open=close, high=close, low=close, close=close,
+        volume=np.ones(DAYS, dtype=np.int64),
+    )
+
+
+def _market_returns():
+    return np.random.default_rng(7).normal(0, 0.01, DAYS)
+
+
+def _stock(shocks):
+    returns = ALPHA + BETA * _market_returns()
+    for day, shock in shocks.items():
+        returns[day] += shock
+    return _series("ACME", returns)
+
+
+def _event(event_id, day):
+    # 当天中午，对齐到当天的交易日
+    return {"id": event_id, "start_time": START + day * DAY + DAY // 2}
+
+
+def test_market_model_recovers_alpha_beta_and_abnormal_returns():
+    frame = compute_study(
+        _stock({100: 0.05, 200: -0.02}), [_event("a", 100), _event("b", 200)], WINDOW,
+        benchmark=_series("BENCH", _market_returns()),
+    )
+    assert frame.model == "market"
+    assert list(frame.bar_index) == [100, 200]
+    np.testing.assert_allclose(frame.alpha, [ALPHA, ALPHA], atol=1e-12)
+    np.testing.assert_allclose(frame.beta, [BETA, BETA], atol=1e-9)
+    np.testing.assert_allclose(frame.abnormal[0], [0, 0, 0.05, 0, 0], atol=1e-9)
+    np.testing.assert_allclose(frame.abnormal[1], [0, 0, -0.02, 0, 0], atol=1e-9)
+    np.testing.assert_allclose(frame.car, [0.05, -0.02], atol=1e-9)
+
+    summary = aggregate([(frame, [0, 1])], WINDOW)
+    assert summary["offsets"] == [-2, -1, 0, 1, 2]
+    assert summary["events"] == 2
+    assert summary["aar"][2] == pytest.approx(0.015)
+    assert summary["caar"][-1] == pytest.approx(0.015)
+    assert summary["mean_car"] == pytest.approx(0.015)
+    # t = mean / (std / sqrt(n))
+    assert summary["car_t_stat"] == pytest.approx(0.015 / (np.std([0.05, -0.02], ddof=1) / np.sqrt(2)))
+
+
+def test_events_without_enough_estimation_data_are_null():
+    frame = compute_study(
+        _stock({20: 0.05, 200: 0.03}), [_event("early", 20), _event("late", 200), _event("future", DAYS + 10)],
+        WINDOW, benchmark=_series("BENCH", _market_returns()),
+    )
+    early, late, future = frame.records()
+    # 估计窗口只有17个有效收益率，少于estimation//2
+    assert early["alpha"] is None and early["beta"] is None and early["car"] is None
+    assert early["abnormal_returns"] == [None] * 5
+    assert early["bar_index"] == 20
+    assert late["car"] == pytest.approx(0.03)
+    assert future["bar_index"] is None and future["car"] is None
+
+    summary = aggregate([(frame, [0, 1, 2])], WINDOW)
+    assert summary["events"] == 1
+    assert summary["mean_car"] == pytest.approx(0.03)
+    assert summary["car_t_stat"] is None
+
+
+def test_without_benchmark_falls_back_to_mean_model():
+    returns = np.full(DAYS, 0.002)
+    returns[150] += 0.04
+    frame = compute_study(_series("ACME", returns), [_event("a", 150)], WINDOW)
+    assert frame.model == "mean"
+    np.testing.assert_allclose(frame.abnormal[0], [0, 0, 0.04, 0, 0], atol=1e-12)
+    assert frame.car[0] == pytest.approx(0.04)
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_event_storage
+from app.api.endpoints import events
+
+EVENT = {
+    "title": "Acme beats",
+    "description": "Quarterly revenue above expectations",
+    "start_time": 1_700_000_000,
+    "level": 3,
+    "stock_symbol": "ACME",
+    "duration_type": "sudden",
+    "category": "company",
+}
+
+
+class FakeStorage:
+    def __init__(self):
+        self.created = []
+
+    async def create_multi(self, objs_in):
+        self.created.extend(objs_in)
+        return [f"e{i}" for i in range(len(objs_in))]
+
+
+@pytest.fixture
+def client():
+    storage = FakeStorage()
+    app = FastAPI()
+    app.include_router(events.router, prefix="/events")
+    app.dependency_overrides[get_event_storage] = lambda: storage
+    return TestClient(app)
+
+
+def test_json_array_with_invalid_utf8_is_rejected(client):
+    body = b'[{"title": "\xff"}]'
+    response = client.post("/events/bulk", content=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 400
+    assert "UTF-8" in response.json()["detail"]
+
+
+def test_ndjson_line_with_invalid_utf8_is_an_item_error(client):
+    line = json.dumps(EVENT).encode()
+    body = line + b"\n" + b'{"title": "\xff\xfe"}' + b"\n" + line + b"\n"
+    response = client.post("/events/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    result = response.json()
+    assert result["created"] == 2
+    assert [error["index"] for error in result["errors"]] == [1]
+    assert result["errors"][0]["errors"][0]["type"] == "string_unicode"
@@ -0,0 +1,89 @@
+import asyncio
+import json
+from typing import Any, Dict, List
+
+from app.services.ingest_pipeline import IngestPipeline, PipelineConfig, _merge
+
+CONTENT = (
+    "Acme Corp reported quarterly revenue well above analyst expectations, driven by strong "
+    "demand for its cloud products, and raised its full-year guidance for the second time."
+)
+
+
+class FakeAnalyzer:
+    def __init__(self):
+        self.analyzed: List[str] = []
+
+    async def analyze_news_list(self, news_list, stock_symbol, packed=False):
+        self.analyzed.extend(record["url"] for record in news_list)
+        return [{"title": record["title"], "description": "d", "level": 3} for record in news_list]
+
+
+class FakeSink:
+    def __init__(self):
+        self.events: Dict[str, Dict[str, Any]] = {}
+
+    def create_multi(self, objs_in):
+        ids = []
+        for obj_in in objs_in:
+            event_id = f"e{len(self.events)}"
+            self.events[event_id] = {"sources": list(obj_in.sources), "urls": list(obj_in.urls)}
+            ids.append(event_id)
+        return ids
+
+    def merge_sources(self, event_id, sources, urls):
+        event = self.events[event_id]
+        event["sources"] = _merge(event["sources"], sources)
+        event["urls"] = _merge(event["urls"], urls)
+
+
+def _write_ndjson(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def _record(url: str, content: str = CONTENT, source: str = "wire") -> Dict[str, Any]:
+    return {"stock_symbol": "ACME", "title": "Acme beats", "content": content,
+            "source": source, "url": url, "timestamp": 1_700_000_000}
+
+
+def _run(tmp_path, records, **config):
+    news = tmp_path / "news.ndjson"
+    _write_ndjson(news, records)
+    analyzer, sink = FakeAnalyzer(), FakeSink()
+    pipeline = IngestPipeline(analyzer, sink, PipelineConfig(
+        checkpoint_file=str(tmp_path / "checkpoint.json"), **config
+    ))
+    stats = asyncio.run(pipeline.run(paths=[str(news)]))
+    return pipeline, stats, analyzer, sink, news
+
+
+def test_repeated_url_is_merged_and_checkpoint_advances(tmp_path):
+    records = [
+        _record("u1"),
+        _record("u2", CONTENT.replace("second time", "second time this year"), source="other"),
+        _record("u1"),
+    ]
+    pipeline, stats, analyzer, sink, news = _run(tmp_path, records)
+
+    assert analyzer.analyzed == ["u1"]
+    assert len(sink.events) == 1
+    event = next(iter(sink.events.values()))
+    assert event["urls"] == ["u1", "u2"]
+    assert event["sources"] == ["wire", "other"]
+    assert stats.duplicates == 2
+    assert pipeline.checkpoint.offset(str(news)) == news.stat().st_size
+    with open(tmp_path / "checkpoint.json", encoding="utf-8") as f:
+        assert json.load(f)["sources"][str(news)] == news.stat().st_size
+
+
+def test_repeated_url_after_event_is_written(tmp_path):
+    # 每批一条，第二次出现的u1到达时事件已写入
+    records = [_record("u1"), _record("u1", source="again"), _record("u3", "unrelated " * 20)]
+    pipeline, stats, analyzer, sink, news = _run(tmp_path, records, batch_size=1)
+
+    assert sorted(analyzer.analyzed) == ["u1", "u3"]
+    assert len(sink.events) == 2
+    assert sorted(event["urls"] for event in sink.events.values()) == [["u1"], ["u3"]]
+    assert pipeline.checkpoint.offset(str(news)) == news.stat().st_size
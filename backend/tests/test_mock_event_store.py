@@ -0,0 +1,209 @@
+"""
+模拟事件存储的并发测试
+
+多进程压力测试: 每个进程的多个线程对几个共享股票随机创建/更新/移动/删除自己的事件，
+并以乐观版本号递增同一个"热点"事件。结束后从磁盘重新加载存储，检查:
+    - 创建后未删除的事件都存在，标题和股票是最后一次写入的值
+    - 删除的事件不存在
+    - 热点事件的版本号为1加成功递增的次数，即没有更新基于过期的读取
+"""
+import multiprocessing
+import queue
+import random
+import threading
+import time
+from typing import Any, Dict, List
+
+from app.mock_data.event_store import EventStore
+
+SYMBOLS = ["AAA", "BBB", "CCC", "DDD"]
+WORKERS = 4
+THREADS = 3
+OPS = 60
+
+
+def _event_in(symbol: str, title: str) -> Dict[str, Any]:
+    return {
+        "title": title,
+        "description": "stress test event",
+        "start_time": 1_700_000_000 + random.randrange(86400 * 365),
+        "level": random.randint(1, 5),
+        "stock_symbol": symbol,
+        "duration_type": "sudden",
+        "category": "company",
+    }
+
+
+def _thread_ops(worker: int, thread: int, hot_id: str, out: Dict[str, Any]) -> None:
+    from app.mock_data import events as mock_events
+    from app.mock_data.event_store import VersionConflict
+    from app.schemas.event import EventCreate, EventUpdate
+
+    rng = random.Random(worker * 1000 + thread)
+    alive: Dict[str, Dict[str, str]] = {}
+    removed: List[str] = []
+    hot_increments = 0
+
+    for i in range(OPS):
+        op = rng.random()
+        tag = f"w{worker}t{thread}-{i}"
+        if op < 0.35 or not alive:
+            symbol = rng.choice(SYMBOLS)
+            event = mock_events.create(obj_in=EventCreate(**_event_in(symbol, tag)))
+            alive[str(event.id)] = {"title": tag, "stock_symbol": symbol}
+        elif op < 0.55:
+            event_id = rng.choice(list(alive))
+            update = {"title": tag}
+            if rng.random() < 0.3:
+                update["stock_symbol"] = rng.choice(SYMBOLS)
+            event = mock_events.update(event_id=event_id, obj_in=EventUpdate(**update))
+            assert event is not None, f"event {event_id} lost before update"
+            alive[event_id] = {"title": tag, "stock_symbol": event.stock_symbol}
+        elif op < 0.7:
+            event_id = rng.choice(list(alive))
+            assert mock_events.remove(event_id=event_id) is not None, f"event {event_id} lost before remove"
+            del alive[event_id]
+            removed.append(event_id)
+        else:
+            # 用读到的版本号更新，冲突时重试
+            while True:
+                current = mock_events.get(hot_id)
+                try:
+                    mock_events.update(
+                        event_id=hot_id,
+                        obj_in=EventUpdate(level=rng.randint(1, 5), version=current.version),
+                    )
+                    hot_increments += 1
+                    break
+                except VersionConflict:
+                    pass
+
+    out[f"{worker}-{thread}"] = {"alive": alive, "removed": removed, "hot_increments": hot_increments}
+
+
+def _create_hot(results) -> None:
+    from app.mock_data import events as mock_events
+    from app.schemas.event import EventCreate
+
+    results.put(str(mock_events.create(obj_in=EventCreate(**_event_in("HOT", "hot"))).id))
+
+
+def _worker(worker: int, hot_id: str, results) -> None:
+    out: Dict[str, Any] = {}
+    threads = [threading.Thread(target=_thread_ops, args=(worker, t, hot_id, out)) for t in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    results.put(out)
+
+
+def test_no_lost_or_stale_writes_across_processes(tmp_path, monkeypatch):
+    # 子进程启动时按这些环境变量导入应用
+    monkeypatch.setenv("MOCK_DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("MOCK_EVENTS_JOURNAL_COMPACT_THRESHOLD", "20")
+    monkeypatch.setenv("RESPONSE_CACHE_ENABLED", "false")
+    # 空的旧版事件文件，示例事件不计入
+    (tmp_path / "events.json").write_text("[]")
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    setup = ctx.Process(target=_create_hot, args=(results,))
+    setup.start()
+    hot_id = results.get(timeout=60)
+    setup.join()
+
+    procs = [ctx.Process(target=_worker, args=(w, hot_id, results)) for w in range(WORKERS)]
+    for p in procs:
+        p.start()
+    outcomes: Dict[str, Any] = {}
+    for _ in procs:
+        try:
+            outcomes.update(results.get(timeout=120))
+        except queue.Empty:
+            break
+    for p in procs:
+        p.join()
+    assert all(p.exitcode == 0 for p in procs)
+    assert len(outcomes) == WORKERS * THREADS, "a worker thread failed"
+
+    store = EventStore(str(tmp_path / "stocks"))
+    store.refresh(force=True)
+    expected_alive: Dict[str, Dict[str, str]] = {}
+    hot_increments = 0
+    for outcome in outcomes.values():
+        expected_alive.update(outcome["alive"])
+        hot_increments += outcome["hot_increments"]
+        for event_id in outcome["removed"]:
+            assert store.get(event_id) is None, f"removed event {event_id} is back"
+    for event_id, expected in expected_alive.items():
+        event = store.get(event_id)
+        assert event is not None, f"event {event_id} lost"
+        assert {"title": event["title"], "stock_symbol": event["stock_symbol"]} == expected
+    assert len(store.all_events()) == len(expected_alive) + 1
+    assert store.get(hot_id)["version"] == 1 + hot_increments
+
+
+def _event(i: int, symbol: str = "AAA") -> Dict[str, Any]:
+    return {"id": f"e{i}", "start_time": 1_700_000_000 + i, "stock_symbol": symbol, "level": i % 5 + 1,
+            "category": "company", "duration_type": "sudden", "impact": None}
+
+
+def test_reads_do_not_wait_for_writers(tmp_path):
+    store = EventStore(str(tmp_path), check_interval=60)
+    store.refresh(force=True)
+    store.put_many(_event(i, SYMBOLS[i % 2]) for i in range(100))
+    done = threading.Event()
+
+    def read():
+        store.query(limit=10)
+        store.query(stock_symbol="AAA", min_level=3)
+        store.count(category="company")
+        store.get("e1")
+        store.events_for_symbol("BBB")
+        done.set()
+
+    # 写入方持有存储锁期间，读取照常完成
+    with store._lock:
+        reader = threading.Thread(target=read)
+        reader.start()
+        assert done.wait(5)
+    reader.join()
+
+
+def test_readers_see_consistent_snapshots_during_writes(tmp_path):
+    store = EventStore(str(tmp_path))
+    store.put_many(_event(i) for i in range(200))
+    stop = threading.Event()
+    errors: List[str] = []
+
+    def write():
+        rng = random.Random(1)
+        while not stop.is_set():
+            i = rng.randrange(200)
+            if rng.random() < 0.5:
+                store.put(_event(i, rng.choice(SYMBOLS)))
+            else:
+                store.discard(f"e{i}")
+
+    def read():
+        while not stop.is_set():
+            for symbol in SYMBOLS:
+                events = store.query(stock_symbol=symbol)
+                keys = [(event["start_time"], event["id"]) for event in events]
+                if keys != sorted(keys, reverse=True):
+                    errors.append("out of order")
+                if any(event["stock_symbol"] != symbol for event in events):
+                    errors.append(f"foreign event in {symbol}")
+            page = store.query(limit=50)
+            if len({event["id"] for event in page}) != len(page):
+                errors.append("duplicate event in merged page")
+
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(3)]
+    for t in threads:
+        t.start()
+    time.sleep(1.0)
+    stop.set()
+    for t in threads:
+        t.join()
+    assert errors == []
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import re
+
+import pytest
+from tenacity import wait_none
+
+from app.llm import news_analyzer as news_analyzer_module
+from app.llm.analysis_cache import AnalysisCache
+from app.llm.client import TransientLLMError
+from app.llm.mock_llm import MockLLMClient
+from app.llm.news_analyzer import BatchStats, NewsAnalyzer
+
+
+class ThreadCheckingCache(AnalysisCache):
+    """记录每次缓存访问是否发生在事件循环中"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.calls_on_loop = []
+
+    def _record(self, name):
+        try:
+            asyncio.get_running_loop()
+            self.calls_on_loop.append(name)
+        except RuntimeError:
+            pass
+
+    def get(self, key):
+        self._record("get")
+        return super().get(key)
+
+    def get_many(self, keys):
+        self._record("get_many")
+        return super().get_many(keys)
+
+    def set(self, key, result):
+        self._record("set")
+        super().set(key, result)
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_cache_is_accessed_off_the_event_loop(tmp_path, packed):
+    cache = ThreadCheckingCache(str(tmp_path / "analysis.db"))
+    analyzer = NewsAnalyzer(
+        client=MockLLMClient(latency=0), cache=cache,
+        requests_per_minute=None, tokens_per_minute=None,
+    )
+    news = [{"content": f"Acme announces product line number {i} with new features", "source": "wire",
+             "url": f"u{i}"} for i in range(5)]
+
+    first = asyncio.run(analyzer.analyze_news_list(news, "ACME", packed=packed))
+    stats = BatchStats()
+    second = asyncio.run(analyzer.analyze_news_list(news, "ACME", packed=packed, stats=stats))
+
+    assert first == second
+    assert stats.cache_hits == len(news)
+    assert stats.llm_calls == 0
+    assert cache.calls_on_loop == []
+
+
+def test_duplicates_of_earlier_batches_are_merged_not_analyzed():
+    from app.llm.dedup import NearDuplicateIndex
+
+    analyzer = NewsAnalyzer(
+        client=MockLLMClient(latency=0), dedup_index=NearDuplicateIndex(),
+        requests_per_minute=None, tokens_per_minute=None,
+    )
+    text = "Acme announces a record quarterly profit and raises its full year guidance"
+
+    first = asyncio.run(analyzer.batch_analyze_news([{"content": text, "source": "wire", "url": "u1"}], "ACME"))
+    second = asyncio.run(analyzer.batch_analyze_news([{"content": text, "source": "blog", "url": "u2"}], "ACME"))
+
+    assert [event["urls"] for event in first] == [["u1"]]
+    assert second == []
+    stats = analyzer.last_batch_stats
+    assert (stats.duplicates, stats.merged, stats.llm_calls) == (1, 1, 0)
+    assert analyzer.last_merges == [{"url": "u1", "sources": ["blog"], "urls": ["u2"]}]
+
+
+class ScriptedClient:
+    """按文章标记返回结果的客户端: 延迟可控，可以先失败若干次"""
+
+    def __init__(self, delays=None, failures=None):
+        self.delays = delays or {}
+        self.failures = dict(failures or {})
+        self.calls = []
+
+    async def complete(self, prompt):
+        marker = re.search(r"ARTICLE-\d+", prompt).group(0)
+        self.calls.append(marker)
+        await asyncio.sleep(self.delays.get(marker, 0))
+        if self.failures.get(marker, 0):
+            self.failures[marker] -= 1
+            raise TransientLLMError(f"{marker} unavailable")
+        return json.dumps({"has_event": True, "title": marker, "description": "", "level": 3})
+
+
+def _scripted_news(count):
+    return [{"content": f"ARTICLE-{i} body", "source": "wire", "url": f"u{i}", "timestamp": i} for i in range(count)]
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(news_analyzer_module, "wait_random_exponential", lambda **kwargs: wait_none())
+
+
+def test_results_keep_input_order_when_calls_finish_out_of_order():
+    # 越靠前的文章越晚完成
+    client = ScriptedClient(delays={f"ARTICLE-{i}": 0.01 * (5 - i) for i in range(5)})
+    analyzer = NewsAnalyzer(client=client, requests_per_minute=None, tokens_per_minute=None, max_concurrency=5)
+
+    events = asyncio.run(analyzer.analyze_news_list(_scripted_news(5), "ACME"))
+
+    assert client.calls == [f"ARTICLE-{i}" for i in range(5)]
+    assert [event["title"] for event in events] == [f"ARTICLE-{i}" for i in range(5)]
+    assert [event["url"] for event in events] == [f"u{i}" for i in range(5)]
+    assert [event["time"] for event in events] == list(range(5))
+
+
+def test_transient_errors_are_retried_then_recorded_as_failed(no_backoff):
+    client = ScriptedClient(failures={"ARTICLE-1": 1, "ARTICLE-2": 10})
+    analyzer = NewsAnalyzer(client=client, requests_per_minute=None, tokens_per_minute=None, max_retries=2)
+    stats = BatchStats()
+
+    events = asyncio.run(analyzer.analyze_news_list(_scripted_news(4), "ACME", stats=stats))
+
+    assert [event and event["title"] for event in events] == ["ARTICLE-0", "ARTICLE-1", None, "ARTICLE-3"]
+    assert client.calls.count("ARTICLE-1") == 2
+    assert client.calls.count("ARTICLE-2") == 3
+    assert stats.failed == 1
+    assert stats.retries == 1 + 2
+    assert stats.llm_calls == 1 + 2 + 3 + 1
+
+
+class PackClient:
+    """打包请求超过max_articles篇时返回截断的数组"""
+
+    def __init__(self, max_articles):
+        self.max_articles = max_articles
+        self.pack_sizes = []
+
+    async def complete(self, prompt):
+        markers = re.findall(r"ARTICLE-\d+", prompt)
+        if "[新闻" not in prompt:
+            self.pack_sizes.append(1)
+            return json.dumps({"has_event": True, "title": markers[0], "description": "", "level": 3})
+        self.pack_sizes.append(len(markers))
+        raw = json.dumps([
+            {"index": i, "has_event": True, "title": marker, "description": "", "level": 3}
+            for i, marker in enumerate(markers)
+        ])
+        return raw if len(markers) <= self.max_articles else raw[:len(raw) // 2]
+
+
+@pytest.mark.parametrize("max_articles", [0, 2, 3])
+def test_malformed_pack_is_split_until_every_article_has_a_result(max_articles):
+    client = PackClient(max_articles)
+    analyzer = NewsAnalyzer(
+        client=client, requests_per_minute=None, tokens_per_minute=None,
+        pack_token_budget=100_000, pack_max_articles=8,
+    )
+    stats = BatchStats()
+
+    events = asyncio.run(analyzer.analyze_news_list(_scripted_news(8), "ACME", packed=True, stats=stats))
+
+    assert [event["title"] for event in events] == [f"ARTICLE-{i}" for i in range(8)]
+    assert [event["url"] for event in events] == [f"u{i}" for i in range(8)]
+    assert stats.packs == 1
+    assert stats.failed == 0
+    assert client.pack_sizes[0] == 8
+    # 每个无法解析的打包请求拆分一次，拆到单篇时改用单篇提示词
+    assert stats.pack_splits == sum(size > max(max_articles, 1) for size in client.pack_sizes) > 0
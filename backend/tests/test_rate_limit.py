@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from app.llm import rate_limit
+from app.llm.rate_limit import RateLimiter, TokenBucket
+
+
+class FakeClock:
+    """只在等待时前进的时钟"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, delay):
+        self.sleeps.append(delay)
+        self.now += delay
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(rate_limit.asyncio, "sleep", clock.sleep)
+    return clock
+
+
+def test_bucket_allows_a_burst_then_waits_for_refill(clock):
+    async def run():
+        bucket = TokenBucket(60)  # 每秒1个，容量60
+        assert [await bucket.acquire() for _ in range(60)] == [0.0] * 60
+        assert await bucket.acquire() == pytest.approx(1.0)
+        assert await bucket.acquire(3) == pytest.approx(3.0)
+
+    asyncio.run(run())
+    assert clock.now == pytest.approx(1004.0)
+
+
+def test_bucket_refills_with_elapsed_time_up_to_capacity(clock):
+    async def run():
+        bucket = TokenBucket(120, capacity=10)  # 每秒2个
+        assert await bucket.acquire(10) == 0.0
+        clock.now += 2.5
+        assert await bucket.acquire(5) == 0.0
+        assert await bucket.acquire(1) == pytest.approx(0.5)
+        clock.now += 3600
+        assert await bucket.acquire(10) == 0.0
+        # 超过容量的请求按容量计算
+        assert await bucket.acquire(50) == pytest.approx(5.0)
+
+    asyncio.run(run())
+
+
+def test_waiters_are_served_in_arrival_order(clock):
+    async def run():
+        bucket = TokenBucket(60, capacity=1)
+        order = []
+
+        async def take(name):
+            await bucket.acquire()
+            order.append((name, clock.now))
+
+        await asyncio.gather(*(take(name) for name in "abcd"))
+        return order
+
+    assert asyncio.run(run()) == [("a", 1000.0), ("b", 1001.0), ("c", 1002.0), ("d", 1003.0)]
+
+
+def test_limiter_combines_request_and_token_limits(clock):
+    async def run():
+        limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=600)
+        assert await limiter.acquire(600) == 0.0
+        # 请求配额充足，token桶需要补充10秒
+        assert await limiter.acquire(100) == pytest.approx(10.0)
+        assert await RateLimiter().acquire(10**6) == 0.0
+
+    asyncio.run(run())
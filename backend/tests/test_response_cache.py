@@ -0,0 +1,73 @@
+import asyncio
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core.cache import MemoryCache, SharedCache
+from app.core.response_cache import ResponseCacheMiddleware
+from app.core.versions import DataVersions
+
+
+def _client(state):
+    async def items(request):
+        return JSONResponse(state["body"], headers={"X-Total-Count": str(state["total"])})
+
+    cache = SharedCache(MemoryCache())
+    versions = DataVersions("test", cache=cache)
+    app = Starlette(routes=[Route("/items", items)])
+    app.add_middleware(
+        ResponseCacheMiddleware,
+        rules=[(r"^/items$", lambda match, query: versions.get())],
+        versions=versions,
+        cache=cache,
+    )
+    return TestClient(app), cache, versions
+
+
+def test_etag_covers_representation_headers():
+    state = {"body": [1, 2], "total": 2}
+    client, cache, _ = _client(state)
+    first = client.get("/items")
+
+    state["total"] = 3
+    cache.backend.clear()
+    second = client.get("/items")
+
+    assert first.content == second.content
+    assert first.headers["etag"] != second.headers["etag"]
+
+
+def test_not_modified_resends_representation_headers():
+    client, _, _ = _client({"body": [1, 2], "total": 2})
+    etag = client.get("/items").headers["etag"]
+
+    response = client.get("/items", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.headers["x-total-count"] == "2"
+    assert "content-type" not in response.headers
+
+
+
+def test_versions_refresh_runs_only_when_due_and_off_the_event_loop():
+    client, _, versions = _client({"body": [], "total": 0})
+    calls = []
+    due = {"value": False}
+
+    def refresh():
+        try:
+            asyncio.get_running_loop()
+            calls.append("event loop")
+        except RuntimeError:
+            calls.append("thread")
+
+    versions.add_refresher(refresh, due=lambda: due["value"])
+    client.get("/items")
+    assert calls == []
+
+    due["value"] = True
+    client.get("/items")
+    assert calls == ["thread"]